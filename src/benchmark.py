@@ -0,0 +1,344 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.wikiDataLoader import BatchReaderJSON, BatchWriterSQLite, configurerFormatLots, configurerLogs
+from src.wikiCache import configurerCache
+from src.tailleLot import reinitialiserControleursTailleLot
+from src.wikiTransport import configurerTransport, obtenirTransport
+from src.surveillance import MOTIF_BATCH
+from src.serveurMock import HOTES_WIKIMEDIA, RACINE_DEFAUT, MondeSynthetique, ServeurMock
+import src.main as pipeline
+
+
+RUN_ID = "BENCH"
+REFERENCE_DEFAUT = "doc/benchmark_reference.json"
+SORTIE_DEFAUT = "bench_output.txt"
+
+# Écart toléré par rapport à la référence avant de déclarer une régression
+TOLERANCES = {
+    "lignesParSeconde": 0.30,   # baisse relative
+    "requetesParLigne": 0.05,   # hausse relative (déterministe sur le wiki synthétique)
+    "p95": 0.50,                # hausse relative de la latence p95 par requête
+}
+MARGE_LATENCE = 0.002  # secondes ajoutées au seuil p95, pour les latences de quelques ms
+# En dessous, la mesure est trop bruitée pour être comparée (étape 5 : une ou deux requêtes)
+DUREE_MIN_DEBIT = 0.5
+REQUETES_MIN_P95 = 20
+
+# Démarrage : durée d'import dans un interpréteur neuf (meilleure de N) et modules qui doivent rester différés
+BUDGET_IMPORT = 0.25  # secondes
+MODULES_LOURDS = ("numpy", "pyproj", "pyarrow", "requests", "asyncio")
+MODULES_INDEX = ("src.indexLiens", "src.indexWikidata", "src.filtreConnus")   # options hors ligne
+MODULES_DIFFERES = {
+    "src.main": MODULES_LOURDS + ("bs4",) + MODULES_INDEX + tuple(f"src.wikiDataLoader_Etape{n}" for n in range(1, 6)),
+    # Listener d'une étape : ni les autres étapes, ni les index sans leur option (bs4 sert à l'étape 1)
+    "src.wikiDataLoader_Etape1": MODULES_LOURDS + MODULES_INDEX,
+    "src.wikiDataLoader_Etape2": MODULES_LOURDS + ("bs4",) + MODULES_INDEX,
+    "src.wikiDataLoader_Etape3": MODULES_LOURDS + ("bs4",) + MODULES_INDEX,
+    "src.wikiDataLoader_Etape4": MODULES_LOURDS + ("bs4",) + MODULES_INDEX,
+    "src.wikiDataLoader_Etape5": MODULES_LOURDS + ("bs4",) + MODULES_INDEX,   # sqlite3 suffit
+}
+REPETITIONS_IMPORT = 5
+
+# Tables de WikiCarto.db utilisées par l'étape 5
+SCHEMA_BASE = """
+CREATE TABLE IF NOT EXISTS EntreeHistorique (
+    qid TEXT PRIMARY KEY, titre TEXT, lat REAL, lon REAL, lambert_x REAL, lambert_y REAL, p31 TEXT,
+    summary TEXT, description TEXT, source_backlink TEXT, url TEXT, crossReference INTEGER,
+    batch_id INTEGER, nbLangues INTEGER, notoriete INTEGER
+);
+CREATE TABLE IF NOT EXISTS HistoriqueInsertion (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, source_backlink TEXT, date_insertion TEXT, nb_entrees INTEGER
+);
+CREATE TABLE IF NOT EXISTS SourceBacklink (source_backlink TEXT PRIMARY KEY, url TEXT, couleur TEXT, visible INTEGER);
+CREATE TABLE IF NOT EXISTS P31Classification (p31 TEXT PRIMARY KEY, label TEXT, statut TEXT);
+"""
+
+
+# ───────────────────────────────────────
+# Mesure des requêtes, par étape
+# ───────────────────────────────────────
+class MesureRequetes:
+    """
+    Enveloppe TransportHTTP._envoyer : durée de chaque appel (retries 429 compris), rangée sous
+    l'étape en cours. Les étapes s'exécutent l'une après l'autre, les threads de executerEnParallele
+    partagent donc la même étape courante.
+    """
+
+    def __init__(self, transport):
+        self.etape = None
+        self.durees: Dict[int, List[float]] = {}
+        self._verrou = threading.Lock()
+        envoyer = transport._envoyer
+
+        def envoyerMesure(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return envoyer(*args, **kwargs)
+            finally:
+                duree = time.perf_counter() - t0
+                with self._verrou:
+                    self.durees.setdefault(self.etape, []).append(duree)
+
+        transport._envoyer = envoyerMesure
+
+
+def fichiersBatch(dossier: str) -> List[str]:
+    noms = [nom for nom in os.listdir(dossier) if MOTIF_BATCH.search(nom)] if os.path.isdir(dossier) else []
+    return [os.path.join(dossier, nom) for nom in sorted(noms, key=lambda n: int(MOTIF_BATCH.search(n).group(1)))]
+
+
+def compterLignes(dossier: str) -> int:
+    return sum(sum(1 for _ in BatchReaderJSON(chemin).iterLignes()) for chemin in fichiersBatch(dossier))
+
+
+def preparerRepertoire(racine: str, cheminDb: str):
+    os.makedirs("input", exist_ok=True)
+    with open(os.path.join("input", f"{RUN_ID}.csv"), "w", encoding="utf-8") as f:
+        f.write("titre,index_min,index_max\n")
+        f.write(f"\"{racine}\",,\n")
+    conn = sqlite3.connect(cheminDb)
+    conn.executescript(SCHEMA_BASE)
+    conn.close()
+
+
+# ───────────────────────────────────────
+# Exécution des étapes 1 à 5 contre le serveur local
+# ───────────────────────────────────────
+def executerBenchmark(nbPages: int = 2000, latence: float = 0.005, taux429: float = 0.0, concurrence: int = 1,
+                      format: str = "jsonl", racine: str = RACINE_DEFAUT, enregistrements: Optional[str] = None,
+                      repertoire: Optional[str] = None, verbeux: bool = False) -> dict:
+    """
+    Enchaîne les étapes comme les listeners (fichier par fichier, dans l'ordre des batchs) dans un
+    répertoire de travail temporaire. Retourne les paramètres et, par étape : lignes en entrée et en
+    sortie, durée, lignes/s, requêtes par ligne, latences p50 / p95 par requête, 429 reçus.
+    Le répertoire de travail n'est conservé que s'il est fourni.
+    """
+    parametres = {"pages": nbPages, "latence": latence, "taux429": taux429, "concurrence": concurrence,
+                  "format": format, "racine": racine, "enregistrements": enregistrements}
+    temporaire = repertoire is None
+    repertoire = repertoire or tempfile.mkdtemp(prefix="bench_wiki_")
+    if enregistrements:
+        enregistrements = os.path.abspath(enregistrements)
+    origine = os.getcwd()
+
+    with ServeurMock(MondeSynthetique(nbPages, racine), latence=latence, taux429=taux429,
+                     enregistrements=enregistrements) as serveur:
+        configurerCache(actif=False)
+        reinitialiserControleursTailleLot()
+        configurerFormatLots(format)
+        # Débit non limité : on mesure le pipeline, pas le seau à jetons
+        configurerTransport(limites={hote: (1e6, 1_000_000) for hote in HOTES_WIKIMEDIA},
+                            taillePool=max(16, concurrence), substitutions=serveur.substitutions())
+        mesure = MesureRequetes(obtenirTransport())
+
+        os.chdir(repertoire)
+        sortie = contextlib.nullcontext() if verbeux else contextlib.redirect_stdout(io.StringIO())
+        try:
+            cheminDb = os.path.abspath("WikiCarto.db")
+            preparerRepertoire(racine, cheminDb)
+            etapes = {}
+            entrees = 0
+            for step in range(1, 6):
+                mesure.etape = step
+                avant429 = serveur.compteurs["429"]
+                t0 = time.perf_counter()
+                with sortie:
+                    if step == 1:
+                        pipeline.traiter_extraction_titres(runId=RUN_ID, pause=0, concurrence=concurrence)
+                    else:
+                        writerBase = BatchWriterSQLite(cheminDb, persistante=True) if step == 5 else None
+                        for chemin in fichiersBatch(pipeline.REPERTOIRES_PAR_ETAPE[step - 1]):
+                            pipeline.traiterFichierEtape(RUN_ID, step, chemin, 0, concurrence, writerBase)
+                        if writerBase:
+                            sorties = writerBase.nb_inserts
+                            writerBase.fermer()
+                duree = time.perf_counter() - t0
+                if step < 5:
+                    sorties = compterLignes(pipeline.REPERTOIRES_PAR_ETAPE[step])
+                if step == 1:
+                    entrees = sorties  # l'étape 1 part d'une seule page racine : débit compté en lignes produites
+
+                durees = np.array(mesure.durees.get(step, []))
+                etapes[str(step)] = {
+                    "entrees": entrees,
+                    "sorties": sorties,
+                    "duree": round(duree, 4),
+                    "lignesParSeconde": round(entrees / duree, 1) if duree else 0.0,
+                    "requetes": len(durees),
+                    "requetesParLigne": round(len(durees) / entrees, 4) if entrees else 0.0,
+                    "p50": round(float(np.percentile(durees, 50)), 5) if len(durees) else 0.0,
+                    "p95": round(float(np.percentile(durees, 95)), 5) if len(durees) else 0.0,
+                    "reponses429": serveur.compteurs["429"] - avant429,
+                }
+                entrees = sorties
+        finally:
+            os.chdir(origine)
+            configurerTransport()
+            if temporaire:
+                shutil.rmtree(repertoire, ignore_errors=True)
+
+    return {"parametres": parametres, "etapes": etapes}
+
+
+def medianeResultats(series: List[dict]) -> dict:
+    """
+    Fusionne plusieurs exécutions : médiane des mesures de temps, comptes de la première exécution.
+    """
+    resultats = {"parametres": series[0]["parametres"], "repetitions": len(series), "etapes": {}}
+    for step, premiere in series[0]["etapes"].items():
+        etape = dict(premiere)
+        for cle in ("duree", "lignesParSeconde", "p50", "p95"):
+            etape[cle] = round(float(np.median([r["etapes"][step][cle] for r in series])), 5)
+        resultats["etapes"][step] = etape
+    return resultats
+
+
+# ───────────────────────────────────────
+# Budget d'import
+# ───────────────────────────────────────
+def mesurerImport(module: str, repetitions: int = REPETITIONS_IMPORT) -> dict:
+    """
+    Importe `module` dans un interpréteur neuf, depuis un répertoire vide : durée (meilleure des
+    `repetitions`), modules différés chargés quand même, fichiers créés par l'import.
+    """
+    code = ("import json, sys, time\n"
+            "t0 = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(json.dumps({'duree': time.perf_counter() - t0, 'modules': sorted(sys.modules)}))")
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [racine, os.environ.get("PYTHONPATH")])))
+    durees = []
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as vide:
+        for _ in range(repetitions):
+            sortie = subprocess.run([sys.executable, "-c", code], cwd=vide, env=env, capture_output=True, text=True, check=True)
+            mesure = json.loads(sortie.stdout.splitlines()[-1])
+            durees.append(mesure["duree"])
+        fichiers = os.listdir(vide)
+    charges = [nom for nom in MODULES_DIFFERES.get(module, ()) if nom in mesure["modules"]]
+    return {"duree": min(durees), "charges": charges, "fichiers": fichiers}
+
+
+def verifierImports(budget: float = BUDGET_IMPORT) -> tuple:
+    """
+    Retourne (lignes du rapport, régressions).
+    """
+    lignes, regressions = [], []
+    for module in MODULES_DIFFERES:
+        mesure = mesurerImport(module)
+        lignes.append(f"[⏱️ Import] {module} : {mesure['duree'] * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+        if mesure["duree"] > budget:
+            regressions.append(f"Import de {module} : {mesure['duree'] * 1000:.0f} ms > {budget * 1000:.0f} ms")
+        if mesure["charges"]:
+            regressions.append(f"Import de {module} : charge {', '.join(mesure['charges'])}")
+        if mesure["fichiers"]:
+            regressions.append(f"Import de {module} : crée {', '.join(mesure['fichiers'])} dans le répertoire courant")
+    return lignes, regressions
+
+
+# ───────────────────────────────────────
+# Rapport et comparaison à la référence
+# ───────────────────────────────────────
+def formaterRapport(resultats: dict) -> str:
+    p = resultats["parametres"]
+    lignes = [f"[🧪 Benchmark] {p['pages']} pages, latence {p['latence'] * 1000:.0f} ms, 429 {p['taux429']:.0%}, "
+              f"concurrence {p['concurrence']}, format {p['format']}, médiane de {resultats.get('repetitions', 1)} exécution(s)",
+              f"{'étape':>5} | {'entrées':>7} | {'sorties':>7} | {'durée':>7} | {'lignes/s':>8} | {'req/ligne':>9} | "
+              f"{'p50 ms':>7} | {'p95 ms':>7} | {'429':>4}"]
+    for step, m in resultats["etapes"].items():
+        lignes.append(f"{step:>5} | {m['entrees']:>7} | {m['sorties']:>7} | {m['duree']:>6.2f}s | {m['lignesParSeconde']:>8.0f} | "
+                      f"{m['requetesParLigne']:>9.3f} | {m['p50'] * 1000:>7.1f} | {m['p95'] * 1000:>7.1f} | {m['reponses429']:>4}")
+    return "\n".join(lignes)
+
+
+def comparable(resultats: dict, reference: dict) -> bool:
+    return reference.get("parametres") == resultats["parametres"]
+
+
+def comparer(resultats: dict, reference: dict, tolerances: Optional[dict] = None) -> List[str]:
+    """
+    Liste des régressions par rapport à une référence comparable (mêmes paramètres), vide si aucune.
+    """
+    tolerances = dict(TOLERANCES, **(tolerances or {}))
+    regressions = []
+    for step, ref in reference["etapes"].items():
+        m = resultats["etapes"].get(step)
+        if m is None:
+            regressions.append(f"Étape {step} absente des résultats")
+            continue
+        if m["sorties"] != ref["sorties"]:
+            regressions.append(f"Étape {step} : {m['sorties']} lignes produites au lieu de {ref['sorties']}")
+        if ref["duree"] >= DUREE_MIN_DEBIT and m["lignesParSeconde"] < ref["lignesParSeconde"] * (1 - tolerances["lignesParSeconde"]):
+            regressions.append(f"Étape {step} : {m['lignesParSeconde']:.0f} lignes/s (référence {ref['lignesParSeconde']:.0f})")
+        if m["requetesParLigne"] > ref["requetesParLigne"] * (1 + tolerances["requetesParLigne"]):
+            regressions.append(f"Étape {step} : {m['requetesParLigne']:.3f} requêtes/ligne (référence {ref['requetesParLigne']:.3f})")
+        if ref["requetes"] >= REQUETES_MIN_P95 and m["p95"] > ref["p95"] * (1 + tolerances["p95"]) + MARGE_LATENCE:
+            regressions.append(f"Étape {step} : p95 {m['p95'] * 1000:.1f} ms (référence {ref['p95'] * 1000:.1f} ms)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des étapes 1 à 5 contre un serveur Wikipedia / Wikidata local")
+    parser.add_argument("--pages", type=int, default=2000, help="Nombre de pages synthétiques liées à la racine")
+    parser.add_argument("--latence", type=float, default=0.005, help="Latence ajoutée par le serveur à chaque réponse (s)")
+    parser.add_argument("--taux429", type=float, default=0.0, help="Proportion de requêtes refusées par un 429")
+    parser.add_argument("--concurrence", type=int, default=1, help="Lots en vol par étape (pool de threads si > 1)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="Format des fichiers batch")
+    parser.add_argument("--racine", default=RACINE_DEFAUT, help="Page racine (avec --enregistrements : la page enregistrée)")
+    parser.add_argument("--enregistrements", default=None, help="Cache exporté dont les réponses réelles sont rejouées")
+    parser.add_argument("--repetitions", type=int, default=3, help="Exécutions complètes ; les temps retenus sont les médianes")
+    parser.add_argument("--reference", default=REFERENCE_DEFAUT, help="Fichier de référence des performances")
+    parser.add_argument("--enregistrer", action="store_true", help="Enregistre les résultats comme nouvelle référence")
+    parser.add_argument("--sortie", default=SORTIE_DEFAUT, help="Rapport texte")
+    parser.add_argument("--verbeux", action="store_true", help="Affiche la sortie des étapes")
+    parser.add_argument("--imports", action="store_true", help="Vérifie seulement le budget d'import (sans serveur ni étapes)")
+    args = parser.parse_args()
+    configurerLogs()
+
+    lignesImport, regressions = verifierImports()
+    rapportImport = "\n".join(lignesImport + [f"[❌ Régression] {r}" for r in regressions])
+    if args.imports:
+        print(rapportImport)
+        sys.exit(1 if regressions else 0)
+
+    resultats = medianeResultats([executerBenchmark(args.pages, args.latence, args.taux429, args.concurrence, args.format,
+                                                    args.racine, args.enregistrements, verbeux=args.verbeux)
+                                  for _ in range(max(1, args.repetitions))])
+    rapport = rapportImport + "\n" + formaterRapport(resultats)
+
+    if args.enregistrer:
+        os.makedirs(os.path.dirname(args.reference) or ".", exist_ok=True)
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        rapport += f"\n[💾] Référence enregistrée : {args.reference}"
+    elif os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        if not comparable(resultats, reference):
+            rapport += (f"\n[ℹ️] Pas de référence comparable : {args.reference} a été obtenue avec "
+                        f"{reference.get('parametres')}")
+        else:
+            regressionsEtapes = comparer(resultats, reference)
+            rapport += "\n" + ("\n".join(f"[❌ Régression] {r}" for r in regressionsEtapes) if regressionsEtapes
+                               else f"[✅] Aucune régression par rapport à {args.reference}")
+            regressions += regressionsEtapes
+    else:
+        rapport += f"\n[ℹ️] Pas de référence ({args.reference}) : --enregistrer pour en créer une"
+
+    print(rapport)
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        f.write(rapport + "\n")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,76 @@
+import argparse
+import os
+import time
+from typing import Iterator, List
+
+from src.wikiDataLoader import (BatchReaderJSON, EXTENSIONS_FORMAT, configurerFormatLots, ecrireParquet,
+                                configurerLogs, encoderJSONL, formatDuFichier, logger)
+from src.surveillance import MOTIF_BATCH
+
+
+# ───────────────────────────────────────
+# Conversion des fichiers batch archivés (JSONL ↔ Parquet)
+# ───────────────────────────────────────
+def fichiersBatch(chemins: List[str]) -> Iterator[str]:
+    """
+    Fichiers donnés explicitement, ou fichiers *_batch_NNN des répertoires (Done/ et EnCours/ compris).
+    """
+    for chemin in chemins:
+        if os.path.isfile(chemin):
+            yield chemin
+            continue
+        for dossier, _, noms in os.walk(chemin):
+            for nom in sorted(noms):
+                if MOTIF_BATCH.search(nom):
+                    yield os.path.join(dossier, nom)
+
+
+def convertirFichier(chemin: str, format: str, supprimer: bool = False) -> bool:
+    """
+    Réécrit un fichier batch dans `format` à côté de l'original. Retourne False s'il y est déjà.
+    """
+    if formatDuFichier(chemin) == format:
+        return False
+    destination = os.path.splitext(chemin)[0] + EXTENSIONS_FORMAT[format]
+    temporaire = os.path.join(os.path.dirname(destination), f".{os.path.basename(destination)}.tmp")
+
+    lignes = BatchReaderJSON(chemin).loadLignes()
+    if format == "parquet":
+        ecrireParquet(temporaire, lignes)
+    else:
+        with open(temporaire, "wb") as f:
+            f.write(encoderJSONL(ligne.to_dict() for ligne in lignes))
+    os.replace(temporaire, destination)
+
+    if supprimer:
+        os.remove(chemin)
+    return True
+
+
+def convertir(chemins: List[str], format: str, supprimer: bool = False) -> int:
+    configurerFormatLots(format)
+    start = time.time()
+    nb = 0
+    avant = apres = 0
+    for chemin in fichiersBatch(chemins):
+        taille = os.path.getsize(chemin)
+        if not convertirFichier(chemin, format, supprimer):
+            continue
+        nb += 1
+        avant += taille
+        apres += os.path.getsize(os.path.splitext(chemin)[0] + EXTENSIONS_FORMAT[format])
+
+    ratio = f", {avant / 1e6:.1f} Mo → {apres / 1e6:.1f} Mo" if nb else ""
+    logger.info(f"[🧱 Conversion] {nb} fichier(s) convertis en {format} en {time.time() - start:.1f}s{ratio}")
+    print(f"[🧱] {nb} fichier(s) convertis en {format}{ratio}")
+    return nb
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convertit les fichiers batch archivés entre JSONL et Parquet")
+    parser.add_argument("chemins", nargs="+", help="Fichiers batch ou répertoires (ex : data/step2_qid/Done)")
+    parser.add_argument("--format", choices=list(EXTENSIONS_FORMAT), default="parquet", help="Format cible")
+    parser.add_argument("--supprimer", action="store_true", help="Supprime l'original une fois le fichier converti écrit")
+    args = parser.parse_args()
+    configurerLogs()
+    convertir(args.chemins, args.format, args.supprimer)
@@ -0,0 +1,219 @@
+import os
+import socket
+import threading
+from typing import List, Optional
+
+from src.wikiDataLoader import logger
+from src.surveillance import MOTIF_BATCH
+
+
+DOSSIER_BAUX = "EnCours"
+SONDE_HORLOGE = ".horloge"   # fichier touché pour lire l'heure du disque partagé
+DUREE_BAIL_DEFAUT = 300.0  # secondes sans battement de cœur avant qu'un bail soit repris
+VERROU_ETAPE5 = "step5.lock"  # un seul écrivain de WikiCarto.db, toutes machines confondues
+
+
+def identifiantWorker() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Bail:
+    """
+    Fichier batch réservé par un worker : le fichier est déplacé dans EnCours/<worker>/ et sa date
+    de modification est rafraîchie régulièrement (battement de cœur) tant que le traitement dure.
+    """
+
+    def __init__(self, chemin: str, nom: str, duree: float):
+        self.chemin = chemin
+        self.nom = nom
+        self.duree = duree
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._battre, name=f"bail-{nom}", daemon=True)
+
+    def _battre(self):
+        while not self._arret.wait(self.duree / 3):
+            try:
+                os.utime(self.chemin, None)
+            except FileNotFoundError:
+                logger.warning(f"[⚠️ Bail] {self.nom} a été repris par un autre worker")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._arret.set()
+        self._thread.join()
+        return False
+
+
+class FileBaux:
+    """
+    File de travail partagée entre plusieurs workers (processus ou machines) sur un même répertoire :
+    - réservation atomique par renommage de <dossier>/<fichier> vers <dossier>/EnCours/<worker>/<fichier> ;
+    - un bail sans battement de cœur depuis `duree` secondes est remis dans <dossier> ;
+    - le STOP n'est transmis que lorsqu'il ne reste ni fichier en attente ni bail en cours.
+    L'âge d'un bail se mesure à l'heure du disque partagé (cf. maintenant()), jamais à l'horloge locale.
+    """
+
+    def __init__(self, dossier: str, duree: float = DUREE_BAIL_DEFAUT, worker: Optional[str] = None):
+        self.dossier = dossier
+        self.duree = duree
+        self.worker = worker or identifiantWorker()
+        self.dossierBaux = os.path.join(dossier, DOSSIER_BAUX)
+        self.dossierWorker = os.path.join(self.dossierBaux, self.worker)
+        os.makedirs(self.dossierWorker, exist_ok=True)
+
+    def maintenant(self) -> float:
+        """
+        Heure du système de fichiers partagé : mtime d'une sonde touchée à l'instant. Les battements de cœur
+        (os.utime) sont datés par la même source, les écarts d'horloge entre machines n'y entrent donc pas.
+        """
+        sonde = os.path.join(self.dossierWorker, SONDE_HORLOGE)
+        with open(sonde, "a"):
+            pass
+        os.utime(sonde, None)
+        return os.stat(sonde).st_mtime
+
+    def reserver(self, chemin: str) -> Optional[Bail]:
+        """
+        Tente de réserver le fichier ; retourne None si un autre worker l'a déjà pris.
+        """
+        nom = os.path.basename(chemin)
+        destination = os.path.join(self.dossierWorker, nom)
+        try:
+            os.rename(chemin, destination)
+        except FileNotFoundError:
+            return None
+        os.utime(destination, None)
+        return Bail(destination, nom, self.duree)
+
+    def reserverExclusif(self, nom: str) -> Optional[Bail]:
+        """
+        Bail sur le fichier verrou EnCours/<nom>, détenu par un seul worker à la fois (création exclusive,
+        valable entre machines sur le disque partagé). Un verrou sans battement de cœur depuis `duree`
+        secondes est repris. Retourne None si un autre worker le détient.
+        """
+        chemin = os.path.join(self.dossierBaux, nom)
+        try:
+            expire = self.maintenant() - os.stat(chemin).st_mtime >= self.duree
+        except FileNotFoundError:
+            expire = False
+        if expire:
+            perime = f"{chemin}.{self.worker}"
+            try:
+                os.rename(chemin, perime)   # un seul worker réussit le renommage
+            except FileNotFoundError:
+                return None   # repris par un autre worker entre-temps
+            try:
+                if self.maintenant() - os.stat(perime).st_mtime < self.duree:
+                    # Verrou rafraîchi entre-temps : on le rend à son détenteur, sauf s'il a déjà été recréé
+                    try:
+                        os.link(perime, chemin)
+                    except FileExistsError:
+                        pass
+                    return None
+                logger.warning(f"[♻️ Bail] Verrou {nom} expiré, repris")
+            finally:
+                os.remove(perime)
+        try:
+            fd = os.open(chemin, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w") as f:
+            f.write(self.worker)
+        return Bail(chemin, nom, self.duree)
+
+    def liberer(self, bail: Bail):
+        try:
+            os.remove(bail.chemin)
+        except FileNotFoundError:
+            pass
+
+    def terminer(self, bail: Bail, dossier_done: str):
+        os.makedirs(dossier_done, exist_ok=True)
+        destination = os.path.join(dossier_done, bail.nom)
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.rename(bail.chemin, destination)
+        except FileNotFoundError:
+            logger.warning(f"[⚠️ Bail] {bail.nom} expiré et remis en file pendant son traitement")
+
+    def baux(self) -> List[str]:
+        chemins = []
+        if not os.path.isdir(self.dossierBaux):
+            return chemins
+        for worker in os.listdir(self.dossierBaux):
+            dossier = os.path.join(self.dossierBaux, worker)
+            if os.path.isdir(dossier):
+                chemins.extend(os.path.join(dossier, nom) for nom in os.listdir(dossier) if MOTIF_BATCH.search(nom))
+        return chemins
+
+    def recupererExpires(self) -> int:
+        """
+        Remet en file les baux dont le worker a cessé de battre (worker arrêté ou machine perdue).
+        """
+        nb = 0
+        maintenant = self.maintenant()
+        for chemin in self.baux():
+            try:
+                if maintenant - os.stat(chemin).st_mtime < self.duree:
+                    continue
+                os.rename(chemin, os.path.join(self.dossier, os.path.basename(chemin)))
+                nb += 1
+                logger.warning(f"[♻️ Bail] {chemin} expiré, remis en file")
+            except FileNotFoundError:
+                continue  # terminé ou repris entre-temps
+        return nb
+
+    def fichiersEnAttente(self) -> List[str]:
+        return [nom for nom in os.listdir(self.dossier) if MOTIF_BATCH.search(nom)]
+
+    def toutEstTermine(self) -> bool:
+        return not self.fichiersEnAttente() and not self.baux()
+
+    def transmettreStop(self, nom_stop: str, dossier_suivant: Optional[str]) -> bool:
+        """
+        Transmet le STOP à l'étape suivante (ou l'archive en fin de chaîne) et laisse une trace
+        dans Done/ pour les autres workers. Retourne False si un autre worker l'a déjà fait.
+        """
+        source_stop = os.path.join(self.dossier, nom_stop)
+        dossier_done = os.path.join(self.dossier, "Done")
+        trace = os.path.join(dossier_done, nom_stop)
+        os.makedirs(dossier_done, exist_ok=True)
+        try:
+            if dossier_suivant:
+                os.makedirs(dossier_suivant, exist_ok=True)
+                os.replace(source_stop, os.path.join(dossier_suivant, nom_stop))
+            else:
+                os.replace(source_stop, trace)
+        except FileNotFoundError:
+            return False
+
+        if dossier_suivant:
+            with open(trace, "w"):
+                pass
+        os.utime(trace, None)
+        return True
+
+    def stopTransmisDepuis(self, nom_stop: str, debut: float) -> bool:
+        """
+        Vrai si un autre worker a transmis le STOP après `debut` (trace laissée dans Done/).
+        `debut` est une heure du disque partagé, lue avec maintenant().
+        """
+        try:
+            return os.stat(os.path.join(self.dossier, "Done", nom_stop)).st_mtime >= debut
+        except FileNotFoundError:
+            return False
+
+    def fermer(self):
+        try:
+            os.remove(os.path.join(self.dossierWorker, SONDE_HORLOGE))
+        except FileNotFoundError:
+            pass
+        try:
+            os.rmdir(self.dossierWorker)
+        except OSError:
+            pass
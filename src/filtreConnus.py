@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger("wiki")
+
+
+def hacherTitre(titre: str) -> int:
+    return int.from_bytes(hashlib.blake2b(titre.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def numeroQid(qid: Optional[str]) -> int:
+    """
+    Q123 → 123 ; -1 pour tout ce qui n'est pas un identifiant d'élément.
+    """
+    if qid and qid[0] == "Q" and qid[1:].isdigit():
+        return int(qid[1:])
+    return -1
+
+
+# ───────────────────────────────────────
+# Titres et QID déjà présents dans WikiCarto.db
+# ───────────────────────────────────────
+class FiltreConnus:
+    """
+    Ensemble compact des entrées déjà en base, chargé une fois par processus :
+    - empreintes 64 bits des titres, triées, avec le numéro de QID correspondant ;
+    - numéros de QID triés.
+    Soit 16 octets par entrée ; les recherches se font par np.searchsorted sur tout un lot.
+    """
+
+    def __init__(self, cheminDb: str):
+        self.cheminDb = cheminDb
+        start = time.time()
+        lignes = self._lire(cheminDb)
+
+        titres = np.fromiter((hacherTitre(titre) for _, titre in lignes), dtype=np.uint64, count=len(lignes))
+        qids = np.fromiter((numeroQid(qid) for qid, _ in lignes), dtype=np.int64, count=len(lignes))
+        ordre = np.argsort(titres, kind="stable")
+        self.titres = titres[ordre]
+        self.qidsParTitre = qids[ordre]
+        self.qids = np.unique(qids[qids >= 0])
+
+        logger.info(f"[🧮 Filtre base] {len(lignes)} entrées connues chargées depuis {cheminDb} "
+                    f"en {time.time() - start:.2f}s ({self.titres.nbytes + self.qidsParTitre.nbytes + self.qids.nbytes} octets)")
+
+    @staticmethod
+    def _lire(cheminDb: str) -> list:
+        if not os.path.exists(cheminDb):
+            logger.warning(f"[⚠️ Filtre base] {cheminDb} introuvable : aucune entrée connue")
+            return []
+        conn = sqlite3.connect(f"file:{cheminDb}?mode=ro", uri=True, timeout=30)
+        try:
+            return conn.execute("SELECT qid, titre FROM EntreeHistorique WHERE titre IS NOT NULL").fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"[⚠️ Filtre base] Lecture impossible ({e}) : aucune entrée connue")
+            return []
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self.titres)
+
+    def qidsConnusParTitre(self, titres: Iterable[str]) -> Dict[str, str]:
+        """
+        {titre: qid} pour les titres déjà en base.
+        """
+        titres = list(titres)
+        if not titres or not len(self.titres):
+            return {}
+        empreintes = np.fromiter((hacherTitre(t) for t in titres), dtype=np.uint64, count=len(titres))
+        positions = np.searchsorted(self.titres, empreintes)
+        positions[positions == len(self.titres)] = 0
+        trouves = self.titres[positions] == empreintes
+        return {titres[i]: f"Q{self.qidsParTitre[positions[i]]}"
+                for i in np.flatnonzero(trouves) if self.qidsParTitre[positions[i]] >= 0}
+
+    def qidsConnus(self, qids: Iterable[str]) -> Set[str]:
+        qids = [q for q in qids if q]
+        if not qids or not len(self.qids):
+            return set()
+        numeros = np.fromiter((numeroQid(q) for q in qids), dtype=np.int64, count=len(qids))
+        trouves = np.isin(numeros, self.qids, assume_unique=False)
+        return {qids[i] for i in np.flatnonzero(trouves)}
+
+    def marquerParTitre(self, lignes: List) -> int:
+        """
+        Étape 2 : les lignes dont le titre est en base reçoivent leur QID et sont marquées `connue`.
+        """
+        connus = self.qidsConnusParTitre(ligne.titre for ligne in lignes if ligne.titre and not ligne.connue)
+        for ligne in lignes:
+            qid = connus.get(ligne.titre)
+            if qid and not ligne.connue:
+                ligne.qid = qid
+                ligne.connue = True
+        return len(connus)
+
+    def marquerParQid(self, lignes: List) -> int:
+        """
+        Étape 3 : rattrape les entrées connues sous un autre titre (renommage, redirection).
+        """
+        connus = self.qidsConnus(ligne.qid for ligne in lignes if not ligne.connue)
+        for ligne in lignes:
+            if ligne.qid in connus:
+                ligne.connue = True
+        return len(connus)
+
+
+# ───────────────────────────────────────
+# Instance partagée par les étapes 2 à 4
+# ───────────────────────────────────────
+_config = {"chemin": None}
+_instance = None
+
+
+def configurerFiltreConnus(cheminDb: Optional[str]):
+    global _instance
+    _config["chemin"] = cheminDb
+    _instance = None
+
+
+def obtenirFiltreConnus() -> Optional[FiltreConnus]:
+    """
+    None si le pré-filtre n'est pas activé (--filtreBase).
+    """
+    global _instance
+    if _config["chemin"] is None:
+        return None
+    if _instance is None:
+        _instance = FiltreConnus(_config["chemin"])
+    return _instance
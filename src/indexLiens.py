@@ -0,0 +1,342 @@
+import argparse
+import collections
+import gzip
+import logging
+import multiprocessing
+import os
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("wiki")
+
+
+CHEMIN_INDEX_LIENS_DEFAUT = "data/index/liens"
+NAMESPACE_ARTICLE = 0
+
+# Un tuple de VALUES (…),(…) : chaînes SQL avec échappements, nombres, NULL
+MOTIF_TUPLE = re.compile(r"\((?:'(?:[^'\\]|\\.)*'|[^'()])*\)")
+MOTIF_CHAMP = re.compile(r"'((?:[^'\\]|\\.)*)'|([^,()]+)")
+MOTIF_ECHAPPEMENT = re.compile(r"\\(.)")
+ECHAPPEMENTS = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+
+# ───────────────────────────────────────
+# Lecture en flux des dumps SQL (INSERT INTO `table` VALUES …)
+# ───────────────────────────────────────
+def _valeurSQL(chaine: Optional[str], brut: Optional[str]):
+    if chaine is not None:
+        return MOTIF_ECHAPPEMENT.sub(lambda m: ECHAPPEMENTS.get(m.group(1), m.group(1)), chaine)
+    brut = brut.strip()
+    if brut == "NULL":
+        return None
+    try:
+        return int(brut)
+    except ValueError:
+        return float(brut)
+
+
+def lireTuples(ligne: str) -> Iterator[tuple]:
+    debut = ligne.find(" VALUES ")
+    for tuple_sql in MOTIF_TUPLE.finditer(ligne, debut):
+        yield tuple(_valeurSQL(champ.group(1), champ.group(2)) for champ in MOTIF_CHAMP.finditer(tuple_sql.group(0)))
+
+
+def lignesInsert(chemin: str, table: str) -> Iterator[str]:
+    """
+    Chaque ligne INSERT d'un dump mysqldump contient quelques milliers de tuples.
+    """
+    prefixe = f"INSERT INTO `{table}` VALUES "
+    ouvrir = gzip.open if chemin.endswith(".gz") else open
+    with ouvrir(chemin, "rt", encoding="utf-8", errors="replace") as f:
+        for ligne in f:
+            if ligne.startswith(prefixe):
+                yield ligne
+
+
+def _titre(titre: str) -> str:
+    return titre.replace("_", " ")
+
+
+# Fonctions exécutées dans les processus de parsing : une ligne INSERT → données compactes
+def _extrairePages(ligne: str) -> list:
+    # page_id, page_namespace, page_title, page_is_redirect, …
+    return [(t[0], _titre(t[2]), t[3]) for t in lireTuples(ligne) if t[1] == NAMESPACE_ARTICLE]
+
+
+def _extraireCibles(ligne: str) -> list:
+    # lt_id, lt_namespace, lt_title
+    return [(t[0], _titre(t[2])) for t in lireTuples(ligne) if t[1] == NAMESPACE_ARTICLE]
+
+
+def _extraireLiens(ligne: str) -> list:
+    """
+    Schéma actuel : pl_from, pl_from_namespace, pl_target_id.
+    Ancien schéma (avant linktarget) : pl_from, pl_namespace, pl_title, pl_from_namespace.
+    """
+    liens = []
+    for t in lireTuples(ligne):
+        if len(t) == 3:
+            if t[1] == NAMESPACE_ARTICLE:
+                liens.append((t[0], t[2]))
+        elif t[3] == NAMESPACE_ARTICLE and t[1] == NAMESPACE_ARTICLE:
+            liens.append((t[0], _titre(t[2])))
+    return liens
+
+
+def parserEnParallele(lignes: Iterator[str], fonction, pool, enVolMax: int) -> Iterator[list]:
+    """
+    Répartit les lignes INSERT sur le pool en gardant au plus `enVolMax` lignes en vol (mémoire bornée),
+    et restitue les résultats dans l'ordre.
+    """
+    enVol = collections.deque()
+    for ligne in lignes:
+        enVol.append(pool.apply_async(fonction, (ligne,)))
+        if len(enVol) >= enVolMax:
+            yield enVol.popleft().get()
+    while enVol:
+        yield enVol.popleft().get()
+
+
+# ───────────────────────────────────────
+# Construction de l'index
+# ───────────────────────────────────────
+def _csr(origines: np.ndarray, destinations: np.ndarray, nbPages: int):
+    """
+    Liste d'adjacence compacte : voisins de i = valeurs[pointeurs[i]:pointeurs[i + 1]], triés.
+    """
+    ordre = np.lexsort((destinations, origines))
+    valeurs = destinations[ordre].astype(np.int32)
+    pointeurs = np.zeros(nbPages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origines, minlength=nbPages), out=pointeurs[1:])
+    return pointeurs, valeurs
+
+
+def construireIndexLiens(cheminPage: str, cheminPagelinks: str, cheminLinktarget: Optional[str] = None,
+                         repertoire: str = CHEMIN_INDEX_LIENS_DEFAUT, nbProcessus: Optional[int] = None) -> int:
+    """
+    Construit l'index des liens entre articles (espace de noms 0) depuis les dumps SQL frwiki.
+    Les pages sont numérotées dans l'ordre de leur titre encodé en UTF-8, ce qui permet de retrouver
+    un titre par dichotomie sans dictionnaire en mémoire à la lecture.
+    """
+    nbProcessus = nbProcessus or os.cpu_count() or 1
+    start = time.time()
+    os.makedirs(repertoire, exist_ok=True)
+
+    with multiprocessing.Pool(nbProcessus) as pool:
+        # 1. Pages
+        pageIds, titres, redirections = [], [], []
+        for pages in parserEnParallele(lignesInsert(cheminPage, "page"), _extrairePages, pool, 2 * nbProcessus):
+            for pageId, titre, redirection in pages:
+                pageIds.append(pageId)
+                titres.append(titre.encode("utf-8"))
+                redirections.append(bool(redirection))
+        logger.info(f"[🔗 Index liens] {len(titres)} pages lues")
+
+        ordreTitres = sorted(range(len(titres)), key=titres.__getitem__)
+        numeroParRang = np.empty(len(titres), dtype=np.int32)
+        numeroParRang[ordreTitres] = np.arange(len(titres), dtype=np.int32)
+        titresTries = [titres[i] for i in ordreTitres]
+        numeroParTitre = {titre.decode("utf-8"): numero for numero, titre in enumerate(titresTries)}
+
+        pageIds = np.array(pageIds, dtype=np.int64)
+        ordreIds = np.argsort(pageIds)
+        idsTries = pageIds[ordreIds]
+        numerosParId = numeroParRang[ordreIds]
+
+        def numerosDepuisIds(ids: np.ndarray):
+            position = np.clip(np.searchsorted(idsTries, ids), 0, len(idsTries) - 1)
+            trouves = idsTries[position] == ids
+            return numerosParId[position], trouves
+
+        # 2. Cibles des liens (linktarget) : lt_id → numéro de page
+        cibleIds, cibleNumeros = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        if cheminLinktarget:
+            ids, numeros = [], []
+            for cibles in parserEnParallele(lignesInsert(cheminLinktarget, "linktarget"), _extraireCibles, pool, 2 * nbProcessus):
+                for ltId, titre in cibles:
+                    numero = numeroParTitre.get(titre)
+                    if numero is not None:
+                        ids.append(ltId)
+                        numeros.append(numero)
+            ordre = np.argsort(np.array(ids, dtype=np.int64))
+            cibleIds = np.array(ids, dtype=np.int64)[ordre]
+            cibleNumeros = np.array(numeros, dtype=np.int32)[ordre]
+            logger.info(f"[🔗 Index liens] {len(cibleIds)} cibles de liens lues")
+
+        # 3. Liens, accumulés par morceaux de tableaux d'entiers
+        morceauxOrigines, morceauxDestinations = [], []
+        nbLiens = 0
+        for liens in parserEnParallele(lignesInsert(cheminPagelinks, "pagelinks"), _extraireLiens, pool, 2 * nbProcessus):
+            if not liens:
+                continue
+            sources = np.fromiter((l[0] for l in liens), dtype=np.int64, count=len(liens))
+            origines, trouvees = numerosDepuisIds(sources)
+
+            if isinstance(liens[0][1], str):
+                destinations = np.fromiter((numeroParTitre.get(l[1], -1) for l in liens), dtype=np.int64, count=len(liens))
+                valides = trouvees & (destinations >= 0)
+            else:
+                if not len(cibleIds):
+                    raise ValueError("pagelinks référence pl_target_id : le dump linktarget est nécessaire (--linktarget)")
+                cibles = np.fromiter((l[1] for l in liens), dtype=np.int64, count=len(liens))
+                position = np.clip(np.searchsorted(cibleIds, cibles), 0, len(cibleIds) - 1)
+                valides = trouvees & (cibleIds[position] == cibles)
+                destinations = cibleNumeros[position]
+
+            morceauxOrigines.append(origines[valides].astype(np.int32))
+            morceauxDestinations.append(destinations[valides].astype(np.int32))
+            nbLiens += int(valides.sum())
+        logger.info(f"[🔗 Index liens] {nbLiens} liens entre articles")
+
+    origines = np.concatenate(morceauxOrigines) if morceauxOrigines else np.empty(0, dtype=np.int32)
+    destinations = np.concatenate(morceauxDestinations) if morceauxDestinations else np.empty(0, dtype=np.int32)
+    nbPages = len(titresTries)
+
+    sortantsPtr, sortants = _csr(origines, destinations, nbPages)
+    entrantsPtr, entrants = _csr(destinations, origines, nbPages)
+
+    longueurs = np.fromiter((len(t) for t in titresTries), dtype=np.int64, count=nbPages)
+    decalages = np.zeros(nbPages + 1, dtype=np.int64)
+    np.cumsum(longueurs, out=decalages[1:])
+    tableaux = {
+        "titres": np.frombuffer(b"".join(titresTries), dtype=np.uint8),
+        "titres_decalages": decalages,
+        "redirections": np.array(redirections, dtype=bool)[ordreTitres],
+        "sortants_ptr": sortantsPtr,
+        "sortants": sortants,
+        "entrants_ptr": entrantsPtr,
+        "entrants": entrants,
+    }
+    for nom, tableau in tableaux.items():
+        np.save(os.path.join(repertoire, f"{nom}.npy"), tableau)
+
+    logger.info(f"[🔗 Index liens] Index écrit dans {repertoire} en {time.time() - start:.1f}s")
+    return nbLiens
+
+
+# ───────────────────────────────────────
+# Consultation de l'index
+# ───────────────────────────────────────
+class IndexLiens:
+    """
+    Index des liens entre articles, projeté en mémoire (mmap) : l'ouverture est immédiate
+    et chaque requête coûte une dichotomie sur les titres plus une tranche de tableau.
+    """
+
+    def __init__(self, repertoire: str = CHEMIN_INDEX_LIENS_DEFAUT):
+        if not os.path.exists(os.path.join(repertoire, "titres.npy")):
+            raise FileNotFoundError(f"Index des liens introuvable : {repertoire} (python -m src.indexLiens construire …)")
+        charger = lambda nom: np.load(os.path.join(repertoire, f"{nom}.npy"), mmap_mode="r")
+        self.titres = charger("titres")
+        self.decalages = charger("titres_decalages")
+        self.redirections = charger("redirections")
+        self.sortantsPtr = charger("sortants_ptr")
+        self.tabSortants = charger("sortants")
+        self.entrantsPtr = charger("entrants_ptr")
+        self.tabEntrants = charger("entrants")
+        self.nbPages = len(self.decalages) - 1
+
+    def _titreBrut(self, numero: int) -> bytes:
+        return self.titres[self.decalages[numero]:self.decalages[numero + 1]].tobytes()
+
+    def titre(self, numero: int) -> str:
+        return self._titreBrut(numero).decode("utf-8")
+
+    def numero(self, titre: str) -> Optional[int]:
+        cle = titre.replace("_", " ").encode("utf-8")
+        bas, haut = 0, self.nbPages
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            if self._titreBrut(milieu) < cle:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        return bas if bas < self.nbPages and self._titreBrut(bas) == cle else None
+
+    def estRedirection(self, titre: str) -> bool:
+        numero = self.numero(titre)
+        return numero is not None and bool(self.redirections[numero])
+
+    def _voisins(self, titre: str, pointeurs, valeurs) -> np.ndarray:
+        numero = self.numero(titre)
+        if numero is None:
+            return np.empty(0, dtype=np.int32)
+        return valeurs[pointeurs[numero]:pointeurs[numero + 1]]
+
+    def entrants(self, titre: str) -> List[str]:
+        """
+        Qui pointe vers `titre` (équivalent de list=backlinks restreint aux articles).
+        """
+        return [self.titre(n) for n in self._voisins(titre, self.entrantsPtr, self.tabEntrants)]
+
+    def sortants(self, titre: str) -> List[str]:
+        """
+        Vers quoi pointe `titre`.
+        """
+        return [self.titre(n) for n in self._voisins(titre, self.sortantsPtr, self.tabSortants)]
+
+    def nbEntrants(self, titre: str) -> int:
+        return len(self._voisins(titre, self.entrantsPtr, self.tabEntrants))
+
+    def lie(self, source: str, cible: str) -> bool:
+        numeroCible = self.numero(cible)
+        if numeroCible is None:
+            return False
+        voisins = self._voisins(source, self.sortantsPtr, self.tabSortants)
+        position = np.searchsorted(voisins, numeroCible)
+        return bool(position < len(voisins) and voisins[position] == numeroCible)
+
+
+# ───────────────────────────────────────
+# Instance partagée par l'étape 1
+# ───────────────────────────────────────
+_config = {"repertoire": None}
+_instance = None
+
+
+def configurerIndexLiens(repertoire: Optional[str]):
+    global _instance
+    _config["repertoire"] = repertoire
+    _instance = None
+
+
+def obtenirIndexLiens() -> Optional[IndexLiens]:
+    """
+    None en mode en ligne (aucun index configuré).
+    """
+    global _instance
+    if _config["repertoire"] is None:
+        return None
+    if _instance is None:
+        _instance = IndexLiens(_config["repertoire"])
+    return _instance
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index des liens entre articles depuis les dumps SQL frwiki")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    construire = sous.add_parser("construire", help="Construit l'index depuis page.sql.gz, pagelinks.sql.gz et linktarget.sql.gz")
+    construire.add_argument("page")
+    construire.add_argument("pagelinks")
+    construire.add_argument("--linktarget", default=None, help="Obligatoire pour les dumps récents (pagelinks par pl_target_id)")
+    construire.add_argument("--repertoire", default=CHEMIN_INDEX_LIENS_DEFAUT)
+    construire.add_argument("--processus", type=int, default=None)
+    entrants = sous.add_parser("entrants", help="Pages qui pointent vers un titre")
+    entrants.add_argument("titre")
+    entrants.add_argument("--repertoire", default=CHEMIN_INDEX_LIENS_DEFAUT)
+    sortants = sous.add_parser("sortants", help="Pages vers lesquelles pointe un titre")
+    sortants.add_argument("titre")
+    sortants.add_argument("--repertoire", default=CHEMIN_INDEX_LIENS_DEFAUT)
+    args = parser.parse_args()
+
+    if args.commande == "construire":
+        construireIndexLiens(args.page, args.pagelinks, args.linktarget, args.repertoire, args.processus)
+    else:
+        index = IndexLiens(args.repertoire)
+        titres = index.entrants(args.titre) if args.commande == "entrants" else index.sortants(args.titre)
+        print("\n".join(titres))
+        print(f"{len(titres)} page(s)")
@@ -0,0 +1,227 @@
+import argparse
+import bz2
+import collections
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger("wiki")
+
+
+CHEMIN_INDEX_DEFAUT = "data/index/wikidata.db"
+SITE = "frwiki"
+TAILLE_BLOC = 2000          # lignes du dump par tâche envoyée aux processus de parsing
+TAILLE_REQUETE = 500        # identifiants par SELECT … IN (…)
+TAILLE_LOT_HORS_LIGNE = 500 # lignes par lot des étapes 2 et 3 quand elles lisent l'index
+
+
+# ───────────────────────────────────────
+# Lecture du dump (une entité JSON par ligne)
+# ───────────────────────────────────────
+def ouvrirDump(chemin: str):
+    if chemin.endswith(".gz"):
+        return gzip.open(chemin, "rt", encoding="utf-8")
+    if chemin.endswith(".bz2"):
+        return bz2.open(chemin, "rt", encoding="utf-8")
+    return open(chemin, "r", encoding="utf-8")
+
+
+def lireBlocs(chemin: str, taille: int = TAILLE_BLOC) -> Iterator[List[str]]:
+    """
+    Découpe le dump en blocs de lignes. Le dump Wikidata est un tableau JSON dont chaque ligne
+    est une entité suivie d'une virgule ; les lignes "[" et "]" sont ignorées.
+    """
+    bloc = []
+    with ouvrirDump(chemin) as f:
+        for ligne in f:
+            if len(ligne) < 3:
+                continue
+            bloc.append(ligne)
+            if len(bloc) >= taille:
+                yield bloc
+                bloc = []
+    if bloc:
+        yield bloc
+
+
+def _valeur(claims: dict, propriete: str):
+    for claim in claims.get(propriete, []):
+        valeur = claim.get("mainsnak", {}).get("datavalue", {}).get("value")
+        if valeur is not None:
+            return valeur
+    return None
+
+
+def extraireEntites(bloc: List[str]) -> List[tuple]:
+    """
+    Exécuté dans les processus de parsing : ne garde que les éléments ayant un article sur frwiki.
+    Retourne des tuples (qid, titre, lat, lon, p31, nbLangues).
+    """
+    resultats = []
+    for ligne in bloc:
+        ligne = ligne.rstrip().rstrip(",")
+        try:
+            entite = json.loads(ligne)
+        except ValueError:
+            continue
+        sitelinks = entite.get("sitelinks") or {}
+        lien = sitelinks.get(SITE)
+        if not lien:
+            continue
+
+        claims = entite.get("claims") or {}
+        coord = _valeur(claims, "P625") or {}
+        p31 = (_valeur(claims, "P31") or {}).get("id")
+        resultats.append((entite.get("id"), lien.get("title"), coord.get("latitude"), coord.get("longitude"),
+                          p31, len(sitelinks)))
+    return resultats
+
+
+# ───────────────────────────────────────
+# Construction de l'index
+# ───────────────────────────────────────
+def construireIndex(cheminDump: str, cheminIndex: str = CHEMIN_INDEX_DEFAUT, nbProcessus: Optional[int] = None,
+                    tailleBloc: int = TAILLE_BLOC) -> int:
+    """
+    Parcourt le dump en une passe : la lecture / décompression reste dans ce processus,
+    le parsing JSON est réparti sur `nbProcessus` processus. Au plus 2 blocs par processus sont
+    en vol, la mémoire reste donc bornée quelle que soit la taille du dump.
+    """
+    nbProcessus = nbProcessus or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(cheminIndex) or ".", exist_ok=True)
+    temporaire = cheminIndex + ".tmp"
+    if os.path.exists(temporaire):
+        os.remove(temporaire)
+
+    conn = sqlite3.connect(temporaire)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE Entite (
+            qid TEXT PRIMARY KEY,
+            titre TEXT NOT NULL,
+            lat REAL,
+            lon REAL,
+            p31 TEXT,
+            nbLangues INTEGER
+        ) WITHOUT ROWID
+    """)
+
+    start = time.time()
+    nb = 0
+    nbBlocs = 0
+
+    def enregistrer(entites):
+        conn.executemany("INSERT OR REPLACE INTO Entite VALUES (?, ?, ?, ?, ?, ?)", entites)
+        return len(entites)
+
+    with multiprocessing.Pool(nbProcessus) as pool:
+        enVol = collections.deque()
+        for bloc in lireBlocs(cheminDump, tailleBloc):
+            enVol.append(pool.apply_async(extraireEntites, (bloc,)))
+            if len(enVol) >= 2 * nbProcessus:
+                nb += enregistrer(enVol.popleft().get())
+            nbBlocs += 1
+            if nbBlocs % 500 == 0:
+                logger.info(f"[📚 Index Wikidata] {nbBlocs * tailleBloc} lignes lues, {nb} entités indexées")
+        while enVol:
+            nb += enregistrer(enVol.popleft().get())
+
+    conn.execute("CREATE INDEX idx_entite_titre ON Entite(titre)")
+    conn.commit()
+    conn.close()
+    os.replace(temporaire, cheminIndex)
+
+    logger.info(f"[📚 Index Wikidata] {nb} entités indexées en {time.time() - start:.1f}s → {cheminIndex}")
+    return nb
+
+
+# ───────────────────────────────────────
+# Consultation de l'index
+# ───────────────────────────────────────
+class IndexWikidata:
+    """
+    Index en lecture seule, une connexion par thread (lots en parallèle).
+    """
+
+    def __init__(self, chemin: str):
+        if not os.path.exists(chemin):
+            raise FileNotFoundError(f"Index Wikidata introuvable : {chemin} (python -m src.indexWikidata construire …)")
+        self.chemin = chemin
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.chemin}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _selectionner(self, colonne: str, valeurs: List[str]) -> list:
+        lignes = []
+        for i in range(0, len(valeurs), TAILLE_REQUETE):
+            morceau = valeurs[i:i + TAILLE_REQUETE]
+            marqueurs = ",".join("?" * len(morceau))
+            lignes.extend(self._conn().execute(
+                f"SELECT qid, titre, lat, lon, p31, nbLangues FROM Entite WHERE {colonne} IN ({marqueurs})", morceau))
+        return lignes
+
+    def qidsParTitre(self, titres: List[str]) -> Dict[str, str]:
+        return {titre: qid for qid, titre, *_ in self._selectionner("titre", list(titres))}
+
+    def infosParQid(self, qids: List[str]) -> Dict[str, dict]:
+        """
+        Même format que BatchProcessingCoordonnees.recupererInfosWikidataBatchREST :
+        seuls les éléments ayant des coordonnées sont retournés.
+        """
+        return {
+            qid: {"lat": lat, "lon": lon, "p31": p31, "nbLangues": nbLangues}
+            for qid, _, lat, lon, p31, nbLangues in self._selectionner("qid", list(qids))
+            if lat is not None and lon is not None
+        }
+
+
+# ───────────────────────────────────────
+# Instance partagée par les étapes 2 et 3
+# ───────────────────────────────────────
+_config = {"chemin": None}
+_instance = None
+
+
+def configurerIndexWikidata(chemin: Optional[str]):
+    global _instance
+    _config["chemin"] = chemin
+    _instance = None
+
+
+def obtenirIndexWikidata() -> Optional[IndexWikidata]:
+    """
+    None en mode en ligne (aucun index configuré).
+    """
+    global _instance
+    if _config["chemin"] is None:
+        return None
+    if _instance is None:
+        _instance = IndexWikidata(_config["chemin"])
+    return _instance
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index local titre frwiki → QID, coordonnées, P31, nombre de sitelinks")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    construire = sous.add_parser("construire", help="Construit l'index depuis un dump latest-all.json(.gz|.bz2)")
+    construire.add_argument("dump")
+    construire.add_argument("index", nargs="?", default=CHEMIN_INDEX_DEFAUT)
+    construire.add_argument("--processus", type=int, default=None, help="Processus de parsing (défaut : nombre de cœurs)")
+    construire.add_argument("--tailleBloc", type=int, default=TAILLE_BLOC)
+    args = parser.parse_args()
+
+    if args.commande == "construire":
+        construireIndex(args.dump, args.index, args.processus, args.tailleBloc)
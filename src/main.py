@@ -1,4 +1,5 @@
 import argparse
+import multiprocessing
 import os
 import glob
 import time
@@ -9,12 +10,16 @@ import sys
 sys.ps1 = ">>> "
 sys.ps2 = "... "
 
-from src.wikiDataLoader import logger
-from src.wikiDataLoader_Etape1 import BatchProcessingTitresExtraction
-from src.wikiDataLoader_Etape2 import BatchProcessingQidDepuisWikipedia
-from src.wikiDataLoader_Etape3 import BatchProcessingCoordonnees
-from src.wikiDataLoader_Etape4 import BatchProcessingResumeDescription
-from src.wikiDataLoader_Etape5 import BatchProcessingInsertionBD
+from src.wikiDataLoader import logger, BatchWriterSQLite, configurerFormatLots, configurerLogs
+from src.wikiCache import configurerCache, CHEMIN_CACHE_DEFAUT
+from src.wikiTransport import configurerTransport
+from src.metriques import configurerMetriques, FORMATS_METRIQUES
+from src.profilage import configurerProfilage, MODES_PROFIL
+from src.pipeline import PipelineEnFlux, TAILLE_FILE_DEFAUT
+# Les modules d'étape, indexWikidata, indexLiens et filtreConnus (numpy, bs4, pyproj) sont importés à la demande :
+# un listener ne charge que l'étape qu'il exécute, et les index seulement si leur option est donnée.
+from src.surveillance import SurveillantRepertoire
+from src.fileBaux import FileBaux, DUREE_BAIL_DEFAUT, VERROU_ETAPE5
 
 
 REPERTOIRES_PAR_ETAPE = {
@@ -25,49 +30,60 @@ REPERTOIRES_PAR_ETAPE = {
     5: "data/step5_types/"
 }
 
+CHEMIN_BASE = "../shared-db/WikiCarto.db"
+
 
 # ───────────────────────────────────────
 # Fonctions de traitement (par étape ou par logique)
 # ───────────────────────────────────────
 
-def listener(run_id: str, step: int, pause: float):
-    dossier_source = REPERTOIRES_PAR_ETAPE[step - 1]
-    print(f"[👂 Listener actif] Étape {step} – Surveillance du répertoire : {dossier_source}")
+def traiterFichierEtape(run_id: str, step: int, chemin_complet: str, pause: float, concurrence: int = 1,
+                        writerBase: Optional[BatchWriterSQLite] = None):
+    if step == 2:
+        traiterQidDepuisWikipedia(runId=run_id, fichierInput=chemin_complet, pause=pause, concurrence=concurrence)
+    elif step == 3:
+        traiterCoordonnees(runId=run_id, fichierInput=chemin_complet, pause=pause, concurrence=concurrence)
+    elif step == 4:
+        traiterResumeDescription(runId=run_id, fichierInput=chemin_complet, pause=pause, concurrence=concurrence)
+    elif step == 5:
+        insertionBase(runId=run_id, fichierInput=chemin_complet, writer=writerBase)
+
+
+def ouvrirWriterBase(step: int) -> Optional[BatchWriterSQLite]:
+    # Étape 5 : une seule connexion SQLite pour tous les fichiers du listener
+    return BatchWriterSQLite(CHEMIN_BASE, persistante=True) if step == 5 else None
 
+
+def listener(run_id: str, step: int, pause: float, concurrence: int = 1):
+    dossier_source = REPERTOIRES_PAR_ETAPE[step - 1]
     nom_stop = f"{run_id}_STOP"
 
+    # Surveillance événementielle (inotify) avec repli sur un scan toutes les 5 secondes
+    surveillant = SurveillantRepertoire(dossier_source, nom_stop, intervalle=5)
+    print(f"[👂 Listener actif] Étape {step} – Surveillance du répertoire : {dossier_source} ({surveillant.mode})")
+    writerBase = ouvrirWriterBase(step)
+
     while True:
-        fichiers_tous = sorted(os.listdir(dossier_source))  # Inclut STOP et .json
-        fichiers_json = sorted(
-            [f for f in fichiers_tous if f.endswith(".json")],
-            key=lambda f: int(re.findall(r"batch_(\d+)", os.path.basename(f))[0])
-        )
+        chemin_complet = surveillant.prochainFichier()
 
-        for fichier in fichiers_json:
-            chemin_complet = os.path.join(dossier_source, fichier)
+        if chemin_complet is not None:
             print(f"[📥 Nouveau fichier détecté] {chemin_complet}")
 
-            if step == 2:
-                traiterQidDepuisWikipedia(runId=run_id, fichierInput=chemin_complet, pause=pause)
-            elif step == 3:
-                traiterCoordonnees(runId=run_id, fichierInput=chemin_complet, pause=pause)
-            elif step == 4:
-                traiterResumeDescription(runId=run_id, fichierInput=chemin_complet, pause=pause)
-            elif step == 5:
-                insertionBase(runId=run_id, fichierInput=chemin_complet)
+            traiterFichierEtape(run_id, step, chemin_complet, pause, concurrence, writerBase)
 
             # 📦 Archivage des fichiers JSON
             dossier_done = os.path.join(dossier_source, "Done")
             os.makedirs(dossier_done, exist_ok=True)
-            destination = os.path.join(dossier_done, os.path.basename(fichier))
+            destination = os.path.join(dossier_done, os.path.basename(chemin_complet))
             if os.path.exists(destination):
                 os.remove(destination)
             os.rename(chemin_complet, destination)
             print(f"[📦 Archivé] {chemin_complet} → {destination}")
+            continue
 
 
-        # 🛑 Gestion standard des autres étapes
-        if nom_stop in fichiers_tous:
+        # 🛑 Gestion standard des autres étapes : STOP reçu et plus aucun fichier en attente
+        if surveillant.stopRecu:
 
             print(f"[✅] Tous les fichiers traités. Fichier STOP détecté : {nom_stop}")
 
@@ -84,16 +100,121 @@ def listener(run_id: str, step: int, pause: float):
 
                 print(f"[➡️] Fichier STOP déplacé vers {dossier_suivant}")
 
+            surveillant.fermer()
+            if writerBase:
+                writerBase.fermer()
             break  # ✅ Fin du listener
 
-        time.sleep(5)
 
+def listenerBaux(run_id: str, step: int, pause: float, concurrence: int = 1, dureeBail: float = DUREE_BAIL_DEFAUT):
+    """
+    Variante du listener pour plusieurs workers (processus ou machines) sur le même répertoire :
+    chaque fichier est réservé par un bail avant traitement, les baux expirés sont remis en file,
+    et le STOP n'est transmis que lorsque plus aucun bail n'est en cours.
+    """
+    dossier_source = REPERTOIRES_PAR_ETAPE[step - 1]
+    nom_stop = f"{run_id}_STOP"
+
+    surveillant = SurveillantRepertoire(dossier_source, nom_stop, intervalle=5)
+    file = FileBaux(dossier_source, duree=dureeBail)
+    try:
+        # Heure du disque partagé : comparable aux traces laissées par les workers des autres machines
+        debut = file.maintenant()
+        print(f"[👂 Worker actif] Étape {step} – {file.worker} sur {dossier_source} ({surveillant.mode}, bail {dureeBail:.0f}s)")
+        if step != 5:
+            _traiterBaux(run_id, step, pause, concurrence, surveillant, file, nom_stop, debut)
+            return
+
+        # SQLite (WAL) ne supporte pas plusieurs écrivains sur un disque partagé : un seul worker
+        # de l'étape 5 toutes machines confondues, les autres restent en réserve
+        verrou = file.reserverExclusif(VERROU_ETAPE5)
+        if verrou is None:
+            print(f"[⏸️ Réserve] Verrou {VERROU_ETAPE5} détenu par un autre worker, en attente")
+        while verrou is None:
+            if file.stopTransmisDepuis(nom_stop, debut):
+                print(f"[✅] Worker {file.worker} terminé – aucun fichier traité (étape 5 tenue par un autre worker)")
+                return
+            time.sleep(min(5.0, dureeBail / 3))
+            verrou = file.reserverExclusif(VERROU_ETAPE5)
+        try:
+            with verrou:
+                print(f"[🔒 Verrou] {VERROU_ETAPE5} obtenu ({file.worker})")
+                _traiterBaux(run_id, step, pause, concurrence, surveillant, file, nom_stop, debut)
+        finally:
+            file.liberer(verrou)
+    finally:
+        file.fermer()
+        surveillant.fermer()
+
+
+def _traiterBaux(run_id: str, step: int, pause: float, concurrence: int, surveillant: SurveillantRepertoire,
+                 file: FileBaux, nom_stop: str, debut: float):
+    dossier_done = os.path.join(file.dossier, "Done")
+    dossier_suivant = REPERTOIRES_PAR_ETAPE[step] if step < len(REPERTOIRES_PAR_ETAPE) else None
+    writerBase = ouvrirWriterBase(step)
+    nbTraites = 0
+    try:
+        while True:
+            file.recupererExpires()
+            chemin_complet = surveillant.prochainFichier()
+
+            if chemin_complet is not None:
+                bail = file.reserver(chemin_complet)
+                if bail is None:
+                    continue  # pris par un autre worker
+                print(f"[📥 Bail obtenu] {bail.nom} ({file.worker})")
+                with bail:
+                    traiterFichierEtape(run_id, step, bail.chemin, pause, concurrence, writerBase)
+                file.terminer(bail, dossier_done)
+                nbTraites += 1
+                print(f"[📦 Archivé] {bail.nom} → {dossier_done}")
+                continue
+
+            if file.stopTransmisDepuis(nom_stop, debut):
+                break
+
+            if surveillant.stopRecu:
+                if file.toutEstTermine():
+                    if file.transmettreStop(nom_stop, dossier_suivant):
+                        print(f"[➡️] Tous les baux terminés, fichier STOP transmis" + (f" vers {dossier_suivant}" if dossier_suivant else ""))
+                    break
+                # Baux encore en cours ailleurs : on reste disponible pour ceux qui expireraient
+                surveillant.attendre()
+    finally:
+        if writerBase:
+            writerBase.fermer()
+    print(f"[✅] Worker {file.worker} terminé – {nbTraites} fichier(s) traité(s)")
+
+
+def lancerWorkers(run_id: str, step: int, pause: float, concurrence: int, nbWorkers: int, dureeBail: float):
+    if step == 5 and nbWorkers > 1:
+        # Entre machines, c'est le verrou step5.lock de listenerBaux qui garantit l'écrivain unique
+        logger.warning("[⚠️ Workers] L'insertion SQLite (étape 5) reste sur un seul worker.")
+        nbWorkers = 1
+
+    processus = [
+        multiprocessing.Process(target=listenerBaux, args=(run_id, step, pause, concurrence, dureeBail), name=f"etape{step}-{i}")
+        for i in range(nbWorkers)
+    ]
+    for p in processus:
+        p.start()
+    for p in processus:
+        p.join()
 
 
 # ───────────────────────────────────────
 # Fonctions de traitement (par étape ou par logique)
 # ───────────────────────────────────────
-def traiter_extraction_titres(runId: str, pause: float = 0.1, max_lignes: Optional[int] = None):
+def lancerTraitement(processor, concurrence: int = 1):
+    # Au-delà d'un lot en vol, les lots sont répartis sur un pool de threads
+    if concurrence > 1:
+        processor.executerEnParallele(concurrence)
+    else:
+        processor.executer()
+
+
+def traiter_extraction_titres(runId: str, pause: float = 0.1, max_lignes: Optional[int] = None, concurrence: int = 1):
+    from src.wikiDataLoader_Etape1 import BatchProcessingTitresExtraction
     print(f"[Étape 1] Extraction par backlink – Run: {runId} | max={max_lignes}")
     processor = BatchProcessingTitresExtraction(
         runId=runId,
@@ -101,31 +222,34 @@ def traiter_extraction_titres(runId: str, pause: float = 0.1, max_lignes: Option
         pause=pause,
         max_lignes=max_lignes
     )
-    processor.executer()
+    lancerTraitement(processor, concurrence)
 
 
-def traiterQidDepuisWikipedia(runId: str, fichierInput: str, pause: float):
+def traiterQidDepuisWikipedia(runId: str, fichierInput: str, pause: float, concurrence: int = 1):
+    from src.wikiDataLoader_Etape2 import BatchProcessingQidDepuisWikipedia
     print(f"[Étape 2] Extraction des QID – Run: {runId} | Input file: {fichierInput}")
     batch = BatchProcessingQidDepuisWikipedia(
         runId=runId,
         dossierSortie=REPERTOIRES_PAR_ETAPE[2],
         fichierInput=fichierInput,
         pause=pause)
-    batch.executer()
+    lancerTraitement(batch, concurrence)
 
 
-def traiterCoordonnees(runId: str, fichierInput: str, pause: float = 0.1):
+def traiterCoordonnees(runId: str, fichierInput: str, pause: float = 0.1, concurrence: int = 1):
+    from src.wikiDataLoader_Etape3 import BatchProcessingCoordonnees
     processor = BatchProcessingCoordonnees(
         runId=runId,
         fichierInput=fichierInput,
         dossierSortie=REPERTOIRES_PAR_ETAPE[3],
         pause=pause
     )
-    processor.executer()
+    lancerTraitement(processor, concurrence)
     print(f"[✅] Traitement terminé pour : {fichierInput}")
 
 
-def traiterResumeDescription(runId: str, fichierInput: str, pause: float = 0.1):
+def traiterResumeDescription(runId: str, fichierInput: str, pause: float = 0.1, concurrence: int = 1):
+    from src.wikiDataLoader_Etape4 import BatchProcessingResumeDescription
     print(f"[Étape 4] Enrichissement résumé/description – Run: {runId} | Input: {fichierInput}")
     processor = BatchProcessingResumeDescription(
         runId=runId,
@@ -133,37 +257,114 @@ def traiterResumeDescription(runId: str, fichierInput: str, pause: float = 0.1):
         dossierSortie=REPERTOIRES_PAR_ETAPE[4],
         pause=pause
     )
-    processor.executer()
+    lancerTraitement(processor, concurrence)
     print(f"[✅] Traitement terminé pour : {fichierInput}")
 
 
-def insertionBase(runId: str, fichierInput: str):
+def insertionBase(runId: str, fichierInput: str, writer: Optional[BatchWriterSQLite] = None):
+    from src.wikiDataLoader_Etape5 import BatchProcessingInsertionBD
     batch = BatchProcessingInsertionBD(
         runId = runId,
         fichierInput = fichierInput,
-        db = "../shared-db/WikiCarto.db")
+        db = CHEMIN_BASE,
+        writer = writer)
     batch.executer()
 
 
+def lireConcurrencesEtapes(texte: Optional[str]) -> dict:
+    """
+    Convertit "2=4,4=8" en {2: 4, 4: 8}.
+    """
+    concurrences = {}
+    if texte:
+        for morceau in texte.split(","):
+            etape, nb = morceau.split("=")
+            concurrences[int(etape)] = int(nb)
+    return concurrences
+
+
+def traiterPipeline(runId: str, pause: float = 0.1, max_lignes: Optional[int] = None,
+                    concurrences: Optional[dict] = None, tailleFile: int = TAILLE_FILE_DEFAUT, checkpoints: bool = False):
+    print(f"[Pipeline] Étapes 1 à 5 en flux – Run: {runId} | max={max_lignes}")
+    pipeline = PipelineEnFlux(
+        runId=runId,
+        repertoires=REPERTOIRES_PAR_ETAPE,
+        cheminDb=CHEMIN_BASE,
+        concurrences=concurrences,
+        tailleFile=tailleFile,
+        checkpoints=checkpoints,
+        pause=pause,
+        max_lignes=max_lignes
+    )
+    return pipeline.executer()
+
+
 
 # ───────────────────────────────────────
 # 5. Main logique
 # ───────────────────────────────────────
-def main(runId:str, step:int, pause:int = 0.1, maxLignes:int = None):
+def main(runId:str, step:int, pause:int = 0.1, maxLignes:int = None, cache: bool = True, cheminCache: str = CHEMIN_CACHE_DEFAUT,
+         concurrence: int = 1, pipeline: bool = False, concurrencesEtapes: Optional[dict] = None,
+         tailleFile: int = TAILLE_FILE_DEFAUT, checkpoints: bool = False,
+         workers: int = 1, baux: bool = False, dureeBail: float = DUREE_BAIL_DEFAUT, indexWikidata: Optional[str] = None,
+         indexLiens: Optional[str] = None, formatLots: str = "jsonl",
+         filtreBase: bool = False, metriques: Optional[str] = None, formatMetriques: str = "prom",
+         profil: Optional[str] = None):
+
+    # 📝 Journal logs/wiki_api.log (rien n'est ouvert à l'import des modules)
+    configurerLogs()
+    # 🗄️ Cache persistant des réponses HTTP
+    configurerCache(actif=cache, chemin=cheminCache)
+    # 🚦 Débit par hôte : `pause` est l'intervalle minimal entre deux requêtes vers un même hôte
+    configurerTransport(pauseMin=pause, taillePool=max(16, concurrence, *(concurrencesEtapes or {}).values()))
+    # 📚 Étapes 2 et 3 hors ligne, depuis l'index construit sur un dump Wikidata
+    if indexWikidata:
+        from src.indexWikidata import configurerIndexWikidata
+        configurerIndexWikidata(indexWikidata)
+    # 🔗 Étape 1 : backlinks depuis l'index construit sur les dumps SQL frwiki
+    if indexLiens:
+        from src.indexLiens import configurerIndexLiens
+        configurerIndexLiens(indexLiens)
+    # 🧱 Format des fichiers batch écrits par les étapes 1 à 4 (la lecture suit l'extension du fichier)
+    configurerFormatLots(formatLots)
+    # 🧮 Étapes 2 à 4 : les titres / QID déjà présents dans WikiCarto.db ne repassent pas par le réseau
+    if filtreBase:
+        from src.filtreConnus import configurerFiltreConnus
+        configurerFiltreConnus(CHEMIN_BASE)
+    # 📊 Compteurs par étape et par endpoint, exportés pour node_exporter (textfile) ou en JSON
+    configurerMetriques(metriques, formatMetriques, runId=runId, nom="pipeline" if pipeline else f"etape{step}")
+    # 🔬 Profilage de chaque exécution d'étape, rapports dans logs/profile/
+    configurerProfilage(profil)
+
+    # 🚰 Toutes les étapes dans un seul processus, reliées par des files bornées
+    if pipeline:
+        traiterPipeline(
+            runId=runId,
+            pause=pause,
+            max_lignes=maxLignes,
+            concurrences=concurrencesEtapes,
+            tailleFile=tailleFile,
+            checkpoints=checkpoints
+        )
 
     # 🔁 Scan automatique du répertoire (listener actif)
-    if step == 1:
+    elif step == 1:
         traiter_extraction_titres(
             runId=runId,
             pause=pause,
-            max_lignes=maxLignes
+            max_lignes=maxLignes,
+            concurrence=concurrence
         )
 
-    elif step in [2,5]:
-        listener(run_id=runId, step=step, pause=pause)
+    # 👷 Plusieurs workers sur le même répertoire (même machine ou machines partageant le disque)
+    elif step in [2, 3, 4, 5] and (workers > 1 or baux):
+        lancerWorkers(run_id=runId, step=step, pause=pause, concurrence=concurrence, nbWorkers=workers, dureeBail=dureeBail)
+
+    elif step in [2, 3, 4, 5]:
+        listener(run_id=runId, step=step, pause=pause, concurrence=concurrence)
 
     else:
-        print(f"[ERREUR] Étape {args.step} non encore implémentée.")
+        print(f"[ERREUR] Étape {step} non encore implémentée.")
 
 # ───────────────────────────────────────
 # 6. Entrée du programme
@@ -172,9 +373,33 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Pipeline base historique géolocalisée")
     parser.add_argument("--runId", required=True, help="Identifiant du run")
-    parser.add_argument("--step", type=int, required=True, choices=range(1, 8))
-    parser.add_argument("--pause", type=float, default=0.1, help="Pause entre requêtes en secondes (anti-timeout)")
+    parser.add_argument("--step", type=int, choices=range(1, 8), help="Étape à exécuter (obligatoire hors --pipeline)")
+    parser.add_argument("--pause", type=float, default=0.1, help="Intervalle minimal entre deux requêtes vers un même hôte, en secondes")
     parser.add_argument("--maxLignes", type=int, default=None, help="Nombre maximum de lignes à traiter (debug/test uniquement)")
+    parser.add_argument("--sansCache", action="store_true", help="Désactive le cache persistant des réponses HTTP")
+    parser.add_argument("--cache", default=CHEMIN_CACHE_DEFAUT, help="Chemin de la base de cache des réponses HTTP")
+    parser.add_argument("--concurrence", type=int, default=1, help="Nombre de lots en vol simultanément (étapes 1 à 4, pool de threads si > 1)")
+    parser.add_argument("--pipeline", action="store_true", help="Enchaîne les étapes 1 à 5 dans un seul processus")
+    parser.add_argument("--concurrenceEtapes", default=None, help="Workers par étape en mode pipeline, ex : 2=4,3=4,4=8")
+    parser.add_argument("--tailleFile", type=int, default=TAILLE_FILE_DEFAUT, help="Lots en attente entre deux étapes en mode pipeline")
+    parser.add_argument("--checkpoints", action="store_true", help="Mode pipeline : écrit aussi chaque lot dans data/stepN_*/Done")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus workers sur l'étape (étapes 2 à 5, réservation par bail)")
+    parser.add_argument("--baux", action="store_true", help="Réservation par bail même avec un seul worker (plusieurs machines sur le même répertoire)")
+    parser.add_argument("--dureeBail", type=float, default=DUREE_BAIL_DEFAUT, help="Secondes sans battement de cœur avant qu'un fichier réservé soit remis en file")
+    parser.add_argument("--indexWikidata", default=None, help="Étapes 2 et 3 hors ligne : index construit par python -m src.indexWikidata construire")
+    parser.add_argument("--indexLiens", default=None, help="Étape 1 : backlinks depuis l'index construit par python -m src.indexLiens construire")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="Format des fichiers batch entre étapes (parquet : pyarrow requis)")
+    parser.add_argument("--filtreBase", action="store_true", help="Étapes 2 à 4 : saute les titres / QID déjà en base (seule l'association source_backlink est enregistrée)")
+    parser.add_argument("--metriques", default=None, help="Répertoire où réécrire l'instantané des métriques (ex : répertoire textfile de node_exporter)")
+    parser.add_argument("--formatMetriques", choices=list(FORMATS_METRIQUES), default="prom", help="Format de l'instantané : texte Prometheus ou JSON")
+    parser.add_argument("--profile", choices=MODES_PROFIL, default=None, help="Profile chaque fichier traité (cpu, wall ou mem), rapports dans logs/profile/")
     args = parser.parse_args()
-    main(args.runId, args.step, args.pause, args.maxLignes)
+    if args.step is None and not args.pipeline:
+        parser.error("--step est obligatoire hors mode --pipeline")
+    main(args.runId, args.step, args.pause, args.maxLignes, cache=not args.sansCache, cheminCache=args.cache,
+         concurrence=args.concurrence, pipeline=args.pipeline, concurrencesEtapes=lireConcurrencesEtapes(args.concurrenceEtapes),
+         tailleFile=args.tailleFile, checkpoints=args.checkpoints, workers=args.workers, baux=args.baux, dureeBail=args.dureeBail,
+         indexWikidata=args.indexWikidata, indexLiens=args.indexLiens, formatLots=args.format,
+         filtreBase=args.filtreBase, metriques=args.metriques, formatMetriques=args.formatMetriques,
+         profil=args.profile)
 
@@ -0,0 +1,307 @@
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger("wiki")
+
+
+# Bornes des histogrammes de latence (secondes), au sens Prometheus : « inférieur ou égal à »
+BORNES_LATENCE = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FORMATS_METRIQUES = {"prom": ".prom", "json": ".json"}
+INTERVALLE_DEFAUT = 15.0
+
+
+def endpointDe(url: str, params: Optional[dict] = None) -> str:
+    """
+    Nom court et de cardinalité bornée d'un appel : query.backlinks, query.pageprops, parse,
+    wbgetentities, rest.summary, entitydata, sparql…
+    """
+    morceaux = urlsplit(url)
+    chemin = morceaux.path
+    if chemin.endswith("/api.php"):
+        params = params or dict(parse_qsl(morceaux.query))
+        action = params.get("action", "?")
+        if action == "query":
+            parties = [str(params[cle]) for cle in ("list", "prop", "generator", "meta") if params.get(cle)]
+            return "query." + "+".join(parties) if parties else "query"
+        return action
+    if "/rest_v1/" in chemin:
+        segments = chemin.split("/rest_v1/", 1)[1].split("/")
+        return "rest." + (segments[1] if segments[0] == "page" and len(segments) > 1 else segments[0])
+    if "Special:EntityData" in chemin:
+        return "entitydata"
+    if chemin.endswith("/sparql"):
+        return "sparql"
+    return "autre"
+
+
+def _echapper(valeur) -> str:
+    return str(valeur).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# ───────────────────────────────────────
+# Registre des métriques du processus
+# ───────────────────────────────────────
+class StatsEndpoint:
+    __slots__ = ("requetes", "octets", "somme", "buckets", "statuts")
+
+    def __init__(self):
+        self.requetes = 0
+        self.octets = 0
+        self.somme = 0.0
+        self.buckets = [0] * (len(BORNES_LATENCE) + 1)   # dernier : +Inf
+        self.statuts: Dict[str, int] = {}
+
+    def observer(self, statut: str, octets: int, duree: float):
+        self.requetes += 1
+        self.octets += octets
+        self.somme += duree
+        self.statuts[statut] = self.statuts.get(statut, 0) + 1
+        for i, borne in enumerate(BORNES_LATENCE):
+            if duree <= borne:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Borne supérieure du bucket contenant le quantile `q` (inf au-delà de la dernière borne).
+        """
+        seuil = q * self.requetes
+        cumul = 0
+        for borne, nb in zip(BORNES_LATENCE + (float("inf"),), self.buckets):
+            cumul += nb
+            if cumul >= seuil:
+                return borne
+        return float("inf")
+
+
+class RegistreMetriques:
+    """
+    Compteurs alimentés par requeteWikiMedia / requeteSPARQL et par la fin de chaque exécution d'étape :
+    - requêtes par (étape, hôte, endpoint) : nombre, statuts, octets, histogramme de latence ;
+    - relances (429, 503, maxlag) et temps passé à attendre un Retry-After ou le seau à jetons ;
+    - lignes lues, écrites et rejetées par étape.
+    Avec un `chemin`, un instantané est réécrit toutes les `intervalle` secondes (et à la sortie du processus),
+    au format texte Prometheus (collecteur textfile de node_exporter) ou JSON.
+    """
+
+    def __init__(self, chemin: Optional[str] = None, etiquettes: Optional[dict] = None,
+                 intervalle: float = INTERVALLE_DEFAUT):
+        self.chemin = chemin
+        self.format = "json" if chemin and chemin.endswith(".json") else "prom"
+        self.etiquettes = dict(etiquettes or {})
+        self.intervalle = intervalle
+        self.debut = time.time()
+
+        self.endpoints: Dict[tuple, StatsEndpoint] = {}
+        self.relances: Dict[tuple, int] = {}
+        self.attentesRelance: Dict[tuple, float] = {}
+        self.attentesDebit: Dict[tuple, float] = {}
+        self.lignes: Dict[int, list] = {}
+
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+        if self.chemin:
+            self._thread = threading.Thread(target=self._boucle, name="metriques", daemon=True)
+            self._thread.start()
+            atexit.register(self.ecrire)
+
+    # ───── Alimentation ─────
+    def observerRequete(self, etape: int, url: str, params: Optional[dict], statut, octets: int, duree: float,
+                        relances=(), attenteRelance: float = 0.0, attenteDebit: float = 0.0):
+        hote = urlsplit(url).netloc.lower()
+        cle = (etape, hote, endpointDe(url, params))
+        with self._verrou:
+            stats = self.endpoints.get(cle)
+            if stats is None:
+                stats = self.endpoints[cle] = StatsEndpoint()
+            stats.observer(str(statut), octets, duree)
+            for motif in relances:
+                self.relances[(etape, hote, motif)] = self.relances.get((etape, hote, motif), 0) + 1
+            if attenteRelance:
+                self.attentesRelance[(etape, hote)] = self.attentesRelance.get((etape, hote), 0.0) + attenteRelance
+            if attenteDebit:
+                self.attentesDebit[(etape, hote)] = self.attentesDebit.get((etape, hote), 0.0) + attenteDebit
+
+    def observerReponse(self, etape: int, url: str, params: Optional[dict], response, duree: float):
+        """
+        Raccourci pour une réponse du transport (qui y attache relances et attentes).
+        """
+        self.observerRequete(etape, url, params, response.status_code, len(response.content or b""), duree,
+                             getattr(response, "relances", ()), getattr(response, "attenteRelance", 0.0),
+                             getattr(response, "attenteDebit", 0.0))
+
+    def observerLignes(self, etape: int, entrees: int, sorties: int, rejetees: int):
+        with self._verrou:
+            compteurs = self.lignes.setdefault(etape, [0, 0, 0])
+            compteurs[0] += entrees
+            compteurs[1] += sorties
+            compteurs[2] += rejetees
+
+    # ───── Lecture ─────
+    def resume(self, etape: int) -> Optional[str]:
+        """
+        Ligne de log par étape : endpoints triés par temps cumulé, depuis le lancement du processus.
+        """
+        with self._verrou:
+            stats = sorted(((cle[2], s) for cle, s in self.endpoints.items() if cle[0] == etape),
+                           key=lambda e: -e[1].somme)
+            relances = sum(nb for cle, nb in self.relances.items() if cle[0] == etape)
+            attente = sum(s for cle, s in self.attentesRelance.items() if cle[0] == etape)
+        if not stats:
+            return None
+        details = " ; ".join(
+            f"{endpoint} {s.requetes} req {s.somme:.1f}s (moy {s.somme / s.requetes:.2f}s, p95 ≤ {s.quantile(0.95):g}s"
+            + (f", {s.requetes - s.statuts.get('200', 0)} non-200" if s.statuts.get("200", 0) != s.requetes else "") + ")"
+            for endpoint, s in stats)
+        return f"[📊 Requêtes étape {etape}] {details} | {relances} relance(s), {attente:.0f}s d'attente Retry-After"
+
+    def instantane(self) -> dict:
+        with self._verrou:
+            return {
+                "etiquettes": self.etiquettes,
+                "debut": self.debut,
+                "date": time.time(),
+                "bornesLatence": list(BORNES_LATENCE),
+                "requetes": [
+                    {"etape": e, "hote": h, "endpoint": ep, "requetes": s.requetes, "octets": s.octets,
+                     "dureeTotale": round(s.somme, 4), "statuts": dict(s.statuts), "buckets": list(s.buckets)}
+                    for (e, h, ep), s in sorted(self.endpoints.items())
+                ],
+                "relances": [{"etape": e, "hote": h, "motif": m, "nombre": nb} for (e, h, m), nb in sorted(self.relances.items())],
+                "attentesRelance": [{"etape": e, "hote": h, "secondes": round(s, 3)} for (e, h), s in sorted(self.attentesRelance.items())],
+                "attentesDebit": [{"etape": e, "hote": h, "secondes": round(s, 3)} for (e, h), s in sorted(self.attentesDebit.items())],
+                "lignes": [{"etape": e, "entrees": c[0], "sorties": c[1], "rejetees": c[2]} for e, c in sorted(self.lignes.items())],
+            }
+
+    def textePrometheus(self) -> str:
+        instantane = self.instantane()
+        communes = instantane["etiquettes"]
+        sortie = []
+
+        def serie(nom, valeur, **etiquettes):
+            etiquettes = {**communes, **etiquettes}
+            texte = ",".join(f'{cle}="{_echapper(v)}"' for cle, v in etiquettes.items())
+            sortie.append(f"{nom}{{{texte}}} {valeur}")
+
+        def entete(nom, type_, aide):
+            sortie.append(f"# HELP {nom} {aide}")
+            sortie.append(f"# TYPE {nom} {type_}")
+
+        entete("wiki_requetes_total", "counter", "Requêtes HTTP par étape, hôte, endpoint et statut")
+        for r in instantane["requetes"]:
+            for statut, nb in sorted(r["statuts"].items()):
+                serie("wiki_requetes_total", nb, etape=r["etape"], hote=r["hote"], endpoint=r["endpoint"], statut=statut)
+
+        entete("wiki_reponse_octets_total", "counter", "Octets reçus par étape, hôte et endpoint")
+        for r in instantane["requetes"]:
+            serie("wiki_reponse_octets_total", r["octets"], etape=r["etape"], hote=r["hote"], endpoint=r["endpoint"])
+
+        entete("wiki_requete_duree_secondes", "histogram", "Durée des requêtes, relances et attentes comprises")
+        for r in instantane["requetes"]:
+            etiquettes = {"etape": r["etape"], "hote": r["hote"], "endpoint": r["endpoint"]}
+            cumul = 0
+            for borne, nb in zip(BORNES_LATENCE + ("+Inf",), r["buckets"]):
+                cumul += nb
+                serie("wiki_requete_duree_secondes_bucket", cumul, le=borne, **etiquettes)
+            serie("wiki_requete_duree_secondes_sum", r["dureeTotale"], **etiquettes)
+            serie("wiki_requete_duree_secondes_count", r["requetes"], **etiquettes)
+
+        entete("wiki_relances_total", "counter", "Réponses refusées par le serveur (429, 503, maxlag), relancées après attente")
+        for r in instantane["relances"]:
+            serie("wiki_relances_total", r["nombre"], etape=r["etape"], hote=r["hote"], motif=r["motif"])
+
+        entete("wiki_attente_relance_secondes_total", "counter", "Temps passé à attendre un Retry-After")
+        for r in instantane["attentesRelance"]:
+            serie("wiki_attente_relance_secondes_total", r["secondes"], etape=r["etape"], hote=r["hote"])
+
+        entete("wiki_attente_debit_secondes_total", "counter", "Temps passé à attendre un jeton du limiteur de débit")
+        for r in instantane["attentesDebit"]:
+            serie("wiki_attente_debit_secondes_total", r["secondes"], etape=r["etape"], hote=r["hote"])
+
+        entete("wiki_lignes_total", "counter", "Lignes lues, écrites et rejetées par étape")
+        for r in instantane["lignes"]:
+            for sens in ("entrees", "sorties", "rejetees"):
+                serie("wiki_lignes_total", r[sens], etape=r["etape"], sens=sens)
+
+        entete("wiki_metriques_date_secondes", "gauge", "Date de l'instantané")
+        serie("wiki_metriques_date_secondes", f"{instantane['date']:.0f}")
+        return "\n".join(sortie) + "\n"
+
+    # ───── Écriture ─────
+    def ecrire(self):
+        """
+        Réécrit l'instantané de façon atomique (fichier temporaire puis renommage).
+        """
+        if not self.chemin:
+            return
+        try:
+            contenu = (json.dumps(self.instantane(), ensure_ascii=False, indent=1) if self.format == "json"
+                       else self.textePrometheus())
+            os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+            temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+            with open(temporaire, "w", encoding="utf-8") as f:
+                f.write(contenu)
+            os.replace(temporaire, self.chemin)
+        except OSError as e:
+            logger.warning(f"[⚠️ Métriques] Écriture impossible dans {self.chemin} : {e}")
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle):
+            self.ecrire()
+
+    def arreter(self):
+        self._arret.set()
+        self.ecrire()
+
+
+# ───────────────────────────────────────
+# Instance partagée par le processus
+# ───────────────────────────────────────
+_config = {"dossier": None, "format": "prom", "runId": None, "nom": None, "intervalle": INTERVALLE_DEFAUT}
+_instance = None
+_pidInstance = None
+
+
+def configurerMetriques(dossier: Optional[str] = None, format: str = "prom", runId: Optional[str] = None,
+                        nom: Optional[str] = None, intervalle: float = INTERVALLE_DEFAUT):
+    """
+    `dossier` : répertoire scruté par node_exporter (--collector.textfile.directory) ou par un autre collecteur.
+    Sans dossier, les métriques restent en mémoire et ne servent qu'au résumé dans les logs.
+    """
+    global _instance
+    if format not in FORMATS_METRIQUES:
+        raise ValueError(f"Format de métriques inconnu : {format} ({', '.join(FORMATS_METRIQUES)})")
+    _config.update(dossier=dossier, format=format, runId=runId, nom=nom, intervalle=intervalle)
+    if _instance is not None:
+        _instance.arreter()
+        _instance = None
+
+
+def obtenirMetriques() -> RegistreMetriques:
+    """
+    Un registre par processus : un worker forké repart d'un registre vide, dans son propre fichier.
+    """
+    global _instance, _pidInstance
+    if _instance is None or _pidInstance != os.getpid():
+        processus = multiprocessing.current_process().name
+        etiquettes = {"run": _config["runId"] or "", "processus": _config["nom"] or processus}
+        chemin = None
+        if _config["dossier"]:
+            nom = "_".join(filter(None, ["wiki", _config["runId"], _config["nom"],
+                                         processus if processus != "MainProcess" else None]))
+            chemin = os.path.join(_config["dossier"], nom + FORMATS_METRIQUES[_config["format"]])
+            if processus != "MainProcess":
+                etiquettes["processus"] = processus
+        _instance = RegistreMetriques(chemin, etiquettes, _config["intervalle"])
+        _pidInstance = os.getpid()
+    return _instance
@@ -0,0 +1,225 @@
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.wikiDataLoader import BaseWriter, BatchWriterSQLite, EntreeHistorique, logger
+# Les modules d'étape (bs4, pyproj…) sont importés à la création des processeurs
+
+
+# Signal de fin de flux déposé dans une file (un par worker consommateur)
+FIN = None
+
+CONCURRENCE_DEFAUT = {1: 1, 2: 2, 3: 2, 4: 4, 5: 1}
+TAILLE_FILE_DEFAUT = 4      # nombre de lots en attente entre deux étapes
+TAILLE_LOT_DEFAUT = 50      # lignes par lot produit par l'étape 1
+
+
+# ───────────────────────────────────────
+# Reader / Writer en mémoire
+# ───────────────────────────────────────
+class LecteurMemoire:
+    """
+    Remplace BatchReaderJSON : le lot est déjà en mémoire, reçu depuis la file de l'étape précédente.
+    """
+
+    def __init__(self, fichierSource: str, lignes: List[EntreeHistorique]):
+        self.fichierSource = fichierSource
+        self.lignes = lignes
+
+    def loadLignes(self) -> List[EntreeHistorique]:
+        return self.lignes
+
+    def iterLignes(self):
+        return iter(self.lignes)
+
+
+class WriterFile(BaseWriter):
+    """
+    Remplace le BatchWriterJSON d'une étape : chaque lot sauvegardé est déposé dans la file
+    de l'étape suivante (appel bloquant si la file est pleine, d'où la contre-pression).
+    Avec `checkpoint`, le lot est aussi écrit (JSONL ou Parquet) dans <répertoire de l'étape>/Done,
+    comme s'il avait été produit puis consommé par les listeners.
+    """
+
+    def __init__(self, fileSortie: queue.Queue, writerJSON, checkpoint: bool = False, taille_batch: Optional[int] = None):
+        self.fileSortie = fileSortie
+        self.writerJSON = writerJSON
+        self.checkpoint = checkpoint
+        self.taille_batch = taille_batch if taille_batch is not None else writerJSON.taille_batch
+        self.lignes = []
+        self.nbAjouts = 0
+
+        if checkpoint:
+            self.writerJSON.dossier_sortie = os.path.join(writerJSON.dossier_sortie, "Done")
+            os.makedirs(self.writerJSON.dossier_sortie, exist_ok=True)
+
+    def ajouter(self, ligne):
+        self.nbAjouts += 1
+        self.lignes.append(ligne)
+        if self.taille_batch and len(self.lignes) >= self.taille_batch:
+            self._sauvegarder_batch()
+
+    def besoinSauvegarder(self):
+        return self.lignes
+
+    def _sauvegarder_batch(self):
+        # Même nommage que le BatchWriterJSON remplacé
+        if self.writerJSON.batch_unique:
+            nom = f"{self.writerJSON.nom_entree}{self.writerJSON.extension}"
+        else:
+            nom = f"{self.writerJSON.nom_entree}_batch_{self.writerJSON.compteur_fichier:03d}{self.writerJSON.extension}"
+
+        lignes = self.lignes
+        self.lignes = []
+        if self.checkpoint:
+            self.writerJSON.lignes = list(lignes)
+            self.writerJSON._sauvegarder_batch()
+        elif not self.writerJSON.batch_unique:
+            self.writerJSON.compteur_fichier += 1
+
+        self.fileSortie.put((nom, lignes))
+
+    def creerFichierStop(self):
+        # La fin de flux est signalée par l'orchestrateur (FIN dans la file)
+        pass
+
+
+# ───────────────────────────────────────
+# Orchestrateur
+# ───────────────────────────────────────
+class PipelineEnFlux:
+    """
+    Exécute les étapes 1 à 5 dans un seul processus. Les étapes sont reliées par des files bornées ;
+    chaque étape dispose de son propre nombre de workers. Chaque lot reçu est traité par une
+    instance neuve du BatchProcessing de l'étape, exactement comme un fichier batch par le listener.
+    """
+
+    def __init__(self, runId: str, repertoires: Dict[int, str], cheminDb: str,
+                 concurrences: Optional[Dict[int, int]] = None, tailleFile: int = TAILLE_FILE_DEFAUT,
+                 tailleLot: int = TAILLE_LOT_DEFAUT, checkpoints: bool = False,
+                 pause: float = 0.1, max_lignes: Optional[int] = None):
+        self.runId = runId
+        self.repertoires = repertoires
+        self.cheminDb = cheminDb
+        self.concurrences = dict(CONCURRENCE_DEFAUT)
+        if concurrences:
+            self.concurrences.update(concurrences)
+        if self.concurrences[5] != 1:
+            logger.warning("[⚠️ Pipeline] L'insertion SQLite (étape 5) reste sur un seul worker.")
+            self.concurrences[5] = 1
+        self.concurrences[1] = 1
+
+        self.tailleLot = tailleLot
+        self.checkpoints = checkpoints
+        self.pause = pause
+        self.max_lignes = max_lignes
+
+        # files[k] : entrée de l'étape k (k = 2..5)
+        self.files = {etape: queue.Queue(maxsize=tailleFile) for etape in range(2, 6)}
+        self.restants = dict(self.concurrences)
+        self.nbLots = {etape: 0 for etape in range(2, 6)}
+        self.nbErreurs = 0
+        self._verrou = threading.Lock()
+        self.writerBase = None   # connexion SQLite partagée par tous les lots de l'étape 5
+
+    # ───────────────────────────────────────
+    # Construction des processeurs
+    # ───────────────────────────────────────
+    def _brancherSortie(self, processor, etape: int, taille_batch: Optional[int] = None):
+        if etape < 5:
+            processor.writer = WriterFile(self.files[etape + 1], processor.writer, self.checkpoints, taille_batch)
+
+    def creerProcesseur(self, etape: int, nom: str, lignes: List[EntreeHistorique]):
+        fichierInput = os.path.join(self.repertoires[etape - 1], nom)
+        if etape == 2:
+            from src.wikiDataLoader_Etape2 import BatchProcessingQidDepuisWikipedia
+            processor = BatchProcessingQidDepuisWikipedia(runId=self.runId, fichierInput=fichierInput,
+                                                          dossierSortie=self.repertoires[2], pause=self.pause)
+        elif etape == 3:
+            from src.wikiDataLoader_Etape3 import BatchProcessingCoordonnees
+            processor = BatchProcessingCoordonnees(runId=self.runId, fichierInput=fichierInput,
+                                                   dossierSortie=self.repertoires[3], pause=self.pause)
+        elif etape == 4:
+            from src.wikiDataLoader_Etape4 import BatchProcessingResumeDescription
+            processor = BatchProcessingResumeDescription(runId=self.runId, fichierInput=fichierInput,
+                                                         dossierSortie=self.repertoires[4], pause=self.pause)
+        else:
+            from src.wikiDataLoader_Etape5 import BatchProcessingInsertionBD
+            if self.writerBase is None:
+                self.writerBase = BatchWriterSQLite(self.cheminDb, persistante=True)
+            processor = BatchProcessingInsertionBD(runId=self.runId, fichierInput=fichierInput, db=self.cheminDb,
+                                                   writer=self.writerBase)
+
+        processor.reader = LecteurMemoire(fichierInput, lignes)
+        self._brancherSortie(processor, etape)
+        return processor
+
+    # ───────────────────────────────────────
+    # Workers
+    # ───────────────────────────────────────
+    def _signalerFin(self, etape: int):
+        """
+        Appelée par chaque worker de `etape` qui se termine ; le dernier propage la fin de flux.
+        """
+        with self._verrou:
+            self.restants[etape] -= 1
+            dernier = self.restants[etape] == 0
+        if dernier and etape < 5:
+            for _ in range(self.concurrences[etape + 1]):
+                self.files[etape + 1].put(FIN)
+
+    def _workerEtape1(self):
+        try:
+            from src.wikiDataLoader_Etape1 import BatchProcessingTitresExtraction
+            processor = BatchProcessingTitresExtraction(runId=self.runId, dossierSortie=self.repertoires[1],
+                                                        pause=self.pause, max_lignes=self.max_lignes)
+            processor.desactiverReprise()
+            processor.writer.compteur_fichier = 1
+            self._brancherSortie(processor, 1, taille_batch=self.tailleLot)
+            processor.executer()
+        except Exception as e:
+            logger.exception(f"[❌ Pipeline] Étape 1 interrompue : {e}")
+            with self._verrou:
+                self.nbErreurs += 1
+        finally:
+            self._signalerFin(1)
+
+    def _workerEtape(self, etape: int):
+        try:
+            while True:
+                element = self.files[etape].get()
+                if element is FIN:
+                    break
+                nom, lignes = element
+                try:
+                    self.creerProcesseur(etape, nom, lignes).executer()
+                    with self._verrou:
+                        self.nbLots[etape] += 1
+                except Exception as e:
+                    logger.exception(f"[❌ Pipeline] Étape {etape}, lot {nom} en échec : {e}")
+                    with self._verrou:
+                        self.nbErreurs += 1
+        finally:
+            if etape == 5 and self.writerBase:
+                self.writerBase.fermer()   # même thread que celui qui l'a ouverte
+            self._signalerFin(etape)
+
+    def executer(self):
+        start = time.time()
+        threads = [threading.Thread(target=self._workerEtape1, name="etape1")]
+        for etape in range(2, 6):
+            for i in range(self.concurrences[etape]):
+                threads.append(threading.Thread(target=self._workerEtape, args=(etape,), name=f"etape{etape}-{i}"))
+
+        print(f"[🚰 Pipeline] Run {self.runId} – workers par étape : {self.concurrences}")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        duree = time.time() - start
+        print(f"[✅ Pipeline] {self.nbLots[5]} lot(s) insérés en {duree:.2f} secondes ({self.nbErreurs} erreur(s))")
+        logger.info(f"[⏱️ Perf] Pipeline {self.runId} : lots par étape {self.nbLots}, {self.nbErreurs} erreur(s), {duree:.2f} secondes")
+        return self.nbErreurs == 0
@@ -0,0 +1,273 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger("wiki")
+
+
+MODES_PROFIL = ("cpu", "wall", "mem")
+REPERTOIRE_PROFIL = "logs/profile"
+NB_FONCTIONS_RAPPORT = 40
+NB_CADRES_TRACEMALLOC = 25
+_ABSENT = object()
+
+# Méthodes chronométrées sur chaque BatchProcessing (si elles existent), en plus de PHASES_PROFIL de l'étape
+PHASES_COMMUNES = ("chargerEntrees", "taggerLigne", "traiterBatch", "traiterLigne", "requeteWikiMedia", "requeteSPARQL")
+
+
+# ───────────────────────────────────────
+# Temps par phase (exclusif : une phase imbriquée est retirée de la phase englobante)
+# ───────────────────────────────────────
+class ChronoPhases:
+
+    def __init__(self):
+        self.totaux = {}   # phase -> [appels, secondes]
+        self._local = threading.local()
+        self._verrou = threading.Lock()
+
+    @contextmanager
+    def mesurer(self, phase: str):
+        pile = getattr(self._local, "pile", None)
+        if pile is None:
+            pile = self._local.pile = []
+        cadre = [0.0]   # temps passé dans les phases imbriquées
+        pile.append(cadre)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - t0
+            pile.pop()
+            if pile:
+                pile[-1][0] += duree
+            with self._verrou:
+                total = self.totaux.setdefault(phase, [0, 0.0])
+                total[0] += 1
+                total[1] += duree - cadre[0]
+
+    def envelopper(self, phase: str, fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            with self.mesurer(phase):
+                return fonction(*args, **kwargs)
+        return enveloppe
+
+    def iterer(self, phase: str, iterable):
+        """
+        Chronomètre chaque next() : les lectures paresseuses (chargerEntrees) sont comptées au fil de l'eau.
+        """
+        iterateur = iter(iterable or ())
+        while True:
+            with self.mesurer(phase):
+                try:
+                    element = next(iterateur)
+                except StopIteration:
+                    return
+            yield element
+
+    def tableau(self, dureeTotale: float) -> str:
+        lignes = [f"{'phase':<32} {'appels':>8} {'total (s)':>10} {'moy (ms)':>10} {'% durée':>8}"]
+        for phase, (appels, secondes) in sorted(self.totaux.items(), key=lambda e: -e[1][1]):
+            part = 100 * secondes / dureeTotale if dureeTotale else 0.0
+            lignes.append(f"{phase:<32} {appels:>8} {secondes:>10.3f} {1000 * secondes / appels:>10.3f} {part:>7.1f}%")
+        return "\n".join(lignes)
+
+
+class TransportChronometre:
+    """
+    Enveloppe du transport partagé, propre à un BatchProcessing : l'attente réseau devient la phase « reseau ».
+    """
+
+    def __init__(self, transport, chrono: ChronoPhases):
+        self._transport = transport
+        self.get = chrono.envelopper("reseau", transport.get)
+        self.post = chrono.envelopper("reseau", transport.post)
+
+    def __getattr__(self, nom):
+        return getattr(self._transport, nom)
+
+
+# ───────────────────────────────────────
+# Session de profilage : une exécution d'étape (un fichier batch)
+# ───────────────────────────────────────
+class SessionProfil:
+    """
+    - cpu : cProfile sur le temps CPU du thread (time.thread_time) ;
+    - wall : cProfile sur le temps réel, attente réseau comprise ;
+    - mem : instantanés tracemalloc au début et à la fin du fichier, pic de mémoire.
+    Dans tous les modes, les phases de executer() sont chronométrées séparément.
+    """
+
+    def __init__(self, mode: str, dossier: str, processor):
+        self.mode = mode
+        self.dossier = dossier
+        self.processor = processor
+        self.chrono = ChronoPhases()
+        self.profils = []
+        self._local = threading.local()
+        self._verrou = threading.Lock()
+        self._restaurations = []
+
+        source = getattr(getattr(processor, "reader", None), "fichierSource", None)
+        nom = f"{processor.runId}_step{processor.etape}"
+        if source:
+            nom += "_" + os.path.splitext(os.path.basename(source))[0]
+        self.base = os.path.join(dossier, nom)
+
+    def _remplacer(self, objet, attribut: str, valeur):
+        """
+        Attribut d'instance temporaire, retiré en fin de session (le writer SQLite de l'étape 5 sert à plusieurs fichiers).
+        """
+        avant = objet.__dict__.get(attribut, _ABSENT)
+        self._restaurations.append((objet, attribut, avant))
+        setattr(objet, attribut, valeur)
+
+    def instrumenter(self):
+        processor = self.processor
+        for phase in PHASES_COMMUNES + tuple(getattr(processor, "PHASES_PROFIL", ())):
+            methode = getattr(processor, phase, None)
+            if methode is None:
+                continue
+            if phase == "chargerEntrees":
+                chrono = self.chrono
+
+                def chargerEntrees(_methode=methode):
+                    with chrono.mesurer("chargerEntrees"):
+                        lignes = _methode()
+                    return chrono.iterer("chargerEntrees", lignes)
+                self._remplacer(processor, phase, chargerEntrees)
+            else:
+                self._remplacer(processor, phase, self.chrono.envelopper(phase, methode))
+
+        if processor.writer is not None:
+            self._remplacer(processor.writer, "_sauvegarder_batch",
+                            self.chrono.envelopper("writer._sauvegarder_batch", processor.writer._sauvegarder_batch))
+        if getattr(processor, "transport", None) is not None:
+            self._remplacer(processor, "transport", TransportChronometre(processor.transport, self.chrono))
+
+    def _nouveauProfil(self) -> Optional[cProfile.Profile]:
+        profil = cProfile.Profile(time.thread_time if self.mode == "cpu" else time.perf_counter)
+        try:
+            profil.enable()
+        except ValueError:
+            # Python ≥ 3.12 : un seul profileur actif à la fois (il couvre alors tous les threads)
+            return None
+        with self._verrou:
+            self.profils.append(profil)
+        return profil
+
+    def dansThread(self, fonction):
+        """
+        executerEnParallele : les lots s'exécutent dans un pool de threads, profilés chacun de leur côté.
+        """
+        if self.mode == "mem":
+            return fonction
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            profil = getattr(self._local, "profil", None)
+            if profil is None:
+                profil = self._local.profil = self._nouveauProfil()
+                if profil is None:
+                    return fonction(*args, **kwargs)
+            else:
+                profil.enable()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                profil.disable()
+        return enveloppe
+
+    def __enter__(self):
+        self.instrumenter()
+        self.debut = time.perf_counter()
+        if self.mode == "mem":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(NB_CADRES_TRACEMALLOC)
+            tracemalloc.reset_peak()
+            self.instantaneDebut = tracemalloc.take_snapshot()
+        else:
+            self._local.profil = self._nouveauProfil()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self.debut
+        if self.mode == "mem":
+            instantaneFin = tracemalloc.take_snapshot()
+            courant, pic = tracemalloc.get_traced_memory()
+        else:
+            for profil in self.profils:
+                profil.disable()
+        for objet, attribut, avant in reversed(self._restaurations):
+            if avant is _ABSENT:
+                delattr(objet, attribut)
+            else:
+                setattr(objet, attribut, avant)
+
+        os.makedirs(self.dossier, exist_ok=True)
+        rapport = io.StringIO()
+        rapport.write(f"Étape {self.processor.etape} – run {self.processor.runId} – mode {self.mode} – durée {duree:.3f}s\n\n")
+        rapport.write("Phases de executer() (temps réel exclusif, cumulé sur tous les threads) :\n")
+        rapport.write(self.chrono.tableau(duree) + "\n\n")
+
+        if self.mode == "mem":
+            rapport.write(f"Mémoire tracée : {courant / 1e6:.1f} Mo en fin de fichier, pic {pic / 1e6:.1f} Mo\n\n")
+            rapport.write("Allocations nettes entre le début et la fin du fichier :\n")
+            for stat in instantaneFin.compare_to(self.instantaneDebut, "lineno")[:NB_FONCTIONS_RAPPORT]:
+                rapport.write(f"{stat}\n")
+        else:
+            stats = self._fusionner()
+            if stats is not None:
+                stats.dump_stats(self.base + ".prof")
+                stats.stream = rapport
+                rapport.write(f"Fonctions par temps cumulé ({'CPU' if self.mode == 'cpu' else 'réel'}) :\n")
+                stats.sort_stats("cumulative").print_stats(NB_FONCTIONS_RAPPORT)
+
+        with open(self.base + ".txt", "w", encoding="utf-8") as f:
+            f.write(rapport.getvalue())
+
+        principales = sorted(self.chrono.totaux.items(), key=lambda e: -e[1][1])[:4]
+        resume = ", ".join(f"{phase} {secondes:.2f}s" for phase, (_, secondes) in principales)
+        logger.info(f"[🔬 Profil] Étape {self.processor.etape} ({self.mode}, {duree:.2f}s) : {resume} → {self.base}.txt")
+        return False
+
+    def _fusionner(self) -> Optional[pstats.Stats]:
+        stats = None
+        for profil in self.profils:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profil)
+                else:
+                    stats.add(profil)
+            except TypeError:
+                continue   # profileur sans aucun appel enregistré
+        return stats
+
+
+# ───────────────────────────────────────
+# Configuration partagée (--profile)
+# ───────────────────────────────────────
+_config = {"mode": None, "dossier": REPERTOIRE_PROFIL}
+
+
+def configurerProfilage(mode: Optional[str], dossier: str = REPERTOIRE_PROFIL):
+    if mode is not None and mode not in MODES_PROFIL:
+        raise ValueError(f"Mode de profilage inconnu : {mode} ({', '.join(MODES_PROFIL)})")
+    _config.update(mode=mode, dossier=dossier)
+
+
+def sessionProfil(processor) -> Optional[SessionProfil]:
+    """
+    None si --profile n'est pas demandé.
+    """
+    if _config["mode"] is None:
+        return None
+    return SessionProfil(_config["mode"], _config["dossier"], processor)
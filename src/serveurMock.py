@@ -0,0 +1,355 @@
+import argparse
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+from src.wikiCache import CacheRequetes
+
+logger = logging.getLogger("wiki")
+
+
+RACINE_DEFAUT = "Sujet Racine"
+HOTES_WIKIMEDIA = ("fr.wikipedia.org", "www.wikidata.org", "query.wikidata.org")
+P31_SYNTHETIQUES = ("Q5", "Q515", "Q484170", "Q16970", "Q23413", "Q178561")
+TAILLE_PAGE_BACKLINKS = 500
+
+
+# ───────────────────────────────────────
+# Wiki synthétique, entièrement déterminé par (nbPages, racine)
+# ───────────────────────────────────────
+class MondeSynthetique:
+    """
+    `nbPages` pages « Page 00000 »… pointant toutes vers la page racine :
+    - une page sur 10 est aussi liée depuis la racine (cross-référence de niveau 2),
+      la moitié d'entre elles contient un lien vers la racine (prop=links), un quart un lien réel dans le texte ;
+    - 2 % des pages n'ont pas de QID, 10 % sont géolocalisées hors de France ;
+    - 4 % n'ont pas d'extrait via action=query (repli sur l'API REST).
+    """
+
+    def __init__(self, nbPages: int = 2000, racine: str = RACINE_DEFAUT):
+        self.nbPages = nbPages
+        self.racine = racine
+        self.titres = [f"Page {i:05d}" for i in range(nbPages)]
+        self.numeros = {titre: i for i, titre in enumerate(self.titres)}
+
+    def numero(self, titre: str) -> Optional[int]:
+        return self.numeros.get(titre)
+
+    @staticmethod
+    def qid(i: int) -> Optional[str]:
+        return None if i % 50 == 7 else f"Q{100000 + i}"
+
+    @staticmethod
+    def numeroDepuisQid(qid: str) -> Optional[int]:
+        return int(qid[1:]) - 100000 if qid[1:].isdigit() and int(qid[1:]) >= 100000 else None
+
+    @staticmethod
+    def lieDepuisRacine(i: int) -> bool:
+        return i % 10 == 0
+
+    @staticmethod
+    def lienVersRacine(i: int) -> bool:
+        return i % 20 == 0
+
+    @staticmethod
+    def lienReelVersRacine(i: int) -> bool:
+        return i % 40 == 0
+
+    def entite(self, i: int) -> dict:
+        lon = 30.0 if i % 10 == 3 else -1.0 + (i % 100) / 10
+        return {
+            "id": self.qid(i),
+            "claims": {
+                "P625": [{"mainsnak": {"datavalue": {"value": {"latitude": 43.0 + (i % 70) / 10, "longitude": lon}}}}],
+                "P31": [{"mainsnak": {"datavalue": {"value": {"id": P31_SYNTHETIQUES[i % len(P31_SYNTHETIQUES)]}}}}],
+            },
+            "sitelinks": {f"wiki{k}": {"title": self.titres[i]} for k in range(i % 70)},
+        }
+
+    def extrait(self, i: int) -> str:
+        if i % 25 == 11:
+            return ""
+        return f"{self.titres[i]} est une page synthétique du benchmark. " * (1 + i % 5)
+
+    def htmlRacine(self) -> str:
+        liens = "".join(f'<li><a href="/wiki/{quote(t.replace(" ", "_"))}">{t}</a></li>'
+                        for i, t in enumerate(self.titres) if self.lieDepuisRacine(i))
+        return (f'<div class="mw-parser-output"><p>Introduction</p>'
+                f'<h2 id="Histoire">Histoire</h2><ul>{liens}</ul>'
+                f'<h2 id="Voir_aussi">Voir aussi</h2><p>Rien</p></div>')
+
+    def htmlPage(self, i: int) -> str:
+        lien = f'<a href="/wiki/{quote(self.racine.replace(" ", "_"))}">{self.racine}</a>'
+        if self.lienReelVersRacine(i):
+            corps = f"<p>Texte avec un {lien}.</p>"
+        else:
+            corps = f'<p>Texte sans lien.</p><div class="navbox">{lien}</div>'
+        return f'<div class="mw-parser-output">{corps}</div>'
+
+
+# ───────────────────────────────────────
+# Réponses par endpoint
+# ───────────────────────────────────────
+class RepondeurWikimedia:
+    def __init__(self, monde: MondeSynthetique):
+        self.monde = monde
+
+    def repondre(self, chemin: str, params: Dict[str, str]) -> Optional[dict]:
+        if chemin.endswith("/api.php"):
+            action = params.get("action")
+            if action == "query":
+                return self.query(params)
+            if action == "parse":
+                return self.parse(params)
+            if action == "wbgetentities":
+                return self.wbgetentities(params)
+            return None
+        if "/page/summary/" in chemin:
+            return self.summary(unquote(chemin.rsplit("/", 1)[1]).replace("_", " "))
+        if "Special:EntityData" in chemin:
+            qid = chemin.rsplit("/", 1)[1].split(".")[0]
+            return {"entities": {qid: {"labels": {"fr": {"language": "fr", "value": f"label {qid}"}}}}}
+        if chemin.endswith("/sparql"):
+            return {"head": {"vars": ["item"]}, "results": {"bindings": []}}
+        return None
+
+    def query(self, params: Dict[str, str]) -> dict:
+        monde = self.monde
+        if params.get("list") == "backlinks":
+            debut = int(params.get("blcontinue") or 0)
+            fin = min(monde.nbPages, debut + TAILLE_PAGE_BACKLINKS)
+            reponse = {"query": {"backlinks": [{"pageid": i + 1, "ns": 0, "title": monde.titres[i]} for i in range(debut, fin)]}}
+            if fin < monde.nbPages:
+                reponse["continue"] = {"blcontinue": str(fin), "continue": "-||"}
+            return reponse
+
+        titres = params.get("titles", "").split("|")
+        props = set(params.get("prop", "").split("|"))
+        pages = {}
+        for k, titre in enumerate(titres):
+            i = monde.numero(titre)
+            if i is None and titre != monde.racine:
+                pages[str(-1 - k)] = {"ns": 0, "title": titre, "missing": ""}
+                continue
+            page = {"pageid": (i if i is not None else -2) + 2, "ns": 0, "title": titre, "lastrevid": 1000 + (i or 0)}
+            if "links" in props and i is not None and monde.lienVersRacine(i):
+                page["links"] = [{"ns": 0, "title": monde.racine}]
+            if "pageprops" in props and i is not None and monde.qid(i):
+                page["pageprops"] = {"wikibase_item": monde.qid(i)}
+            if "extracts" in props and i is not None:
+                page["extract"] = monde.extrait(i)
+                page["description"] = f"description de {titre}"
+            if "revisions" in props:
+                page["revisions"] = [{"slots": {"main": {"*": "Wikitexte synthétique."}}}]
+            pages[str(page["pageid"])] = page
+        return {"batchcomplete": "", "query": {"pages": pages}}
+
+    def parse(self, params: Dict[str, str]) -> dict:
+        monde = self.monde
+        titre = params.get("page", "")
+        i = monde.numero(titre)
+        if titre == monde.racine:
+            sections = [{"toclevel": 1, "level": "2", "line": "Histoire", "index": "1", "anchor": "Histoire"},
+                        {"toclevel": 1, "level": "2", "line": "Voir aussi", "index": "2", "anchor": "Voir_aussi"}]
+            html = monde.htmlRacine()
+        elif i is not None:
+            sections = []
+            html = monde.htmlPage(i)
+        else:
+            return {"error": {"code": "missingtitle", "info": "The page you specified doesn't exist."}}
+
+        resultat = {"title": titre, "pageid": (i if i is not None else -2) + 2}
+        props = params.get("prop", "").split("|")
+        if "sections" in props:
+            resultat["sections"] = sections
+        if "text" in props:
+            resultat["text"] = {"*": html}
+        return {"parse": resultat}
+
+    def wbgetentities(self, params: Dict[str, str]) -> dict:
+        entites = {}
+        for qid in params.get("ids", "").split("|"):
+            i = self.monde.numeroDepuisQid(qid)
+            if "labels" in params.get("props", "") and "claims" not in params.get("props", ""):
+                entites[qid] = {"id": qid, "labels": {"fr": {"language": "fr", "value": f"label {qid}"}}}
+            elif i is not None and 0 <= i < self.monde.nbPages:
+                entites[qid] = self.monde.entite(i)
+            else:
+                entites[qid] = {"id": qid, "missing": ""}
+        return {"entities": entites, "success": 1}
+
+    def summary(self, titre: str) -> dict:
+        return {"title": titre, "extract": f"Résumé REST de {titre}.", "description": f"description de {titre}"}
+
+
+class RepondeurEnregistre:
+    """
+    Rejoue des réponses réelles enregistrées dans un cache exporté (python -m src.wikiCache exporter),
+    sans tenir compte de leur expiration. Une requête absente du cache est confiée à `repli`.
+    """
+
+    def __init__(self, cheminCache: str, repli: Optional[RepondeurWikimedia] = None):
+        self.conn = sqlite3.connect(f"file:{cheminCache}?mode=ro", uri=True, check_same_thread=False)
+        self._verrou = threading.Lock()
+        self.repli = repli
+        self.nbRejouees = 0
+        self.nbManquantes = 0
+
+    @staticmethod
+    def hoteOrigine(chemin: str, params: Dict[str, str]) -> str:
+        if chemin.endswith("/sparql"):
+            return "query.wikidata.org"
+        if "Special:EntityData" in chemin or params.get("action") == "wbgetentities":
+            return "www.wikidata.org"
+        return "fr.wikipedia.org"
+
+    def repondre(self, chemin: str, params: Dict[str, str]) -> Optional[dict]:
+        # maxlag est ajouté par le transport, après le calcul de la clé de cache
+        params = {k: v for k, v in params.items() if k != "maxlag"}
+        url = f"https://{self.hoteOrigine(chemin, params)}{unquote(chemin)}"
+        with self._verrou:
+            row = self.conn.execute("SELECT corps FROM Reponse WHERE cle = ?", (CacheRequetes.cle(url, params),)).fetchone()
+            if row is not None:
+                self.nbRejouees += 1
+            else:
+                self.nbManquantes += 1
+        if row is not None:
+            return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        return self.repli.repondre(chemin, params) if self.repli else None
+
+
+# ───────────────────────────────────────
+# Serveur HTTP local
+# ───────────────────────────────────────
+class ServeurMock:
+    """
+    Serveur HTTP local (thread d'arrière-plan) qui se fait passer pour fr.wikipedia.org,
+    www.wikidata.org et query.wikidata.org. `latence` (secondes, ± `gigue`) est ajoutée à chaque
+    réponse ; une requête sur `taux429` reçoit un 429 avec Retry-After: 0.
+    Avec `enregistrements`, les réponses réelles d'un cache exporté sont rejouées en priorité.
+    À brancher via configurerTransport(substitutions=serveur.substitutions()).
+    """
+
+    def __init__(self, monde: MondeSynthetique, latence: float = 0.0, gigue: float = 0.0, taux429: float = 0.0,
+                 port: int = 0, graine: int = 0, enregistrements: Optional[str] = None):
+        self.repondeur = RepondeurWikimedia(monde)
+        if enregistrements:
+            self.repondeur = RepondeurEnregistre(enregistrements, repli=self.repondeur)
+        self.latence = latence
+        self.gigue = gigue
+        self.taux429 = taux429
+        self.aleatoire = random.Random(graine)
+        self.compteurs = Counter()
+        self._verrou = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._classeHandler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        hote, port = self.httpd.server_address[:2]
+        return f"http://{hote}:{port}"
+
+    def substitutions(self) -> Dict[str, str]:
+        return {hote: self.url for hote in HOTES_WIKIMEDIA}
+
+    def _classeHandler(self):
+        serveur = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, l'ACK retardé ajoute ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                serveur._traiter(self, dict(parse_qsl(urlsplit(self.path).query)))
+
+            def do_POST(self):
+                longueur = int(self.headers.get("Content-Length") or 0)
+                corps = self.rfile.read(longueur).decode("utf-8")
+                params = dict(parse_qsl(urlsplit(self.path).query))
+                params.update(parse_qsl(corps))
+                serveur._traiter(self, params)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _endpoint(self, chemin: str, params: Dict[str, str]) -> str:
+        if chemin.endswith("/api.php"):
+            return params.get("list") or params.get("action", "?") + (":" + params["prop"] if params.get("prop") else "")
+        if "/page/summary/" in chemin:
+            return "summary"
+        if "Special:EntityData" in chemin:
+            return "entitydata"
+        return chemin.rsplit("/", 1)[-1]
+
+    def _traiter(self, handler: BaseHTTPRequestHandler, params: Dict[str, str]):
+        chemin = urlsplit(handler.path).path
+        with self._verrou:
+            refuse = self.taux429 > 0 and self.aleatoire.random() < self.taux429
+            attente = max(0.0, self.latence + self.aleatoire.uniform(-self.gigue, self.gigue))
+            self.compteurs["429" if refuse else self._endpoint(chemin, params)] += 1
+        if attente:
+            time.sleep(attente)
+
+        if refuse:
+            statut, corps, entetes = 429, b"Too Many Requests", {"Retry-After": "0"}
+        else:
+            reponse = self.repondeur.repondre(chemin, params)
+            if reponse is None:
+                statut, corps, entetes = 404, b"{}", {}
+            else:
+                statut, corps, entetes = 200, json.dumps(reponse).encode("utf-8"), {}
+
+        handler.send_response(statut)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(corps)))
+        for nom, valeur in entetes.items():
+            handler.send_header(nom, valeur)
+        handler.end_headers()
+        handler.wfile.write(corps)
+
+    def demarrer(self) -> "ServeurMock":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="serveur-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant les API Wikipedia / Wikidata utilisées par le pipeline")
+    parser.add_argument("--pages", type=int, default=2000, help="Nombre de pages synthétiques liées à la racine")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence ajoutée à chaque réponse, en secondes")
+    parser.add_argument("--taux429", type=float, default=0.0, help="Proportion de requêtes refusées par un 429")
+    parser.add_argument("--racine", default=RACINE_DEFAUT, help="Titre de la page racine du wiki synthétique")
+    parser.add_argument("--enregistrements", default=None, help="Cache exporté dont les réponses sont rejouées en priorité")
+    args = parser.parse_args()
+
+    serveur = ServeurMock(MondeSynthetique(args.pages, args.racine), latence=args.latence, taux429=args.taux429,
+                          port=args.port, enregistrements=args.enregistrements)
+    print(f"[🧪 Mock] {serveur.url} – racine « {args.racine} », {args.pages} pages (Ctrl+C pour arrêter)")
+    try:
+        serveur.httpd.serve_forever()
+    except KeyboardInterrupt:
+        serveur.httpd.server_close()
@@ -0,0 +1,167 @@
+import ctypes
+import ctypes.util
+import heapq
+import os
+import re
+import select
+import struct
+import sys
+import time
+from typing import Optional
+
+from src.wikiDataLoader import logger
+
+
+# Fichiers batch publiés par les writers : <nom>_batch_NNN.json (JSONL) ou .parquet
+MOTIF_BATCH = re.compile(r"batch_(\d+)\.(?:json|parquet)$")
+
+# Masques inotify (cf. <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+TAILLE_EVENEMENT = struct.calcsize("iIII")
+
+
+class _Inotify:
+    """
+    Accès minimal à inotify via ctypes : un descripteur, une surveillance de répertoire.
+    """
+
+    def __init__(self, dossier: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(dossier), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            erreur = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(erreur, f"inotify_add_watch({dossier})")
+
+    def lire(self, timeout: float):
+        """
+        Retourne la liste des noms de fichiers publiés, ou None si la file d'événements a débordé.
+        """
+        pret, _, _ = select.select([self.fd], [], [], timeout)
+        if not pret:
+            return []
+        try:
+            donnees = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        noms = []
+        position = 0
+        while position + TAILLE_EVENEMENT <= len(donnees):
+            _, masque, _, longueur = struct.unpack_from("iIII", donnees, position)
+            position += TAILLE_EVENEMENT
+            nom = donnees[position:position + longueur].rstrip(b"\0")
+            position += longueur
+            if masque & IN_Q_OVERFLOW:
+                return None
+            if nom:
+                noms.append(os.fsdecode(nom))
+        return noms
+
+    def fermer(self):
+        os.close(self.fd)
+
+
+class SurveillantRepertoire:
+    """
+    Surveille le répertoire d'entrée d'une étape et tient une file ordonnée (par numéro de batch)
+    des fichiers publiés. Utilise inotify lorsque c'est possible, sinon un scan périodique.
+    Les fichiers qui ne suivent pas le motif *_batch_NNN.json / .parquet sont ignorés ; les fichiers en cours
+    d'écriture (temporaires .tmp) ne correspondent pas au motif.
+    """
+
+    def __init__(self, dossier: str, nom_stop: str, intervalle: float = 5.0, inotify: bool = True):
+        self.dossier = dossier
+        self.nom_stop = nom_stop
+        self.intervalle = intervalle
+        self.stopRecu = False
+
+        self.file = []          # tas de (numéro, nom)
+        self.enAttente = set()
+        self.ignores = set()
+
+        os.makedirs(dossier, exist_ok=True)
+        self.inotify = None
+        if inotify and sys.platform.startswith("linux"):
+            try:
+                self.inotify = _Inotify(dossier)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"[⚠️ Surveillance] inotify indisponible ({e}), repli sur un scan toutes les {intervalle}s")
+
+        # Fichiers déjà présents au démarrage
+        self._scanner()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify else "scan"
+
+    def _signaler(self, nom: str):
+        if nom == self.nom_stop:
+            self.stopRecu = True
+            return
+        correspondance = MOTIF_BATCH.search(nom)
+        if not correspondance:
+            if nom.endswith((".json", ".parquet")) and nom not in self.ignores:
+                self.ignores.add(nom)
+                logger.warning(f"[⚠️ Surveillance] Fichier ignoré (hors motif batch_NNN) : {nom}")
+            return
+        if nom in self.enAttente:
+            return
+        self.enAttente.add(nom)
+        heapq.heappush(self.file, (int(correspondance.group(1)), nom))
+
+    def _scanner(self):
+        for nom in os.listdir(self.dossier):
+            if os.path.isfile(os.path.join(self.dossier, nom)):
+                self._signaler(nom)
+
+    def _attendreEvenements(self, timeout: float):
+        if self.inotify:
+            noms = self.inotify.lire(timeout)
+            if noms is None:
+                logger.warning("[⚠️ Surveillance] Débordement inotify, nouveau scan du répertoire")
+                self._scanner()
+                return
+            for nom in noms:
+                self._signaler(nom)
+        else:
+            time.sleep(timeout)
+            self._scanner()
+
+    def prochainFichier(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Retourne le prochain fichier batch à traiter (chemin complet), en attendant au plus `timeout`
+        secondes qu'un fichier soit publié. Retourne None si rien n'est arrivé dans ce délai.
+        """
+        timeout = self.intervalle if timeout is None else timeout
+        limite = time.monotonic() + timeout
+        while not self.file:
+            restant = limite - time.monotonic()
+            if restant <= 0 or self.stopRecu:
+                return None
+            self._attendreEvenements(min(restant, self.intervalle))
+
+        _, nom = heapq.heappop(self.file)
+        self.enAttente.discard(nom)
+        chemin = os.path.join(self.dossier, nom)
+        if not os.path.exists(chemin):
+            # Déjà consommé (événement en double) : on passe au suivant
+            return self.prochainFichier(0)
+        return chemin
+
+    def attendre(self, timeout: Optional[float] = None):
+        """
+        Continue de recevoir les publications pendant `timeout` secondes, même après le STOP
+        (fichiers remis en file par l'expiration d'un bail).
+        """
+        self._attendreEvenements(self.intervalle if timeout is None else timeout)
+
+    def fermer(self):
+        if self.inotify:
+            self.inotify.fermer()
+            self.inotify = None
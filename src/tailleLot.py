@@ -0,0 +1,91 @@
+import logging
+import threading
+
+logger = logging.getLogger("wiki")
+
+
+# Nombre maximal d'identifiants / titres par requête documenté par l'API (utilisateur non-bot)
+LIMITE_API = {
+    "pageprops": 50,        # action=query&titles=…
+    "wbgetentities": 50,    # ids=Q1|Q2|…
+    "extracts": 20,         # prop=extracts avec exintro
+    "links": 50,
+}
+
+# Au-delà de cette longueur d'URL encodée, la requête api.php part en POST
+LONGUEUR_URL_MAX = 2000
+
+# Latence par requête au-delà de laquelle on réduit la taille des lots (secondes)
+LATENCE_CIBLE = 2.0
+LISSAGE = 0.3
+
+
+class ControleurTailleLot:
+    """
+    Choisit la taille des lots d'une étape : on part de la limite documentée de l'API, on divise
+    par deux à chaque lot en erreur ou tronqué (réponse avec `continue`), on réduit d'un quart si
+    la latence moyenne dépasse la cible, et on remonte progressivement tant que tout va bien.
+    Partagé entre les threads de executerEnParallele et entre les fichiers batch d'une étape.
+    """
+
+    def __init__(self, limite: int, minimum: int = 1, latenceCible: float = LATENCE_CIBLE):
+        self.limite = limite
+        self.minimum = minimum
+        self.latenceCible = latenceCible
+        self.taille = limite
+        self.pas = max(1, limite // 10)
+        self.latenceMoyenne = None
+        self.nbLots = 0
+        self.nbIncidents = 0
+        self._verrou = threading.Lock()
+
+    def observer(self, taille: int, duree: float, nbRequetes: int, nbErreurs: int = 0, nbTroncatures: int = 0):
+        with self._verrou:
+            self.nbLots += 1
+            if nbRequetes:
+                latence = duree / nbRequetes
+                if self.latenceMoyenne is None:
+                    self.latenceMoyenne = latence
+                else:
+                    self.latenceMoyenne = LISSAGE * latence + (1 - LISSAGE) * self.latenceMoyenne
+
+            ancienne = self.taille
+            if nbErreurs or nbTroncatures:
+                self.nbIncidents += 1
+                self.taille = max(self.minimum, min(self.taille, taille) // 2)
+            elif self.latenceMoyenne is not None and self.latenceMoyenne > self.latenceCible:
+                self.taille = max(self.minimum, int(self.taille * 0.75))
+            elif taille >= self.taille:
+                self.taille = min(self.limite, self.taille + self.pas)
+
+            if self.taille != ancienne:
+                logger.info(f"[📏 Lots] Taille {ancienne} → {self.taille} (erreurs={nbErreurs}, tronqués={nbTroncatures}, "
+                            f"latence={self.latenceMoyenne or 0:.2f}s)")
+
+    def resume(self) -> str:
+        return (f"[📏 Lots] Taille finale {self.taille}/{self.limite}, {self.nbLots} lot(s), "
+                f"{self.nbIncidents} incident(s), latence moyenne {self.latenceMoyenne or 0:.2f}s")
+
+
+# ───────────────────────────────────────
+# Contrôleurs partagés : un par étape pour tout le processus
+# ───────────────────────────────────────
+_instances = {}
+_verrouInstances = threading.Lock()
+
+
+def reinitialiserControleursTailleLot():
+    with _verrouInstances:
+        _instances.clear()
+
+
+def obtenirControleurTailleLot(etape: int, limite: int) -> ControleurTailleLot:
+    """
+    Listener, baux et pipeline créent un BatchProcessing par fichier ou par lot : le contrôleur de l'étape
+    leur survit, et la taille apprise sur les fichiers précédents s'applique aux suivants.
+    """
+    with _verrouInstances:
+        controleur = _instances.get(etape)
+        if controleur is None:
+            controleur = _instances[etape] = ControleurTailleLot(limite)
+        return controleur
@@ -0,0 +1,479 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+logger = logging.getLogger("wiki")
+
+
+CHEMIN_CACHE_DEFAUT = "data/cache/reponses_http.db"
+TAILLE_MAX_DEFAUT = 1_000_000_000  # 1 Go de réponses compressées
+
+# Durée de vie (en secondes) par type d'endpoint
+JOUR = 24 * 3600
+TTL_PAR_ENDPOINT = {
+    "backlinks": 1 * JOUR,
+    "parse": 7 * JOUR,
+    "revisions": 1 * JOUR,
+    "pageprops": 30 * JOUR,
+    "query": 7 * JOUR,
+    # prop=info porte lastrevid, clé des verdicts de l'étape 1 : toujours lu sur le réseau
+    "info": 0,
+    "wbgetentities": 7 * JOUR,
+    "summary": 7 * JOUR,
+    "entitydata": 30 * JOUR,
+    "sparql": 1 * JOUR,
+}
+TTL_DEFAUT = 1 * JOUR
+
+# Résolution titre → (titre canonique, pageid, QID) ; une page absente ou sans élément Wikidata
+# est retentée plus tôt (création d'article, ajout du lien Wikidata)
+TTL_RESOLUTION = TTL_PAR_ENDPOINT["pageprops"]
+TTL_RESOLUTION_NEGATIVE = 1 * JOUR
+TAILLE_REQUETE_CACHE = 500  # titres par SELECT … IN (…)
+SCHEMA_RESOLUTION = """
+    CREATE TABLE IF NOT EXISTS ResolutionTitre (
+        titre TEXT PRIMARY KEY,
+        canonique TEXT,
+        pageid INTEGER,
+        qid TEXT,
+        date_expiration REAL
+    ) WITHOUT ROWID
+"""
+
+
+# ───────────────────────────────────────
+# Normalisation des clés
+# ───────────────────────────────────────
+def normaliserUrl(url: str, params: Optional[dict] = None) -> str:
+    """
+    Construit une URL canonique : hôte en minuscules, paramètres de l'URL et de `params`
+    fusionnés, valeurs None supprimées, tri par nom de paramètre.
+    """
+    morceaux = urlsplit(url)
+    tous = parse_qsl(morceaux.query, keep_blank_values=True)
+    if params:
+        tous.extend((k, v) for k, v in params.items() if v is not None)
+    tous = sorted((str(k), str(v)) for k, v in tous)
+    requete = urlencode(tous)
+    base = f"{morceaux.scheme.lower()}://{morceaux.netloc.lower()}{morceaux.path}"
+    return f"{base}?{requete}" if requete else base
+
+
+def typeEndpoint(url: str, params: Optional[dict] = None) -> str:
+    """
+    Détermine la famille d'endpoint (clé de TTL_PAR_ENDPOINT) d'une requête.
+    """
+    morceaux = urlsplit(url)
+    chemin = morceaux.path
+    tous = dict(parse_qsl(morceaux.query))
+    if params:
+        tous.update({k: str(v) for k, v in params.items() if v is not None})
+
+    if "/sparql" in chemin:
+        return "sparql"
+    if "/page/summary/" in chemin:
+        return "summary"
+    if "Special:EntityData" in chemin:
+        return "entitydata"
+
+    action = tous.get("action")
+    if action == "parse":
+        return "parse"
+    if action == "wbgetentities":
+        return "wbgetentities"
+    if action == "query":
+        if tous.get("list") == "backlinks":
+            return "backlinks"
+        prop = tous.get("prop", "")
+        if "revisions" in prop:
+            return "revisions"
+        if "info" in prop.split("|"):
+            return "info"
+        if prop == "pageprops":
+            return "pageprops"
+        return "query"
+    return "autre"
+
+
+# ───────────────────────────────────────
+# Cache SQLite des réponses HTTP
+# ───────────────────────────────────────
+class CacheRequetes:
+    """
+    Cache persistant des réponses JSON de Wikipedia / Wikidata.
+    Les réponses sont stockées compressées dans une base SQLite, avec une durée
+    de vie par type d'endpoint et une éviction LRU au-delà de `taille_max` octets.
+    Un endpoint de durée de vie nulle n'est ni lu ni écrit.
+    """
+
+    def __init__(self, chemin_db: str = CHEMIN_CACHE_DEFAUT, taille_max: int = TAILLE_MAX_DEFAUT, ttl: Optional[dict] = None):
+        self.chemin_db = chemin_db
+        self.taille_max = taille_max
+        self.ttl = dict(TTL_PAR_ENDPOINT)
+        if ttl:
+            self.ttl.update(ttl)
+
+        self.hits = {}
+        self.misses = {}
+        self._verrou = threading.Lock()
+
+        dossier = os.path.dirname(chemin_db)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(chemin_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._creerSchema(self.conn)
+        self.tailleTotale = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM Reponse").fetchone()[0]
+
+    @staticmethod
+    def _creerSchema(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS Reponse (
+                cle TEXT PRIMARY KEY,
+                url TEXT,
+                endpoint TEXT,
+                corps BLOB,
+                taille INTEGER,
+                date_creation REAL,
+                date_expiration REAL,
+                dernier_acces REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reponse_acces ON Reponse(dernier_acces)")
+        conn.commit()
+
+    @staticmethod
+    def cle(url: str, params: Optional[dict] = None) -> str:
+        return hashlib.sha1(normaliserUrl(url, params).encode("utf-8")).hexdigest()
+
+    def lire(self, url: str, params: Optional[dict] = None):
+        """
+        Retourne la réponse JSON en cache, ou None si absente ou expirée.
+        """
+        endpoint = typeEndpoint(url, params)
+        if self.ttl.get(endpoint, TTL_DEFAUT) <= 0:
+            return None
+        cle = self.cle(url, params)
+        maintenant = time.time()
+
+        with self._verrou:
+            row = self.conn.execute(
+                "SELECT corps, date_expiration FROM Reponse WHERE cle = ?", (cle,)
+            ).fetchone()
+
+            if row is None or row[1] < maintenant:
+                self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+                return None
+
+            self.conn.execute("UPDATE Reponse SET dernier_acces = ? WHERE cle = ?", (maintenant, cle))
+            self.conn.commit()
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def ecrire(self, url: str, params: Optional[dict], donnees):
+        """
+        Enregistre une réponse JSON valide dans le cache.
+        """
+        endpoint = typeEndpoint(url, params)
+        if self.ttl.get(endpoint, TTL_DEFAUT) <= 0:
+            return
+        corps = zlib.compress(json.dumps(donnees, ensure_ascii=False).encode("utf-8"))
+        maintenant = time.time()
+        expiration = maintenant + self.ttl.get(endpoint, TTL_DEFAUT)
+        cle = self.cle(url, params)
+
+        with self._verrou:
+            ancienne = self.conn.execute("SELECT taille FROM Reponse WHERE cle = ?", (cle,)).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO Reponse (cle, url, endpoint, corps, taille, date_creation, date_expiration, dernier_acces)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (cle, normaliserUrl(url, params), endpoint, corps, len(corps), maintenant, expiration, maintenant))
+            self.tailleTotale += len(corps) - (ancienne[0] if ancienne else 0)
+
+            if self.tailleTotale > self.taille_max:
+                self._evincer()
+            self.conn.commit()
+
+    def _evincer(self):
+        """
+        Supprime les entrées les moins récemment lues jusqu'à repasser sous 90 % de la taille max.
+        Doit être appelée sous verrou.
+        """
+        cible = int(self.taille_max * 0.9)
+        self.conn.execute("DELETE FROM Reponse WHERE date_expiration < ?", (time.time(),))
+        self.tailleTotale = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM Reponse").fetchone()[0]
+
+        nbSupprimees = 0
+        while self.tailleTotale > cible:
+            lot = self.conn.execute(
+                "SELECT cle, taille FROM Reponse ORDER BY dernier_acces LIMIT 500"
+            ).fetchall()
+            if not lot:
+                break
+            for cle, taille in lot:
+                if self.tailleTotale <= cible:
+                    break
+                self.conn.execute("DELETE FROM Reponse WHERE cle = ?", (cle,))
+                self.tailleTotale -= taille
+                nbSupprimees += 1
+
+        logger.info(f"[🧹 Cache] {nbSupprimees} réponse(s) évincée(s), taille actuelle {self.tailleTotale} octets")
+
+    def purgerExpirees(self) -> int:
+        with self._verrou:
+            nb = self.conn.execute("DELETE FROM Reponse WHERE date_expiration < ?", (time.time(),)).rowcount
+            self.tailleTotale = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM Reponse").fetchone()[0]
+            self.conn.commit()
+        return nb
+
+    # ───────────────────────────────────────
+    # Statistiques
+    # ───────────────────────────────────────
+    def resume(self) -> str:
+        endpoints = sorted(set(self.hits) | set(self.misses))
+        details = ", ".join(f"{e}: {self.hits.get(e, 0)}/{self.hits.get(e, 0) + self.misses.get(e, 0)}" for e in endpoints)
+        total_hits = sum(self.hits.values())
+        total = total_hits + sum(self.misses.values())
+        return f"[🗄️ Cache] {total_hits}/{total} hits ({details})"
+
+    # ───────────────────────────────────────
+    # Export / import pour déplacer un cache chaud
+    # ───────────────────────────────────────
+    def exporter(self, chemin_export: str):
+        if os.path.exists(chemin_export):
+            os.remove(chemin_export)
+        with self._verrou:
+            self.conn.commit()
+            self.conn.execute("VACUUM INTO ?", (chemin_export,))
+        print(f"[📤 Cache] Exporté vers {chemin_export}")
+
+    def importer(self, chemin_import: str) -> int:
+        """
+        Fusionne un cache exporté : une entrée importée remplace l'entrée locale si elle est plus récente.
+        """
+        if not os.path.exists(chemin_import):
+            raise FileNotFoundError(f"[❌] Cache à importer introuvable : {chemin_import}")
+
+        with self._verrou:
+            self.conn.execute("ATTACH DATABASE ? AS source", (chemin_import,))
+            try:
+                avant = self.conn.total_changes
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO main.Reponse
+                    SELECT s.* FROM source.Reponse s
+                    LEFT JOIN main.Reponse m ON m.cle = s.cle
+                    WHERE m.cle IS NULL OR s.date_creation > m.date_creation
+                """)
+                nb = self.conn.total_changes - avant
+
+                # Résolutions de titres : la plus tardive à expirer l'emporte
+                if self.conn.execute("SELECT 1 FROM source.sqlite_master WHERE name = 'ResolutionTitre'").fetchone():
+                    self.conn.execute(SCHEMA_RESOLUTION.replace("ResolutionTitre", "main.ResolutionTitre"))
+                    self.conn.execute("""
+                        INSERT OR REPLACE INTO main.ResolutionTitre
+                        SELECT s.* FROM source.ResolutionTitre s
+                        LEFT JOIN main.ResolutionTitre m ON m.titre = s.titre
+                        WHERE m.titre IS NULL OR s.date_expiration > m.date_expiration
+                    """)
+                self.conn.commit()
+            finally:
+                self.conn.execute("DETACH DATABASE source")
+
+            self.tailleTotale = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM Reponse").fetchone()[0]
+            if self.tailleTotale > self.taille_max:
+                self._evincer()
+                self.conn.commit()
+
+        print(f"[📥 Cache] {nb} réponse(s) importée(s) depuis {chemin_import}")
+        return nb
+
+    def fermer(self):
+        with self._verrou:
+            self.conn.commit()
+            self.conn.close()
+
+
+# ───────────────────────────────────────
+# Verdicts de vérification de liens, par révision
+# ───────────────────────────────────────
+class CacheVerdictsLiens:
+    """
+    Mémorise, pour une page et une cible, si la page contient un lien réel vers la cible.
+    Un verdict n'est valable que pour la révision de la page sur laquelle il a été établi.
+    """
+
+    def __init__(self, chemin_db: str = CHEMIN_CACHE_DEFAUT):
+        dossier = os.path.dirname(chemin_db)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self._verrou = threading.Lock()
+        self.conn = sqlite3.connect(chemin_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS VerdictLien (
+                titre TEXT,
+                cible TEXT,
+                revid INTEGER,
+                verdict INTEGER,
+                PRIMARY KEY (titre, cible)
+            )
+        """)
+        self.conn.commit()
+
+    def lire(self, titre: str, cible: str, revid: int) -> Optional[bool]:
+        with self._verrou:
+            row = self.conn.execute(
+                "SELECT verdict FROM VerdictLien WHERE titre = ? AND cible = ? AND revid = ?", (titre, cible, revid)
+            ).fetchone()
+        return None if row is None else bool(row[0])
+
+    def ecrire(self, titre: str, cible: str, revid: int, verdict: bool):
+        with self._verrou:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO VerdictLien (titre, cible, revid, verdict) VALUES (?, ?, ?, ?)",
+                (titre, cible, revid, int(verdict))
+            )
+            self.conn.commit()
+
+    def fermer(self):
+        with self._verrou:
+            self.conn.close()
+
+
+# ───────────────────────────────────────
+# Résolution des titres (redirections, normalisation, QID)
+# ───────────────────────────────────────
+class CacheResolutionTitres:
+    """
+    Titre tel que reçu → (titre canonique, pageid, QID), alimenté par les blocs `normalized` et
+    `redirects` des requêtes pageprops. Interrogé en masse avant tout appel réseau : un titre déjà
+    résolu, même sans QID, ne repart pas vers l'API avant expiration.
+    """
+
+    def __init__(self, chemin_db: str = CHEMIN_CACHE_DEFAUT):
+        dossier = os.path.dirname(chemin_db)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self._verrou = threading.Lock()
+        self.conn = sqlite3.connect(chemin_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA_RESOLUTION)
+        self.conn.commit()
+
+    def lire(self, titres: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[int], Optional[str]]]:
+        titres = list(dict.fromkeys(titres))
+        maintenant = time.time()
+        resultats = {}
+        with self._verrou:
+            for i in range(0, len(titres), TAILLE_REQUETE_CACHE):
+                morceau = titres[i:i + TAILLE_REQUETE_CACHE]
+                marqueurs = ",".join("?" * len(morceau))
+                for titre, canonique, pageid, qid in self.conn.execute(
+                        f"SELECT titre, canonique, pageid, qid FROM ResolutionTitre "
+                        f"WHERE titre IN ({marqueurs}) AND date_expiration > ?", (*morceau, maintenant)):
+                    resultats[titre] = (canonique, pageid, qid)
+        return resultats
+
+    def ecrire(self, resolutions: Dict[str, Tuple[Optional[str], Optional[int], Optional[str]]]):
+        maintenant = time.time()
+        lignes = [(titre, canonique, pageid, qid, maintenant + (TTL_RESOLUTION if qid else TTL_RESOLUTION_NEGATIVE))
+                  for titre, (canonique, pageid, qid) in resolutions.items()]
+        with self._verrou:
+            self.conn.executemany("INSERT OR REPLACE INTO ResolutionTitre VALUES (?, ?, ?, ?, ?)", lignes)
+            self.conn.commit()
+
+    def fermer(self):
+        with self._verrou:
+            self.conn.close()
+
+
+# ───────────────────────────────────────
+# Instance partagée par tous les BatchProcessing
+# ───────────────────────────────────────
+_config = {"actif": True, "chemin": CHEMIN_CACHE_DEFAUT, "taille_max": TAILLE_MAX_DEFAUT}
+_instance = None
+_instanceVerdicts = None
+_instanceResolution = None
+
+
+def configurerCache(actif: bool = True, chemin: str = CHEMIN_CACHE_DEFAUT, taille_max: int = TAILLE_MAX_DEFAUT):
+    global _instance, _instanceVerdicts, _instanceResolution
+    _config.update(actif=actif, chemin=chemin, taille_max=taille_max)
+    if _instance is not None:
+        _instance.fermer()
+        _instance = None
+    if _instanceVerdicts is not None:
+        _instanceVerdicts.fermer()
+        _instanceVerdicts = None
+    if _instanceResolution is not None:
+        _instanceResolution.fermer()
+        _instanceResolution = None
+
+
+def obtenirCache() -> Optional[CacheRequetes]:
+    global _instance
+    if not _config["actif"]:
+        return None
+    if _instance is None:
+        _instance = CacheRequetes(_config["chemin"], _config["taille_max"])
+    return _instance
+
+
+def obtenirCacheVerdicts() -> Optional[CacheVerdictsLiens]:
+    global _instanceVerdicts
+    if not _config["actif"]:
+        return None
+    if _instanceVerdicts is None:
+        _instanceVerdicts = CacheVerdictsLiens(_config["chemin"])
+    return _instanceVerdicts
+
+
+def obtenirCacheResolution() -> Optional[CacheResolutionTitres]:
+    global _instanceResolution
+    if not _config["actif"]:
+        return None
+    if _instanceResolution is None:
+        _instanceResolution = CacheResolutionTitres(_config["chemin"])
+    return _instanceResolution
+
+
+# ───────────────────────────────────────
+# Commande d'administration : python -m src.wikiCache
+# ───────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion du cache des réponses Wikipedia / Wikidata")
+    parser.add_argument("commande", choices=["stats", "purger", "exporter", "importer"])
+    parser.add_argument("fichier", nargs="?", help="Fichier cible (exporter/importer)")
+    parser.add_argument("--cache", default=CHEMIN_CACHE_DEFAUT, help="Chemin de la base de cache")
+    args = parser.parse_args()
+
+    cache = CacheRequetes(args.cache)
+    if args.commande == "stats":
+        nb = cache.conn.execute("SELECT COUNT(*) FROM Reponse").fetchone()[0]
+        print(f"[🗄️ Cache] {nb} réponse(s), {cache.tailleTotale} octets")
+        for endpoint, n in cache.conn.execute("SELECT endpoint, COUNT(*) FROM Reponse GROUP BY endpoint"):
+            print(f"  {endpoint} → {n}")
+        resolution = CacheResolutionTitres(args.cache)
+        nb, nbQid = resolution.conn.execute("SELECT COUNT(*), COUNT(qid) FROM ResolutionTitre").fetchone()
+        print(f"[🗄️ Résolution titres] {nb} titre(s), dont {nbQid} avec QID")
+        resolution.fermer()
+    elif args.commande == "purger":
+        print(f"[🧹 Cache] {cache.purgerExpirees()} réponse(s) expirée(s) supprimée(s)")
+    elif args.commande in ("exporter", "importer"):
+        if not args.fichier:
+            parser.error(f"La commande {args.commande} attend un fichier.")
+        if args.commande == "exporter":
+            cache.exporter(args.fichier)
+        else:
+            cache.importer(args.fichier)
+    cache.fermer()
@@ -2,26 +2,65 @@
 # Imports
 # ───────────────────────────────────────
 import json
+import sys
 import time
 import os
 import sqlite3
-import requests
+import contextvars
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from abc import ABC, abstractmethod
 
-# Pour la conversion GP->Lambert
-from pyproj import Transformer
-transformer = Transformer.from_crs("EPSG:4326", "EPSG:2154", always_xy=True)
+# Codec JSON rapide si disponible, sinon module standard
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from src.wikiCache import obtenirCache
+from src.wikiTransport import obtenirTransport
+from src.metriques import obtenirMetriques
+from src.profilage import sessionProfil
+from src.tailleLot import ControleurTailleLot, LONGUEUR_URL_MAX
+
+# numpy, pyproj et pyarrow ne sont importés qu'à la première utilisation :
+# un listener de l'étape 5 ou un worker de courte durée ne paie que ce qu'il utilise.
+
+# Pour la conversion GP->Lambert (étape 3)
+_transformer = None
+
+
+def obtenirTransformer():
+    global _transformer
+    if _transformer is None:
+        from pyproj import Transformer
+        _transformer = Transformer.from_crs("EPSG:4326", "EPSG:2154", always_xy=True)
+    return _transformer
+
+
+def moduleOptionnel(nom: str):
+    """
+    Module d'une option hors ligne (indexLiens, indexWikidata, filtreConnus), ou None s'il n'a pas été importé.
+    Son configurer*() n'a alors pas pu être appelé : l'étape n'a pas à le charger (ni numpy) pour le savoir.
+    """
+    return sys.modules.get(nom)
 
 
 # ───────────────────────────────────────
 # Objets métier : LigneProcess, EntreeHistorique
 # ───────────────────────────────────────
-@dataclass
+@dataclass(slots=True)
 class LigneProcess:
+    """
+    Traçabilité d'une ligne. Les lignes d'un même lot partagent la même instance
+    (cf. processPartage) : elle ne doit pas être modifiée en place.
+    """
     run_id: str
     etape: int
     retry: int = 0
@@ -34,13 +73,31 @@ class LigneProcess:
         return {k: v for k, v in data.items() if v is not None}
 
 
-@dataclass
+# Une instance par (run_id, etape, retry), partagée par toutes les lignes concernées
+_processPartages = {}
+
+
+def processPartage(run_id: str, etape: int, retry: int = 0) -> LigneProcess:
+    cle = (run_id, etape, retry)
+    process = _processPartages.get(cle)
+    if process is None:
+        process = _processPartages[cle] = LigneProcess(run_id=run_id, etape=etape, retry=retry)
+    return process
+
+
+# Champs sérialisés, dans l'ordre des fichiers JSONL (process est inséré après crossReference)
+CHAMPS_AVANT_PROCESS = ("titre", "url", "qid", "source_backlink", "crossReference")
+CHAMPS_APRES_PROCESS = ("resume", "description", "p31", "lat", "lon", "x_l93", "y_l93", "nbLangues", "notoriete", "connue")
+CHAMPS_ENTREE = CHAMPS_AVANT_PROCESS + CHAMPS_APRES_PROCESS
+
+
+@dataclass(slots=True)
 class EntreeHistorique:
     titre: str
     url: str
     qid: Optional[str] = None
     source_backlink: Optional[str] = None
-    crossReference: Optional[bool] = None
+    crossReference: Optional[int] = None   # niveau de lien croisé 0 à 2 (étape 1)
     process: LigneProcess = None
     resume: Optional[str] = None
     description: Optional[str] = None
@@ -51,60 +108,43 @@ class EntreeHistorique:
     y_l93: Optional[float] = None
     nbLangues: Optional[int] = None
     notoriete: Optional[int] = None
+    # Déjà présente dans WikiCarto.db (cf. FiltreConnus) : seule l'association source_backlink sera enregistrée
+    connue: Optional[bool] = None
 
     def to_dict(self):
-        result = {
-            "titre": self.titre,
-            "url": self.url,
-            "qid": self.qid,
-            "source_backlink": self.source_backlink,
-            "crossReference": self.crossReference,
-            "process": self.process.to_dict(),
-            "resume": self.resume,
-            "description": self.description,
-            "p31": self.p31,
-            "lat": self.lat,
-            "lon": self.lon,
-            "x_l93": self.x_l93,
-            "y_l93": self.y_l93,
-            "nbLangues": self.nbLangues,
-            "notoriete": self.notoriete
-        }
-        # Supprimer les champs à valeur None pour plus de lisibilité
-        return {k: v for k, v in result.items() if v is not None}
+        # Un seul dictionnaire construit, sans les champs à valeur None pour plus de lisibilité
+        result = {}
+        for nom in CHAMPS_AVANT_PROCESS:
+            valeur = getattr(self, nom)
+            if valeur is not None:
+                result[nom] = valeur
+        if self.process is not None:
+            result["process"] = self.process.to_dict()
+        for nom in CHAMPS_APRES_PROCESS:
+            valeur = getattr(self, nom)
+            if valeur is not None:
+                result[nom] = valeur
+        return result
 
 
     @classmethod
     def fromDict(cls, data: dict):
-        process_data = data.get("process", {})
-        process = LigneProcess(
-            run_id=process_data.get("run_id", ""),
-            etape=process_data.get("etape", 0),
-)
-
-        return cls(
-            titre=data.get("titre"),
-            url=data.get("url"),
-            qid=data.get("qid"),
-            source_backlink = data.get("source_backlink"),
-            crossReference=data.get("crossReference"),
-            process=process,
-            resume=data.get("resume"),
-            description=data.get("description"),
-            p31=data.get("p31"),
-            lat=data.get("lat"),
-            lon=data.get("lon"),
-            x_l93=data.get("x_l93"),
-            y_l93=data.get("y_l93"),
-            nbLangues=data.get("nbLangues"),
-            notoriete=data.get("notoriete")
-        )
+        process_data = data.get("process") or {}
+        process = processPartage(process_data.get("run_id", ""), process_data.get("etape", 0))
+        get = data.get
+        # source_backlink et p31 ne prennent que quelques valeurs : une seule copie de chaque chaîne
+        source = get("source_backlink")
+        p31 = get("p31")
+        return cls(get("titre"), get("url"), get("qid"), source if source is None else sys.intern(source),
+                   get("crossReference"), process, get("resume"), get("description"),
+                   p31 if p31 is None else sys.intern(p31), get("lat"), get("lon"),
+                   get("x_l93"), get("y_l93"), get("nbLangues"), get("notoriete"), get("connue"))
 
 
 
     def convertirLambert93(self):
         if self.lat is not None and self.lon is not None:
-            self.x_l93, self.y_l93 = transformer.transform(self.lon, self.lat)
+            self.x_l93, self.y_l93 = obtenirTransformer().transform(self.lon, self.lat)
 
     def calculerNote(self):
         if self.nbLangues is None:
@@ -127,6 +167,120 @@ class EntreeHistorique:
         return 40.0 <= self.lat <= 51.0 and -6.0 <= self.lon <= 11.0
 
 
+# ───────────────────────────────────────
+# Lot en colonnes
+# ───────────────────────────────────────
+class LotEntrees:
+    """
+    Un lot entier sous forme de tableaux parallèles (une liste par champ), pour les traitements
+    qui travaillent colonne par colonne (projection, filtres numpy) ou les très gros fichiers.
+    Les lignes sont reconstruites à la demande ; process est commun à tout le lot.
+    """
+
+    __slots__ = ("colonnes", "process")
+
+    def __init__(self, process: Optional[LigneProcess] = None):
+        self.colonnes = {nom: [] for nom in CHAMPS_ENTREE}
+        self.process = process
+
+    @classmethod
+    def depuisEntrees(cls, entrees: List[EntreeHistorique]) -> "LotEntrees":
+        lot = cls(entrees[0].process if entrees else None)
+        for nom, colonne in lot.colonnes.items():
+            colonne.extend([getattr(e, nom) for e in entrees])
+        return lot
+
+    @classmethod
+    def depuisDicts(cls, donnees, process: Optional[LigneProcess] = None) -> "LotEntrees":
+        """
+        Remplit les colonnes directement depuis des dictionnaires JSON, sans objet intermédiaire.
+        """
+        lot = cls(process)
+        for d in donnees:
+            if lot.process is None and d.get("process"):
+                lot.process = processPartage(d["process"].get("run_id", ""), d["process"].get("etape", 0))
+            for nom, colonne in lot.colonnes.items():
+                colonne.append(d.get(nom))
+        return lot
+
+    def __len__(self):
+        return len(self.colonnes["titre"])
+
+    def colonne(self, nom: str) -> list:
+        return self.colonnes[nom]
+
+    def tableau(self, nom: str) -> "np.ndarray":
+        """
+        Colonne numérique en tableau numpy (None → NaN).
+        """
+        import numpy as np
+        return np.array([np.nan if v is None else v for v in self.colonnes[nom]], dtype=float)
+
+    def entree(self, i: int) -> EntreeHistorique:
+        entree = EntreeHistorique(*(self.colonnes[nom][i] for nom in CHAMPS_AVANT_PROCESS))
+        entree.process = self.process
+        for nom in CHAMPS_APRES_PROCESS:
+            setattr(entree, nom, self.colonnes[nom][i])
+        return entree
+
+    def __iter__(self):
+        return (self.entree(i) for i in range(len(self)))
+
+    def versDicts(self):
+        """
+        Équivalent de [e.to_dict() for e in lot] sans reconstruire les EntreeHistorique.
+        """
+        process = self.process.to_dict() if self.process is not None else None
+        avant = [(nom, self.colonnes[nom]) for nom in CHAMPS_AVANT_PROCESS]
+        apres = [(nom, self.colonnes[nom]) for nom in CHAMPS_APRES_PROCESS]
+        for i in range(len(self)):
+            d = {nom: colonne[i] for nom, colonne in avant if colonne[i] is not None}
+            if process is not None:
+                d["process"] = process
+            d.update((nom, colonne[i]) for nom, colonne in apres if colonne[i] is not None)
+            yield d
+
+
+# ───────────────────────────────────────
+# Post-traitement géographique vectorisé
+# ───────────────────────────────────────
+# Seuils de nbLangues → notoriété, du plus exigeant au moins exigeant (cf. calculerNote)
+SEUILS_NOTORIETE = ((50, 10), (30, 8), (15, 5), (5, 3))
+
+
+def postTraiterGeoEnLot(lignes: List[EntreeHistorique]) -> List[EntreeHistorique]:
+    """
+    Équivalent vectorisé de estGeolocaliseeEnFrance / convertirLambert93 / calculerNote pour un lot :
+    une seule projection pyproj pour tout le lot, filtre France par masque et notoriété par np.select.
+    Retourne les lignes situées en France, complétées (x_l93, y_l93, notoriete).
+    """
+    if not lignes:
+        return []
+    import numpy as np
+
+    lat = np.array([np.nan if l.lat is None else l.lat for l in lignes], dtype=float)
+    lon = np.array([np.nan if l.lon is None else l.lon for l in lignes], dtype=float)
+    nbLangues = np.array([np.nan if l.nbLangues is None else l.nbLangues for l in lignes], dtype=float)
+
+    # Les comparaisons avec NaN sont fausses : coordonnées absentes = hors France
+    enFrance = (lat >= 40.0) & (lat <= 51.0) & (lon >= -6.0) & (lon <= 11.0)
+    x, y = obtenirTransformer().transform(lon[enFrance], lat[enFrance])
+
+    notoriete = np.select([nbLangues >= seuil for seuil, _ in SEUILS_NOTORIETE],
+                          [note for _, note in SEUILS_NOTORIETE], default=1)
+    notoriete = np.where(np.isnan(nbLangues), -1, notoriete)
+
+    gardees = []
+    for i, ligne in enumerate(np.flatnonzero(enFrance)):
+        entree = lignes[ligne]
+        entree.x_l93 = float(x[i])
+        entree.y_l93 = float(y[i])
+        note = int(notoriete[ligne])
+        entree.notoriete = None if note < 0 else note
+        gardees.append(entree)
+    return gardees
+
+
 # ───────────────────────────────────────
 # Objet Batch Processing
 # ───────────────────────────────────────
@@ -152,20 +306,48 @@ class BatchProcessing(ABC):
         # Mode par ligne ou mode batch
         self.nbLignesBatch = nbLignesBatch
         self.batch = []
+        # Taille de lot adaptative (None : nbLignesBatch fixe)
+        self.controleur: Optional[ControleurTailleLot] = None
+
+        # Cache persistant des réponses HTTP (None si désactivé)
+        self.cache = obtenirCache()
+        # Sessions HTTP partagées et limitation de débit par hôte
+        self.transport = obtenirTransport()
+        # Compteurs par endpoint et par étape (node_exporter / JSON si configuré)
+        self.metriques = obtenirMetriques()
+        # Session --profile de l'exécution en cours (None hors profilage)
+        self.profil = None
 
 
     def executer(self):
+        with self._profiler():
+            self._executerLignes()
+
+
+    @contextmanager
+    def _profiler(self):
+        self.profil = sessionProfil(self)
+        if self.profil is None:
+            yield
+            return
+        with self.profil:
+            yield
+
+
+    def _executerLignes(self):
         start = time.time()
         total = 0
+        self._sortiesAvant = getattr(self.writer, "nbAjouts", 0)
 
+        # chargerEntrees peut renvoyer une liste ou un générateur : les lignes sont taguées au fil de l'eau
         lignes = self.chargerEntrees()
-        self.taggerLignes(lignes)
 
         for ligne in lignes:
+            self.taggerLigne(ligne)
             if self.nbLignesBatch > 1:
                 self.batch.append(ligne)
-                if len(self.batch) >= self.nbLignesBatch:
-                    self.traiterBatch(self.batch)
+                if len(self.batch) >= self.tailleLot():
+                    self._traiterLot(self.batch)
                     self.batch.clear()
             else:
                 resultat = self.traiterLigne(ligne)
@@ -176,9 +358,13 @@ class BatchProcessing(ABC):
             total += 1
 
         if self.nbLignesBatch > 1 and self.batch:
-            self.traiterBatch(self.batch)
+            self._traiterLot(self.batch)
             self.batch.clear()
 
+        self._finaliserExecution(start, total)
+
+
+    def _finaliserExecution(self, start: float, total: int):
         if hasattr(self, "finTraitement"):
             self.finTraitement()
 
@@ -186,21 +372,134 @@ class BatchProcessing(ABC):
             self.writer._sauvegarder_batch()
         duree = time.time() - start
         logger.info(f"[⏱️ Perf] {total} lignes traitées en {duree:.2f} secondes")
+        sorties = getattr(self.writer, "nbAjouts", 0) - getattr(self, "_sortiesAvant", 0)
+        self.metriques.observerLignes(self.etape, total, sorties, len(self.discardes))
+        resume = self.metriques.resume(self.etape)
+        if resume:
+            logger.info(resume)
+        self.metriques.ecrire()
+        if self.controleur:
+            logger.info(self.controleur.resume())
+        if self.cache:
+            logger.info(self.cache.resume())
 
 
+    # ───────────────────────────────────────
+    # Lots en parallèle : pool de threads
+    # ───────────────────────────────────────
+    def executerEnParallele(self, concurrence: int = 8):
+        """
+        Variante de executer() : jusqu'à `concurrence` lots sont traités en même temps, chacun dans
+        un thread du pool (les requêtes d'un même lot restent séquentielles). Le débit reste borné
+        par le limiteur du transport, et les lignes sont transmises au writer dans l'ordre d'entrée.
+        """
+        with self._profiler():
+            self._executerEnParallele(concurrence)
+
+
+    def _executerEnParallele(self, concurrence: int):
+        start = time.time()
+        total = 0
+        self._sortiesAvant = getattr(self.writer, "nbAjouts", 0)
+
+        lignes = self.chargerEntrees()
+
+        writerReel = self.writer
+        self.writer = WriterOrdonne(writerReel)
+        places = threading.BoundedSemaphore(concurrence)
+        traiterLot = self._traiterLotOrdonne
+        if self.profil:
+            traiterLot = self.profil.dansThread(traiterLot)
+        futures = []
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrence, thread_name_prefix=f"etape{self.etape}") as pool:
+                def soumettre(lot: List[EntreeHistorique]):
+                    places.acquire()   # au plus `concurrence` lots en vol : la lecture ne prend pas d'avance
+                    contexte = contextvars.copy_context()
+                    futures.append(pool.submit(contexte.run, traiterLot, len(futures), lot, places))
+
+                lot = []
+                for ligne in lignes:
+                    self.taggerLigne(ligne)
+                    lot.append(ligne)
+                    total += 1
+                    if len(lot) >= self.tailleLot():
+                        soumettre(lot)
+                        lot = []
+                if lot:
+                    soumettre(lot)
+                for future in futures:
+                    future.result()
+        finally:
+            self.writer = writerReel
+
+        self._finaliserExecution(start, total)
+
+
+    def _traiterLotOrdonne(self, index: int, lot: List[EntreeHistorique], places: threading.BoundedSemaphore):
+        _lotCourant.set(index)
+        try:
+            self._traiterLot(lot)
+        finally:
+            self.writer.terminerLot(index)
+            places.release()
+
+
+    def tailleLot(self) -> int:
+        if self.controleur:
+            return self.controleur.taille
+        return max(self.nbLignesBatch, 1)
+
+
+    def _traiterLot(self, lignes: List[EntreeHistorique]):
+        if self.nbLignesBatch > 1:
+            if not self.controleur:
+                self.traiterBatch(lignes)
+                return
+            # Les requêtes du lot alimentent la mesure (latence, erreurs, troncatures)
+            mesure = {"requetes": 0, "erreurs": 0, "troncatures": 0}
+            jeton = _mesureLot.set(mesure)
+            t0 = time.time()
+            try:
+                self.traiterBatch(lignes)
+            finally:
+                _mesureLot.reset(jeton)
+                self.controleur.observer(len(lignes), time.time() - t0, mesure["requetes"],
+                                         mesure["erreurs"], mesure["troncatures"])
+            return
+        for ligne in lignes:
+            resultat = self.traiterLigne(ligne)
+            if resultat is not None:
+                self.writer.ajouter(resultat)
+            else:
+                self.gerer_echec(ligne)
+
 
     def taggerLignes(self, entrees: List[EntreeHistorique]):
         for entree in entrees:
-            entree.process = LigneProcess(
-                run_id=self.runId,
-                etape=self.etape
-            )
+            self.taggerLigne(entree)
+
+
+    def taggerLigne(self, entree: EntreeHistorique):
+        entree.process = processPartage(self.runId, self.etape)
 
 
     def chargerEntrees(self) -> List[EntreeHistorique]:
         return None
 
 
+    def lireEntrees(self) -> Iterator[EntreeHistorique]:
+        """
+        Lecture paresseuse du reader : les premiers lots partent avant la fin de la lecture du fichier.
+        """
+        nb = 0
+        for ligne in self.reader.iterLignes():
+            nb += 1
+            yield ligne
+        print(f"✅ {nb} lignes chargées depuis {self.reader.fichierSource}")
+
+
     def traiterLigne(self, ligne: EntreeHistorique) -> EntreeHistorique:
         return ligne
 
@@ -225,24 +524,44 @@ class BatchProcessing(ABC):
     # Gestion des APIs Wikipedia
     # ───────────────────────────────────────
     def requeteWikiMedia(self, url, params=None, raw_url=False):
-        try:
-            t0 = time.time()
-            headers = {"User-Agent": "ChouetteBot/1.0"}
+        if raw_url:
+            params = None
+        if self.cache:
+            reponse = self.cache.lire(url, params)
+            if reponse is not None:
+                return reponse
 
-            if raw_url:
-                response = requests.get(url, timeout=10, headers=headers)
+        mesure = _mesureLot.get()
+        if mesure is not None:
+            mesure["requetes"] += 1
+        response = None
+        t0 = time.time()
+        try:
+            # Listes de titres trop longues pour une URL : même requête en POST
+            if params and url.endswith("/api.php") and len(url) + 1 + len(urlencode(params)) > LONGUEUR_URL_MAX:
+                response = self.transport.post(url, data=params, timeout=10)
             else:
-                response = requests.get(url, params=params, timeout=10, headers=headers)
+                response = self.transport.get(url, params=params, timeout=10)
 
-            dt = time.time() - t0
+            self.metriques.observerReponse(self.etape, url, params, response, time.time() - t0)
 
             if response.status_code != 200:
                 logger.error(f"[❌ Erreur] {response.status_code} pour {url}")
-            elif dt > 1:
-                logger.warning(f"[⚠️ Lent] Requête vers {url} a pris {dt:.2f}s")
 
-            return response.json()
+            reponse = response.json()
+            if mesure is not None:
+                if response.status_code != 200 or not isinstance(reponse, dict) or "error" in reponse:
+                    mesure["erreurs"] += 1
+                elif "continue" in reponse:
+                    mesure["troncatures"] += 1
+            if self.cache and response.status_code == 200 and isinstance(reponse, dict) and "error" not in reponse:
+                self.cache.ecrire(url, params, reponse)
+            return reponse
         except Exception as e:
+            if mesure is not None:
+                mesure["erreurs"] += 1
+            if response is None:
+                self.metriques.observerRequete(self.etape, url, params, type(e).__name__, 0, time.time() - t0)
             logger.exception(f"[❌ Exception] Requête échouée pour {url} : {e}")
             return None
 
@@ -251,23 +570,25 @@ class BatchProcessing(ABC):
     def requeteSPARQL(self, titre: str, query: str, max_retries: int = 3, pause: float = 0.8) -> Optional[dict]:
 
         url = "https://query.wikidata.org/sparql"
-        headers = {
-            "Accept": "application/sparql-results+json",
-            "User-Agent": "ChouetteBot/1.0 (https://jolylaurent78@gmail.com)"
-        }
+        headers = {"Accept": "application/sparql-results+json"}
+
+        if self.cache:
+            reponse = self.cache.lire(url, {"query": query})
+            if reponse is not None:
+                return reponse
 
         for tentative in range(1, max_retries + 1):
             try:
-                logging.debug(f"[🔍 SPARQL] Tentative {tentative} – Pause {pause:.2f}s")
-                time.sleep(pause)
-
-                response = requests.get(url, params={"query": query}, headers=headers)
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", 5))
-                    logging.warning(f"[⚠️ SPARQL] Requête refusée (429) – Attente {retry_after}s")
-                    time.sleep(retry_after)
-                    continue
-
+                logging.debug(f"[🔍 SPARQL] Tentative {tentative}")
+
+                # Le transport gère le débit de query.wikidata.org et les 429 / Retry-After
+                t0 = time.time()
+                try:
+                    response = self.transport.get(url, params={"query": query}, headers=headers, timeout=60)
+                except Exception as e:
+                    self.metriques.observerRequete(self.etape, url, None, type(e).__name__, 0, time.time() - t0)
+                    raise
+                self.metriques.observerReponse(self.etape, url, None, response, time.time() - t0)
                 response.raise_for_status()
                 reponse = response.json()
 
@@ -281,11 +602,15 @@ class BatchProcessing(ABC):
                     logging.warning(f"[⚠️ Aucun résultat SPARQL] Bindings vide pour {titre}.")
                     return None
 
+                if self.cache:
+                    self.cache.ecrire(url, {"query": query}, reponse)
                 return reponse
 
             except Exception as e:
                 logging.error(f"⛔ Erreur SPARQL (tentative {tentative}) : {e}")
-                pause *= 2  # Exponentiel backoff
+                if tentative < max_retries:
+                    time.sleep(pause)
+                    pause *= 2  # Exponentiel backoff
 
         return None
 
@@ -315,21 +640,78 @@ class BaseWriter(ABC):
         """
         pass
 
+# Index du lot en cours dans executerEnParallele (propagé aux threads du pool)
+_lotCourant = contextvars.ContextVar("lotCourant", default=None)
+# Compteurs de requêtes du lot en cours, pour le contrôleur de taille de lot
+_mesureLot = contextvars.ContextVar("mesureLot", default=None)
+
+
+class WriterOrdonne(BaseWriter):
+    """
+    Writer intermédiaire de executerEnParallele : les lignes sont regroupées par lot et
+    transmises au writer réel dans l'ordre des lots, quel que soit leur ordre de fin.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.enAttente = {}
+        self.termines = set()
+        self.prochain = 0
+        self._verrou = threading.Lock()
+
+    def ajouter(self, ligne):
+        index = _lotCourant.get()
+        with self._verrou:
+            if index is None or index == self.prochain and not self.enAttente.get(index):
+                self.writer.ajouter(ligne)
+            else:
+                self.enAttente.setdefault(index, []).append(ligne)
+
+    def terminerLot(self, index: int):
+        with self._verrou:
+            self.termines.add(index)
+            while self.prochain in self.termines:
+                for ligne in self.enAttente.pop(self.prochain, []):
+                    self.writer.ajouter(ligne)
+                self.termines.discard(self.prochain)
+                self.prochain += 1
+
+    def besoinSauvegarder(self):
+        return self.writer.besoinSauvegarder()
+
+    def _sauvegarder_batch(self):
+        self.writer._sauvegarder_batch()
+
+    def __getattr__(self, nom):
+        return getattr(self.writer, nom)
+
+
 class BatchWriterJSON(BaseWriter):
-    def __init__(self, dossier_sortie, fichierSortie, runId, taille_batch=None):
+    """
+    Écrit les fichiers batch d'une étape, en JSONL ou en Parquet selon le format du run
+    (cf. configurerFormatLots) ; `format` force un format pour ce writer.
+    """
+
+    def __init__(self, dossier_sortie, fichierSortie, runId, taille_batch=None, format: Optional[str] = None):
         self.dossier_sortie = dossier_sortie
         self.fichierSortie = fichierSortie
+        self.format = format or obtenirFormatLots()
+        self.extension = EXTENSIONS_FORMAT[self.format]
         self.nom_entree = os.path.splitext(os.path.basename(fichierSortie))[0]
         self.runId = runId
         self.taille_batch = taille_batch
         self.batch_unique = self.taille_batch is None
         self.lignes = []
+        self.nbAjouts = 0
         self.compteur_fichier = 1
         self.buffer = []
+        # Rappel optionnel après chaque fichier écrit : surSauvegarde(lignes, numero_fichier)
+        self.surSauvegarde = None
 
         os.makedirs(dossier_sortie, exist_ok=True)
 
     def ajouter(self, ligne):
+        self.nbAjouts += 1
         self.lignes.append(ligne)
         if not self.batch_unique and len(self.lignes) >= self.taille_batch:
             self._sauvegarder_batch()
@@ -339,16 +721,23 @@ class BatchWriterJSON(BaseWriter):
 
     def _sauvegarder_batch(self):
         if self.batch_unique:
-            nom_fichier = f"{self.nom_entree}.json"
+            nom_fichier = f"{self.nom_entree}{self.extension}"
         else:
-            nom_fichier = f"{self.nom_entree}_batch_{self.compteur_fichier:03d}.json"
+            nom_fichier = f"{self.nom_entree}_batch_{self.compteur_fichier:03d}{self.extension}"
 
+        # Écriture dans un fichier temporaire puis renommage atomique : un listener ne voit jamais un fichier incomplet
         chemin = os.path.join(self.dossier_sortie, nom_fichier)
-        with open(chemin, "w", encoding="utf-8") as f:
-            for ligne in self.lignes:
-                f.write(json.dumps(ligne.to_dict(), ensure_ascii=False) + "\n")
+        chemin_tmp = os.path.join(self.dossier_sortie, f".{nom_fichier}.tmp")
+        if self.format == "parquet":
+            ecrireParquet(chemin_tmp, self.lignes)
+        else:
+            with open(chemin_tmp, "wb") as f:
+                f.write(encoderJSONL(ligne.to_dict() for ligne in self.lignes))
+        os.replace(chemin_tmp, chemin)
 
         print(f"[💾] Batch {self.compteur_fichier} sauvegardé avec {len(self.lignes)} lignes")
+        if self.surSauvegarde and self.lignes:
+            self.surSauvegarde(self.lignes, self.compteur_fichier)
         self.lignes = []
 
         if not self.batch_unique:
@@ -357,44 +746,108 @@ class BatchWriterJSON(BaseWriter):
     def creerFichierStop(self):
         # Création du fichier STOP
         stopPath = os.path.join(self.dossier_sortie, f"{self.runId}_STOP")
-        with open(stopPath, "w", encoding="utf-8") as f:
+        with open(stopPath + ".tmp", "w", encoding="utf-8") as f:
             f.write("Fin de génération du batch.")
+        os.replace(stopPath + ".tmp", stopPath)
         print(f"[✔️] Fichier STOP créé : {stopPath}")
 
 
 
 class BatchWriterSQLite(BaseWriter):
-    def __init__(self, chemin_db):
+    """
+    Insertion en masse dans WikiCarto.db : les lignes sont accumulées puis écrites par executemany
+    dans une seule transaction par fichier batch. La base est en WAL, ce qui permet au simulateur
+    de la lire pendant l'écriture.
+    Avec `persistante=True`, la connexion et les référentiels en mémoire (SourceBacklink, P31)
+    survivent d'un fichier batch à l'autre ; la fermeture se fait alors par fermer().
+    Chaque couple (qid, source_backlink) est aussi noté dans EntreeHistoriqueSourceBacklink ;
+    pour une entrée déjà en base (`connue`), c'est la seule écriture.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-65536",        # 64 Mo
+        "PRAGMA mmap_size=268435456",      # 256 Mo
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=30000",
+    )
+
+    SCHEMA_ASSOCIATIONS = """
+        CREATE TABLE IF NOT EXISTS EntreeHistoriqueSourceBacklink (
+            qid TEXT NOT NULL,
+            source_backlink TEXT NOT NULL,
+            batch_id INTEGER,
+            PRIMARY KEY (qid, source_backlink)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, chemin_db, persistante: bool = False):
         self.chemin_db = chemin_db
+        self.persistante = persistante
         self.conn = None
         self.cursor = None
         self.nb_inserts = 0
-        self._ouvrir_connexion()
+        self.nbAjouts = 0
         self.batch_id = None
+        self.lignes = []
+        self.associations = []
+        self.source_batch = None
+
+        # Référentiels en mémoire, chargés une fois par connexion
+        self.sourcesConnues = None
+        self.p31Connus = None
+        self.nouvellesSources = []
+        self.nouveauxP31 = []
+        self._ouvrir_connexion()
 
     def _ouvrir_connexion(self):
         if not os.path.exists(self.chemin_db):
             logging.warning(f"[⚠️] La base de données '{self.chemin_db}' n'existe pas encore. Elle sera créée automatiquement.")
-        self.conn = sqlite3.connect(self.chemin_db)
+        self.conn = sqlite3.connect(self.chemin_db, timeout=30)
+        for pragma in self.PRAGMAS:
+            self.conn.execute(pragma)
+        self.conn.execute(self.SCHEMA_ASSOCIATIONS)
         self.cursor = self.conn.cursor()
+        self.sourcesConnues = None
+        self.p31Connus = None
+
+    def _verifierConnexion(self):
+        if self.conn is None:
+            self._ouvrir_connexion()
+
+    def chargerReferentiels(self):
+        self._verifierConnexion()
+        if self.sourcesConnues is None:
+            self.sourcesConnues = {row[0] for row in self.conn.execute("SELECT source_backlink FROM SourceBacklink")}
+        if self.p31Connus is None:
+            self.p31Connus = {row[0] for row in self.conn.execute("SELECT p31 FROM P31Classification")}
+
+    def ajouterSource(self, source_backlink: str, url: str):
+        self.chargerReferentiels()
+        if source_backlink in self.sourcesConnues:
+            return False
+        self.sourcesConnues.add(source_backlink)
+        self.nouvellesSources.append((source_backlink, url, "(0,0,0)", 1))   # couleur par défaut, visible
+        return True
 
+    def ajouterP31(self, p31: str, label: Optional[str], statut: str = "non_defini"):
+        self.chargerReferentiels()
+        if p31 in self.p31Connus:
+            return False
+        self.p31Connus.add(p31)
+        self.nouveauxP31.append((p31, label, statut))
+        return True
 
     def ajouter(self, entree):
-
-        # On rajoute une entrée dans HistoriqueInsertion pour tracabilité
-        if self.batch_id is None:
-            self.cursor.execute("""
-                INSERT INTO HistoriqueInsertion (source_backlink, date_insertion)
-                VALUES (?, ?)
-            """, (entree.source_backlink, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-
-            self.batch_id = self.cursor.lastrowid  # ← à injecter dans chaque EntreeHistorique ensuite
-
-
-        self.cursor.execute("""
-            INSERT OR IGNORE INTO EntreeHistorique (
-                qid, titre, lat, lon, lambert_x, lambert_y, p31, summary, description, source_backlink, url, crossReference, batch_id, nbLangues, notoriete ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        self.nbAjouts += 1
+        if entree.qid and entree.source_backlink:
+            self.associations.append((entree.qid, entree.source_backlink))
+        if entree.connue:
+            return
+        if not self.lignes:
+            self.source_batch = entree.source_backlink
+        self.lignes.append((
             entree.qid,
             entree.titre,
             entree.lat,
@@ -407,47 +860,228 @@ class BatchWriterSQLite(BaseWriter):
             entree.source_backlink,
             entree.url,
             entree.crossReference,
-            self.batch_id,
             entree.nbLangues,
             entree.notoriete
         ))
-        self.nb_inserts += 1
 
     def besoinSauvegarder(self):
-        return True
+        # Une connexion non persistante est toujours finalisée (et fermée) en fin de fichier
+        return not self.persistante or bool(self.lignes or self.associations or self.nouvellesSources or self.nouveauxP31)
 
     def _sauvegarder_batch(self):
+        self._verifierConnexion()
         try:
-            if self.conn:
-                if self.batch_id is not None:
+            with self.conn:   # une transaction par fichier batch
+                if self.nouvellesSources:
+                    self.conn.executemany("""
+                        INSERT OR IGNORE INTO SourceBacklink (source_backlink, url, couleur, visible)
+                        VALUES (?, ?, ?, ?)
+                    """, self.nouvellesSources)
+                if self.nouveauxP31:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO P31Classification (p31, label, statut) VALUES (?, ?, ?)",
+                        self.nouveauxP31)
+
+                if self.lignes:
+                    # On rajoute une entrée dans HistoriqueInsertion pour tracabilité
+                    self.cursor.execute("""
+                        INSERT INTO HistoriqueInsertion (source_backlink, date_insertion)
+                        VALUES (?, ?)
+                    """, (self.source_batch, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                    self.batch_id = self.cursor.lastrowid
+
+                    avant = self.conn.total_changes
+                    self.conn.executemany("""
+                        INSERT OR IGNORE INTO EntreeHistorique (
+                            qid, titre, lat, lon, lambert_x, lambert_y, p31, summary, description, source_backlink, url, crossReference, batch_id, nbLangues, notoriete ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, [ligne[:12] + (self.batch_id,) + ligne[12:] for ligne in self.lignes])
+                    nb = self.conn.total_changes - avant
+                    self.nb_inserts += nb
+
                     self.cursor.execute("""
                         UPDATE HistoriqueInsertion
                         SET nb_entrees = ?
                         WHERE id = ?
-                    """, (self.nb_inserts, self.batch_id))
-
-
-                self.conn.commit()
-                self.conn.close()
-                logging.info(f"[💾] {self.nb_inserts} entrées insérées et connexion fermée.")
+                    """, (nb, self.batch_id))
+                    logging.info(f"[💾] {nb} entrées insérées sur {len(self.lignes)} lignes (batch {self.batch_id}).")
+
+                if self.associations:
+                    avant = self.conn.total_changes
+                    self.conn.executemany("""
+                        INSERT OR IGNORE INTO EntreeHistoriqueSourceBacklink (qid, source_backlink, batch_id)
+                        VALUES (?, ?, ?)
+                    """, [association + (self.batch_id,) for association in self.associations])
+                    logging.info(f"[🔗] {self.conn.total_changes - avant} nouvelle(s) association(s) source_backlink "
+                                 f"sur {len(self.associations)} ligne(s).")
         except Exception as e:
             logging.error(f"[❌] Erreur lors du commit/finalisation: {e}")
+            # Les référentiels en mémoire ne reflètent plus la base : rechargement au prochain batch
+            self.sourcesConnues = None
+            self.p31Connus = None
+        finally:
+            self.lignes = []
+            self.associations = []
+            self.nouvellesSources = []
+            self.nouveauxP31 = []
+            self.batch_id = None
+
+        if not self.persistante:
+            self.fermer()
+
+    def fermer(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+            self.cursor = None
+            logging.info(f"[💾] {self.nb_inserts} entrées insérées au total et connexion fermée.")
+
+
+# ───────────────────────────────────────
+# Codec JSONL
+# ───────────────────────────────────────
+TAILLE_BLOC_LECTURE = 1 << 20   # octets lus par bloc dans les fichiers JSONL
+
+
+def decoderJSON(donnees):
+    return orjson.loads(donnees) if orjson else json.loads(donnees)
+
+
+def encoderJSONL(dicts) -> bytes:
+    """
+    Une ligne JSON par dictionnaire, en UTF-8.
+    """
+    if orjson:
+        return b"".join(orjson.dumps(d, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n" for d in dicts)
+    return "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in dicts).encode("utf-8")
+
+
+# ───────────────────────────────────────
+# Format des fichiers batch (JSONL ou Parquet)
+# ───────────────────────────────────────
+EXTENSIONS_FORMAT = {"jsonl": ".json", "parquet": ".parquet"}
+COMPRESSION_PARQUET = "zstd"
+TAILLE_GROUPE_PARQUET = 10_000  # lignes par record batch à la lecture
+
+# process n'est pas imbriqué en Parquet : run_id / etape sont deux colonnes (encodées en dictionnaire)
+COLONNES_PROCESS = ("run_id", "etape")
+
+_formatLots = {"format": "jsonl"}
+
+
+def chargerPyarrow():
+    """
+    pyarrow (≈ 100 ms d'import) n'est chargé qu'au premier fichier Parquet lu ou écrit.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Le format parquet nécessite pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+
+def configurerFormatLots(format: str = "jsonl"):
+    if format not in EXTENSIONS_FORMAT:
+        raise ValueError(f"Format de lots inconnu : {format} (attendu : {', '.join(EXTENSIONS_FORMAT)})")
+    if format == "parquet":
+        chargerPyarrow()
+    _formatLots["format"] = format
+
+
+def obtenirFormatLots() -> str:
+    return _formatLots["format"]
+
+
+def formatDuFichier(chemin: str) -> str:
+    return "parquet" if chemin.endswith(EXTENSIONS_FORMAT["parquet"]) else "jsonl"
+
+
+def schemaParquet():
+    pa, _ = chargerPyarrow()
+    texte, reel, entier = pa.string(), pa.float64(), pa.int32()
+    types = {
+        "titre": texte, "url": texte, "qid": texte, "source_backlink": texte, "crossReference": pa.int8(),  # niveau 0 à 2 (étape 1)
+        "run_id": texte, "etape": entier,
+        "resume": texte, "description": texte, "p31": texte,
+        "lat": reel, "lon": reel, "x_l93": reel, "y_l93": reel, "nbLangues": entier, "notoriete": entier,
+        "connue": pa.bool_(),
+    }
+    return pa.schema([(nom, types[nom]) for nom in CHAMPS_AVANT_PROCESS + COLONNES_PROCESS + CHAMPS_APRES_PROCESS])
+
+
+def ecrireParquet(chemin: str, lignes: List[EntreeHistorique]):
+    """
+    Un fichier Parquet compressé (zstd), une colonne par champ.
+    """
+    colonnes = LotEntrees.depuisEntrees(lignes).colonnes
+    colonnes["run_id"] = [l.process.run_id if l.process is not None else None for l in lignes]
+    colonnes["etape"] = [l.process.etape if l.process is not None else None for l in lignes]
+    pa, pq = chargerPyarrow()
+    table = pa.Table.from_pydict(colonnes, schema=schemaParquet())
+    pq.write_table(table, chemin, compression=COMPRESSION_PARQUET)
+
+
+def iterParquet(chemin: str, colonnes: Optional[tuple] = None, taille: int = TAILLE_GROUPE_PARQUET) -> Iterator[EntreeHistorique]:
+    """
+    Lecture par record batch ; seules les `colonnes` demandées sont décodées (les autres restent à None).
+    run_id et etape ne sont lus que si "process" fait partie des colonnes.
+    """
+    _, pq = chargerPyarrow()
+    fichier = pq.ParquetFile(chemin)
+    presentes = set(fichier.schema_arrow.names)
+    lireProcess = colonnes is None or "process" in colonnes
+    if colonnes is not None:
+        presentes &= set(colonnes) | (set(COLONNES_PROCESS) if lireProcess else set())
+    for batch in fichier.iter_batches(batch_size=taille, columns=sorted(presentes)):
+        donnees = batch.to_pydict()
+        vide = [None] * batch.num_rows
+        # source_backlink et p31 ne prennent que quelques valeurs : une seule copie de chaque chaîne
+        for nom in ("source_backlink", "p31"):
+            if nom in donnees:
+                donnees[nom] = [v if v is None else sys.intern(v) for v in donnees[nom]]
+        process = vide
+        if lireProcess:
+            process = [processPartage(runId or "", etape or 0)
+                       for runId, etape in zip(donnees.get("run_id", vide), donnees.get("etape", vide))]
+        # Même ordre que les champs de EntreeHistorique : process est inséré après crossReference
+        champs = ([donnees.get(nom, vide) for nom in CHAMPS_AVANT_PROCESS] + [process]
+                  + [donnees.get(nom, vide) for nom in CHAMPS_APRES_PROCESS])
+        for valeurs in zip(*champs):
+            yield EntreeHistorique(*valeurs)
 
 
 # ───────────────────────────────────────
 # Objet Batch Reader
 # ───────────────────────────────────────
 class BatchReaderJSON:
-    def __init__(self, fichierSource: str):
+    """
+    Lecture d'un fichier batch, JSONL ou Parquet selon son extension. iterLignes() lit et décode
+    par blocs et produit les lignes au fil de l'eau : la mémoire reste bornée par le lot en cours
+    et non par la taille du fichier. `colonnes` limite les champs lus (Parquet uniquement ;
+    en JSONL chaque ligne est de toute façon décodée en entier).
+    """
+
+    def __init__(self, fichierSource: str, taille_bloc: int = TAILLE_BLOC_LECTURE, colonnes: Optional[tuple] = None):
         self.fichierSource = fichierSource
+        self.taille_bloc = taille_bloc
+        self.colonnes = colonnes
+
+    def iterLignes(self) -> Iterator[EntreeHistorique]:
+        if formatDuFichier(self.fichierSource) == "parquet":
+            yield from iterParquet(self.fichierSource, self.colonnes)
+            return
+
+        with open(self.fichierSource, "rb") as f:
+            while True:
+                bloc = f.readlines(self.taille_bloc)
+                if not bloc:
+                    break
+                for ligne in bloc:
+                    if ligne.strip():
+                        yield EntreeHistorique.fromDict(decoderJSON(ligne))
 
     def loadLignes(self) -> List[EntreeHistorique]:
-        lignes = []
-        with open(self.fichierSource, "r", encoding="utf-8") as f:
-            for ligne in f:
-                d = json.loads(ligne)
-                lignes.append(EntreeHistorique.fromDict(d))
-        return lignes
+        return list(self.iterLignes())
 
 # ───────────────────────────────────────
 # Gestion des logs
@@ -458,18 +1092,18 @@ from logging.handlers import RotatingFileHandler
 logger = logging.getLogger("wiki")
 logger.setLevel(logging.INFO)
 
-handler = RotatingFileHandler("logs/wiki_api.log", maxBytes=10_000_000, backupCount=4, encoding="utf-8")
-formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-
-if not logger.hasHandlers():
-    logger.addHandler(handler)
-
-
-
-
-
-
-
+CHEMIN_LOG = "logs/wiki_api.log"
 
 
+def configurerLogs(chemin: str = CHEMIN_LOG):
+    """
+    Journal tournant de l'API, à brancher au démarrage d'un point d'entrée (main, outils en ligne de commande) :
+    l'import du module n'ouvre aucun fichier. Le répertoire est créé au besoin ; un second appel est sans effet.
+    """
+    chemin = os.path.abspath(chemin)
+    if any(getattr(h, "baseFilename", None) == chemin for h in logger.handlers):
+        return
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    handler = RotatingFileHandler(chemin, maxBytes=10_000_000, backupCount=4, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
@@ -1,23 +1,29 @@
-
 from datetime import datetime
 import json
 import os
 import re
 import csv
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Iterator
+from collections import OrderedDict
 import time as t
 from urllib.parse import urlparse, unquote
 from bs4 import BeautifulSoup, Tag
-import requests
 from urllib.parse import quote
 
 from src.wikiDataLoader import BatchProcessing, BatchWriterJSON
 from src.wikiDataLoader import EntreeHistorique, LigneProcess
-from src.wikiDataLoader import logger
+from src.wikiDataLoader import logger, configurerLogs, moduleOptionnel
+from src.wikiCache import obtenirCacheVerdicts
 
 REPERTOIRE_INPUT = "input"
+REPERTOIRE_REPRISE = "data/reprise"
+# Nombre maximal de titres par requête action=query
+NB_TITRES_PAR_REQUETE = 50
 
 class BatchProcessingTitresExtraction(BatchProcessing):
+    # Recherche des liens (dont l'analyse BeautifulSoup) chronométrée à part avec --profile
+    PHASES_PROFIL = ("getLiensParSection", "getLiensSortantsParAPIParse", "contientLienDansHTML", "verifierLiensEnLot")
+
     def __init__(self, runId: str, dossierSortie: str, pause: float = 0.1, max_lignes: Optional[int] = None):
         """
         Initialise le batch d'extraction pour l'étape 1 (titres Wikipédia).
@@ -27,14 +33,19 @@ class BatchProcessingTitresExtraction(BatchProcessing):
         :param max_lignes: Nombre maximum de lignes à extraire (utile en debug)
         """
 
-        super().__init__(runId=runId, etape=1)
+        super().__init__(runId=runId, etape=1, nbLignesBatch=NB_TITRES_PAR_REQUETE)
 
         self.pause = pause
         self.max_lignes = max_lignes
         self.AnalyseDetaillee = False
         self.pagesTraitée = 0
         self.pagesIgnoree = 0
-        self.batch = "CommandLine"
+        self.pagesEcarteesPreFiltre = 0
+        # Verdicts de contientLienDansHTML mémorisés par révision (None si cache désactivé)
+        self.verdicts = obtenirCacheVerdicts()
+        # Index local des liens (dumps SQL frwiki) : backlinks et pré-filtre sans appel réseau
+        indexLiens = moduleOptionnel("src.indexLiens")
+        self.indexLiens = indexLiens.obtenirIndexLiens() if indexLiens else None
         self.writer = BatchWriterJSON(
             dossier_sortie=dossierSortie,
             fichierSortie=f"{runId}_Step1",
@@ -50,6 +61,14 @@ class BatchProcessingTitresExtraction(BatchProcessing):
             raise ValueError(f"[❌] Fichier {chemin_csv} vide ou invalide.")
         self.bltitle = list(self.plagesSections.keys())[0]
 
+        # Reprise éventuelle d'une énumération interrompue : on repart après le dernier backlink écrit
+        self.positionsBacklinks = OrderedDict()
+        self.pointDeReprise = True   # False : ni lecture, ni écriture, ni suppression du fichier de reprise
+        self.reprise = self.chargerReprise()
+        if self.reprise:
+            self.writer.compteur_fichier = self.reprise["compteur_fichier"]
+        self.writer.surSauvegarde = self.sauverReprise
+
     #
     # Fonction de chargement du fichier CSV
     def chargerPlagesSectionsDepuisCSV(self, chemin_csv: str):
@@ -83,9 +102,13 @@ class BatchProcessingTitresExtraction(BatchProcessing):
         """
         Compte de façon exhaustive le nombre total de pages qui pointent vers une page Wikipedia donnée.
         :param titre_page: ex: 'Jeanne_d\'Arc'
-        :param pause: délai entre les requêtes (en secondes)
+        :param pause: conservé pour compatibilité, le débit est désormais géré par le transport HTTP
         :param max_pages: limite maximale pour test/debug
         """
+        if self.indexLiens:
+            total = self.indexLiens.nbEntrants(titre_page)
+            return min(total, max_pages) if max_pages else total
+
         url = "https://fr.wikipedia.org/w/api.php"
         total = 0
         blcontinue = None
@@ -113,8 +136,6 @@ class BatchProcessingTitresExtraction(BatchProcessing):
             if not blcontinue:
                 break
 
-            t.sleep(pause)
-
         return total
 
 
@@ -162,8 +183,7 @@ class BatchProcessingTitresExtraction(BatchProcessing):
             "format": "json",
             "prop": "sections"
         }
-        r = requests.get(url, params=params)
-        data = r.json()
+        data = self.requeteWikiMedia(url, params=params) or {}
 
         exclusions = {"voir aussi", "liens externes", "bibliographie", "notes et références", "sources"}
         sections_utiles = []
@@ -178,7 +198,78 @@ class BatchProcessingTitresExtraction(BatchProcessing):
         return sections_utiles
 
 
-    def getLiensSortantsParAPIParse(self, titre, index_min=None, index_max=None):
+    @staticmethod
+    def estLienArticle(href: str) -> bool:
+        return href.startswith("/wiki/") and not href.startswith("/wiki/Fichier:")
+
+
+    def getLiensParSection(self, titre: str) -> Dict[int, Set[str]]:
+        """
+        Télécharge une seule fois le HTML complet de la page et le découpe localement en sections
+        à partir des ancres des titres. Retourne {index_section: liens}, où chaque section inclut
+        ses sous-sections (même périmètre que action=parse&section=i).
+        """
+        url = "https://fr.wikipedia.org/w/api.php"
+        params = {
+            "action": "parse",
+            "page": titre,
+            "format": "json",
+            "prop": "sections|text"
+        }
+        data = self.requeteWikiMedia(url, params=params) or {}
+        sections = data.get("parse", {}).get("sections", [])
+        html = data.get("parse", {}).get("text", {}).get("*", "")
+        if not sections or not html:
+            return {}
+
+        # Ancre → position de la section dans la liste renvoyée par l'API
+        positionParAncre = {section.get("anchor"): i for i, section in enumerate(sections)}
+        liensParPosition = [set() for _ in sections]
+        position = None  # None = introduction, hors de toute section
+
+        soup = BeautifulSoup(html, "html.parser")
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            if element.name in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                # Balisage récent : <h2 id="Ancre">, ancien : <h2><span class="mw-headline" id="Ancre">
+                ancre = element.get("id")
+                if ancre not in positionParAncre:
+                    titreSection = element.find("span", class_="mw-headline")
+                    ancre = titreSection.get("id") if titreSection else None
+                if ancre in positionParAncre:
+                    position = positionParAncre[ancre]
+            elif element.name == "a" and position is not None:
+                href = element.get("href")
+                if href and self.estLienArticle(href):
+                    liensParPosition[position].add(href)
+
+        # Une section englobe les sections suivantes tant que leur niveau est plus profond
+        liensParSection = {}
+        for i, section in enumerate(sections):
+            try:
+                index = int(section["index"])
+            except (KeyError, ValueError):
+                continue  # Sections issues de modèles transclus (index "T-1")
+            niveau = int(section.get("level", 2))
+            liens = set(liensParPosition[i])
+            for j in range(i + 1, len(sections)):
+                if int(sections[j].get("level", 2)) <= niveau:
+                    break
+                liens.update(liensParPosition[j])
+            liensParSection[index] = liens
+
+        return liensParSection
+
+
+    def getLiensSortantsParAPIParse(self, titre, index_min=None, index_max=None, unSeulAppel: bool = True):
+        if unSeulAppel:
+            liens_totaux = set()
+            for idx, liens in self.getLiensParSection(titre).items():
+                if (index_min is None or idx >= index_min) and (index_max is None or idx <= index_max):
+                    liens_totaux.update(liens)
+            return sorted(liens_totaux)
+
         def getLiensDansSection(titre, index_section):
             url = "https://fr.wikipedia.org/w/api.php"
             params = {
@@ -191,10 +282,7 @@ class BatchProcessingTitresExtraction(BatchProcessing):
             data = self.requeteWikiMedia(url, params=params)
             html = data.get("parse", {}).get("text", {}).get("*", "")
             soup = BeautifulSoup(html, "html.parser")
-            liens = [
-                a["href"] for a in soup.find_all("a", href=True)
-                if a["href"].startswith("/wiki/") and not a["href"].startswith("/wiki/Fichier:")
-            ]
+            liens = [a["href"] for a in soup.find_all("a", href=True) if self.estLienArticle(a["href"])]
             return liens
 
         # Obtenir la liste des sections de la page
@@ -224,9 +312,12 @@ class BatchProcessingTitresExtraction(BatchProcessing):
 
 
 
-    def chargerEntrees(self) -> List[EntreeHistorique]:
+    def chargerEntrees(self) -> Iterator[EntreeHistorique]:
         """
-        Charge les entrées à partir d’un mot-clé ou d’un backlink.
+        Charge les entrées à partir d’un backlink, en un seul passage sur list=backlinks.
+        Les liens sortants de la page principale et des articles détaillés sont extraits d'abord ;
+        les backlinks sont ensuite produits au fil de l'eau, avec leur niveau de cross-référence,
+        pour que les premiers fichiers batch soient écrits pendant l'énumération.
         """
 
         def normaliserTitre(titre: str) -> str:
@@ -235,84 +326,78 @@ class BatchProcessingTitresExtraction(BatchProcessing):
             return titre.strip()
 
 
-        if self.bltitle:
-            # 🔍 Étape 1 : construire la liste des pages qui référence la page principale
-            print(f"[ℹ] Estimation des backlinks vers : {self.bltitle} ...")
-            total = self.compter_backlinks_exhaustif(self.bltitle, pause=self.pause, max_pages=self.max_lignes)
-            print(f"[ℹ] La page « {self.bltitle} » est référencée par {total} page(s) Wikipédia.")
-            print(f"[⏳] Chargement de la totalité des {total} pages...")
-
-            lignes_brutes = self.recherche_par_backlink(self.bltitle, limit=self.max_lignes or total)
-            entrees = []
-
-
-            # 🔍 Étape 2 : on récupère les articles détaillés depuis le fichier CSV
-            titres_lus = list(self.plagesSections.keys())
-            articles_detailles = titres_lus[1:] if len(titres_lus) > 1 else []
-
-
-            # On définit 2 listes pour le niveau de crossRéférence
-            titres_crossRef2 = [self.bltitle]
-            titres_crossRef1 = articles_detailles
-
-            print(f"[🔗] Pages à explorer en plus pour liens sortants : {articles_detailles}")
-
-            # 🔍 Étape 3 : extraire tous les liens sortants de ces pages
-            liens_sortants_global1 = []
-            for titre in titres_crossRef1:
-                index_min, index_max = self.plagesSections.get(titre, (None, None))
-                liens = self.getLiensSortantsParAPIParse(titre, index_min, index_max)
-                liens_sortants_global1.extend(normaliserTitre(self.extraireTitreDepuisLienWiki(t)) for t in liens)
-
+        if not self.bltitle:
+            raise ValueError("Aucun mot-clé (--motCle) ou backlink (--backlink) fourni.")
 
-            liens_sortants_global2 = []
-            for titre in titres_crossRef2:
-                index_min, index_max = self.plagesSections.get(titre, (None, None))
-                liens = self.getLiensSortantsParAPIParse(titre, index_min, index_max)
-                liens_sortants_global2.extend(normaliserTitre(self.extraireTitreDepuisLienWiki(t)) for t in liens)
+        # 🔍 Étape 1 : on récupère les articles détaillés depuis le fichier CSV
+        titres_lus = list(self.plagesSections.keys())
+        articles_detailles = titres_lus[1:] if len(titres_lus) > 1 else []
 
-            print(f"[✅] {len(liens_sortants_global1)+len(liens_sortants_global2)} liens sortants extraits depuis {len(articles_detailles)+1} page(s).")
+        # On définit 2 listes pour le niveau de crossRéférence
+        titres_crossRef2 = [self.bltitle]
+        titres_crossRef1 = articles_detailles
 
-            # Intersection
-            titres_backlinks = set(normaliserTitre(l["titre"]) for l in lignes_brutes if "titre" in l)
-            titres_sortants1 = set(liens_sortants_global1)
-            titres_sortants2 = set(liens_sortants_global2)
-            titres_croises1 = titres_backlinks & titres_sortants1
-            titres_croises2 = titres_backlinks & titres_sortants2
-            print(f"[🔁] {len(titres_croises2)} page(s) cross-référencée(s) de niveau 2 sur {len(lignes_brutes)} backlinks.")
-            print(f"[🔁] {len(titres_croises1)} page(s) cross-référencée(s) de niveau 1 sur {len(lignes_brutes)} backlinks.")
+        print(f"[🔗] Pages à explorer en plus pour liens sortants : {articles_detailles}")
 
-            # On crée les EntreeHistorique
-            for ligne in lignes_brutes:
-                titre=ligne.get("titre", "")
-                if  (titre in titres_croises2):
-                    crossReferenceLevel = 2
-                elif (titre in titres_croises1):
-                    crossReferenceLevel = 1
-                else:
-                    crossReferenceLevel = 0
-                ent = EntreeHistorique(
-                    titre=titre,
-                    url=ligne.get("url", ""),
-                    source_backlink=self.bltitle,
-                    crossReference=crossReferenceLevel
-                )
-                entrees.append(ent)
+        # 🔍 Étape 2 : extraire tous les liens sortants de ces pages
+        liens_sortants_global1 = []
+        for titre in titres_crossRef1:
+            index_min, index_max = self.plagesSections.get(titre, (None, None))
+            liens = self.getLiensSortantsParAPIParse(titre, index_min, index_max)
+            liens_sortants_global1.extend(normaliserTitre(self.extraireTitreDepuisLienWiki(t)) for t in liens)
 
 
-            return entrees
+        liens_sortants_global2 = []
+        for titre in titres_crossRef2:
+            index_min, index_max = self.plagesSections.get(titre, (None, None))
+            liens = self.getLiensSortantsParAPIParse(titre, index_min, index_max)
+            liens_sortants_global2.extend(normaliserTitre(self.extraireTitreDepuisLienWiki(t)) for t in liens)
 
+        print(f"[✅] {len(liens_sortants_global1)+len(liens_sortants_global2)} liens sortants extraits depuis {len(articles_detailles)+1} page(s).")
 
+        titres_sortants1 = set(liens_sortants_global1)
+        titres_sortants2 = set(liens_sortants_global2)
 
+        # 🔍 Étape 3 : énumération unique des backlinks, reprise au dernier point de contrôle
+        if self.reprise:
+            print(f"[↩️] Reprise de l'énumération des backlinks vers « {self.bltitle} » (batch {self.writer.compteur_fichier})")
         else:
-            raise ValueError("Aucun mot-clé (--motCle) ou backlink (--backlink) fourni.")
-
-
-
-    def contientLienDansHTML(self, titre_page: str, lien_cible: str) -> bool:
+            print(f"[⏳] Énumération des backlinks vers : {self.bltitle} ...")
+
+        nbBacklinks = 0
+        nbCroises = {1: 0, 2: 0}
+        for ligne, position in self.iterBacklinks(self.bltitle, limit=self.max_lignes, reprise=self.reprise):
+            titre = ligne.get("titre", "")
+            titre_norm = normaliserTitre(titre)
+            if titre_norm in titres_sortants2:
+                crossReferenceLevel = 2
+            elif titre_norm in titres_sortants1:
+                crossReferenceLevel = 1
+            else:
+                crossReferenceLevel = 0
+            if crossReferenceLevel:
+                nbCroises[crossReferenceLevel] += 1
+
+            self.positionsBacklinks[titre] = position
+            nbBacklinks += 1
+            yield EntreeHistorique(
+                titre=titre,
+                url=ligne.get("url", ""),
+                source_backlink=self.bltitle,
+                crossReference=crossReferenceLevel
+            )
+
+        print(f"[ℹ] La page « {self.bltitle} » est référencée par {nbBacklinks} page(s) Wikipédia (énumérées dans ce run).")
+        print(f"[🔁] {nbCroises[2]} page(s) cross-référencée(s) de niveau 2 sur {nbBacklinks} backlinks.")
+        print(f"[🔁] {nbCroises[1]} page(s) cross-référencée(s) de niveau 1 sur {nbBacklinks} backlinks.")
+
+
+
+    def contientLienDansHTML(self, titre_page: str, lien_cible: str, revid: Optional[int] = None) -> bool:
         """
         Vérifie si la page Wikipedia `titre_page` contient un lien HTML vers `lien_cible`
         dans la section principale de contenu (div.mw-parser-output), en excluant les boîtes de navigation.
+        Si `revid` est fourni, c'est cette révision précise qui est analysée (oldid).
         """
 
         # Encodage du lien cible au format utilisé dans les href Wikipedia
@@ -323,16 +408,18 @@ class BatchProcessingTitresExtraction(BatchProcessing):
         params = {
             "action": "parse",
             "format": "json",
-            "page": titre_page,
             "prop": "text"
         }
+        # Révision explicite : la réponse mise en cache correspond à la révision du verdict
+        if revid:
+            params["oldid"] = revid
+        else:
+            params["page"] = titre_page
 
         try:
-            response = requests.get(url_api, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self.requeteWikiMedia(url_api, params=params)
 
-            if "parse" not in data or "text" not in data["parse"]:
+            if not data or "parse" not in data or "text" not in data["parse"]:
                 print(f"[⚠️] Page {titre_page} sans contenu HTML.")
                 return False
 
@@ -367,77 +454,271 @@ class BatchProcessingTitresExtraction(BatchProcessing):
 
 
 
-    def traiterLigne(self, ligne: EntreeHistorique) -> EntreeHistorique:
+    def preFiltrerLiens(self, titres: List[str], cible: str):
         """
-        Méthode par défaut : retourne la ligne sans modification.
-        Peut être redéfinie dans les classes filles pour traitement spécifique.
+        Pré-filtre groupé : une requête prop=links&pltitles=<cible> pour 50 titres au plus.
+        Retourne ({titre: revid}, titres ayant au moins un lien vers la cible),
+        ou ({}, None) si la requête échoue.
         """
-        if ligne.crossReference>0:
-            self.pagesTraitée += 1
-            lienDansTexte = self.contientLienDansHTML(ligne.titre, self.bltitle)
-            if not lienDansTexte:
-                self.pagesIgnoree+=1
-                logger.warning(f"[❌] {ligne.titre} ignorée (pas de lien réel vers {self.bltitle})")
+        url = "https://fr.wikipedia.org/w/api.php"
+        params = {
+            "action": "query",
+            "format": "json",
+            "prop": "links|info",
+            "titles": "|".join(titres),
+            "pltitles": cible,
+            "pllimit": "max"
+        }
+
+        if self.indexLiens:
+            # Pas de numéro de révision hors ligne : les verdicts HTML ne sont pas mémorisés
+            return {}, {titre for titre in titres if self.indexLiens.lie(titre, cible)}
+
+        revisions = {}
+        avecLien = set()
+        normalises = {}
+        continuation = {}
+        while True:
+            data = self.requeteWikiMedia(url, params={**params, **continuation})
+            if not data or "query" not in data:
+                logger.warning(f"[⚠️ Pré-filtre liens] Échec de la requête pour {len(titres)} titre(s)")
+                return {}, None
+
+            query = data["query"]
+            normalises.update({n["to"]: n["from"] for n in query.get("normalized", [])})
+            for page in query.get("pages", {}).values():
+                titre = normalises.get(page.get("title"), page.get("title"))
+                if "lastrevid" in page:
+                    revisions[titre] = page["lastrevid"]
+                if page.get("links"):
+                    avecLien.add(titre)
+
+            continuation = data.get("continue", {})
+            if not continuation:
+                break
+
+        return revisions, avecLien
 
-            if self.pagesTraitée % 10 == 0:
-                print(f"{self.pagesIgnoree} pages ignorées sur {self.pagesTraitée} pages traitées ")
 
-            if not lienDansTexte:
+    def verifierLiensEnLot(self, titres: List[str], cible: str) -> Dict[str, bool]:
+        """
+        Vérifie pour chaque titre que la page contient un lien réel vers `cible`, en deux passes :
+        pré-filtre groupé sur prop=links, puis contrôle HTML (contientLienDansHTML) des seules pages restantes.
+        Les verdicts HTML sont mémorisés par numéro de révision.
+        """
+        verdicts = {}
+        for debut in range(0, len(titres), NB_TITRES_PAR_REQUETE):
+            lot = titres[debut:debut + NB_TITRES_PAR_REQUETE]
+            revisions, avecLien = self.preFiltrerLiens(lot, cible)
+
+            for titre in lot:
+                if avecLien is not None and titre not in avecLien:
+                    self.pagesEcarteesPreFiltre += 1
+                    verdicts[titre] = False
+                    continue
+
+                revid = revisions.get(titre)
+                verdict = self.verdicts.lire(titre, cible, revid) if self.verdicts and revid else None
+                if verdict is None:
+                    verdict = self.contientLienDansHTML(titre, cible, revid)
+                    if self.verdicts and revid:
+                        self.verdicts.ecrire(titre, cible, revid, verdict)
+                verdicts[titre] = verdict
+
+        return verdicts
+
+
+    def traiterBatch(self, lignes: List[EntreeHistorique]):
+        """
+        Les pages cross-référencées du batch sont vérifiées ensemble ; les autres passent telles quelles.
+        """
+        aVerifier = [ligne.titre for ligne in lignes if ligne.crossReference > 0]
+        verdicts = self.verifierLiensEnLot(aVerifier, self.bltitle) if aVerifier else {}
+
+        for ligne in lignes:
+            if ligne.crossReference > 0 and not self.enregistrerVerdict(ligne, verdicts.get(ligne.titre, False)):
+                self.gerer_echec(ligne)
+            else:
+                self.writer.ajouter(ligne)
+
+
+    def enregistrerVerdict(self, ligne: EntreeHistorique, lienDansTexte: bool) -> bool:
+        self.pagesTraitée += 1
+        if not lienDansTexte:
+            self.pagesIgnoree += 1
+            logger.warning(f"[❌] {ligne.titre} ignorée (pas de lien réel vers {self.bltitle})")
+
+        if self.pagesTraitée % 10 == 0:
+            print(f"{self.pagesIgnoree} pages ignorées sur {self.pagesTraitée} pages traitées "
+                  f"({self.pagesEcarteesPreFiltre} écartées par le pré-filtre)")
+        return lienDansTexte
+
+
+    def traiterLigne(self, ligne: EntreeHistorique) -> EntreeHistorique:
+        """
+        Traitement unitaire (nbLignesBatch = 1) : même vérification que traiterBatch, page par page.
+        """
+        if ligne.crossReference>0:
+            verdict = self.verifierLiensEnLot([ligne.titre], self.bltitle).get(ligne.titre, False)
+            if not self.enregistrerVerdict(ligne, verdict):
                 return None
 
         return ligne
 
 
 
-    def recherche_par_backlink(self, titre_page: str, limit: int = 10000) -> List[EntreeHistorique]:
+    def iterBacklinks(self, titre_page: str, limit: Optional[int] = None, reprise: Optional[dict] = None):
         """
-        Récupère toutes les pages qui contiennent un lien vers la page cible Wikipédia.
-        :param titre_page: ex: "Jeanne_d'Arc"
-        :param limit: nombre maximal de résultats
-        :return: Liste d'objets EntreeHistorique
+        Parcourt list=backlinks page par page et produit chaque backlink dès sa réception.
+        Chaque élément est accompagné de sa position {"blcontinue", "index"} : le jeton qui a servi
+        à obtenir la page de résultats et le rang dans cette page, ce qui permet une reprise exacte.
+        :param reprise: position du dernier backlink déjà traité, l'énumération reprend juste après
         """
+        if self.indexLiens:
+            yield from self.iterBacklinksIndex(titre_page, limit, reprise)
+            return
+
         url = "https://fr.wikipedia.org/w/api.php"
-        backlinks = []
-        blcontinue = None
+        blcontinue = reprise.get("blcontinue") if reprise else None
+        aSauter = reprise.get("index", -1) + 1 if reprise else 0
+        nb = 0
 
-        while len(backlinks) < limit:
+        while limit is None or nb < limit:
             params = {
                 "action": "query",
                 "list": "backlinks",
                 "bltitle": titre_page,
                 "format": "json",
-                "bllimit": min(500, limit - len(backlinks)),
+                "bllimit": 500,
             }
             if blcontinue:
                 params["blcontinue"] = blcontinue
 
             response = self.requeteWikiMedia(url, params=params)
-
-            for entry in response.get("query", {}).get("backlinks", []):
+            if response is None:
+                raise RuntimeError(f"[❌] Échec de list=backlinks pour {titre_page} (blcontinue={blcontinue})")
+
+            for index, entry in enumerate(response.get("query", {}).get("backlinks", [])):
+                if index < aSauter:
+                    continue
+                if limit is not None and nb >= limit:
+                    return
                 titre = entry["title"]
                 url_page = f"https://fr.wikipedia.org/wiki/{titre.replace(' ', '_')}"
-
-                backlinks.append({
+                nb += 1
+                yield {
                     "titre": titre,
                     "url": url_page,
                     "source": "backlink"
-                })
+                }, {"blcontinue": blcontinue, "index": index}
+            aSauter = 0
 
             blcontinue = response.get("continue", {}).get("blcontinue")
             if not blcontinue:
                 break
 
-        return backlinks
 
+    def iterBacklinksIndex(self, titre_page: str, limit: Optional[int] = None, reprise: Optional[dict] = None):
+        """
+        Même contrat que iterBacklinks, à partir de l'index local des liens : la position est le rang
+        dans la liste des pages entrantes (ordre des titres), blcontinue reste vide.
+        """
+        aSauter = reprise.get("index", -1) + 1 if reprise else 0
+        titres = self.indexLiens.entrants(titre_page)
+        if limit is not None:
+            titres = titres[:aSauter + limit]
+        for index in range(aSauter, len(titres)):
+            titre = titres[index]
+            yield {
+                "titre": titre,
+                "url": f"https://fr.wikipedia.org/wiki/{titre.replace(' ', '_')}",
+                "source": "backlink"
+            }, {"blcontinue": None, "index": index}
+
+
+    def recherche_par_backlink(self, titre_page: str, limit: int = 10000) -> List[dict]:
+        """
+        Récupère toutes les pages qui contiennent un lien vers la page cible Wikipédia.
+        :param titre_page: ex: "Jeanne_d'Arc"
+        :param limit: nombre maximal de résultats
+        :return: Liste de dictionnaires {titre, url, source}
+        """
+        return [ligne for ligne, _ in self.iterBacklinks(titre_page, limit=limit)]
+
+
+    # ───────────────────────────────────────
+    # Point de contrôle de l'énumération
+    # ───────────────────────────────────────
+    def cheminReprise(self) -> str:
+        return os.path.join(REPERTOIRE_REPRISE, f"{self.runId}_step1.json")
+
+    def chargerReprise(self) -> Optional[dict]:
+        chemin = self.cheminReprise()
+        if not os.path.exists(chemin):
+            return None
+        with open(chemin, "r", encoding="utf-8") as f:
+            etat = json.load(f)
+        if etat.get("bltitle") != self.bltitle:
+            print(f"[⚠️] Point de reprise ignoré : il concerne « {etat.get('bltitle')} »")
+            return None
+        return etat
+
+    def desactiverReprise(self):
+        """
+        Mode pipeline : les lots en vol ne sont pas persistés. Le point de reprise d'un listener interrompu
+        sur le même runId est laissé intact.
+        """
+        self.pointDeReprise = False
+        self.reprise = None
+        self.writer.surSauvegarde = None
+
+    def sauverReprise(self, lignes: List[EntreeHistorique], compteur_fichier: int):
+        """
+        Appelée par le writer après chaque fichier batch : mémorise la position du dernier backlink
+        écrit et le numéro du prochain fichier.
+        """
+        dernier = lignes[-1].titre
+        position = None
+        # Les positions antérieures sont soit écrites, soit rejetées : on peut les oublier
+        while self.positionsBacklinks:
+            titre, position = self.positionsBacklinks.popitem(last=False)
+            if titre == dernier:
+                break
+        if position is None:
+            return
 
-    # On crée un fichier STOP à la fin
+        etat = {
+            "bltitle": self.bltitle,
+            "blcontinue": position["blcontinue"],
+            "index": position["index"],
+            "compteur_fichier": compteur_fichier + 1,
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        os.makedirs(REPERTOIRE_REPRISE, exist_ok=True)
+        chemin = self.cheminReprise()
+        with open(chemin + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(etat, f, ensure_ascii=False)
+        os.replace(chemin + ".tmp", chemin)
+
+
+    # On crée un fichier STOP à la fin, l'énumération étant complète le point de reprise n'a plus lieu d'être
     def executer(self):
         super().executer()  # Ou traitement principal de l’étape 1
+        self.terminerEnumeration()
+
+    def executerEnParallele(self, concurrence: int = 8):
+        super().executerEnParallele(concurrence)
+        self.terminerEnumeration()
+
+    def terminerEnumeration(self):
+        if self.pointDeReprise and os.path.exists(self.cheminReprise()):
+            os.remove(self.cheminReprise())
         self.writer.creerFichierStop()
 
 
 # test unitaress
 if __name__ == "__main__":
+    configurerLogs()
     batch = BatchProcessingTitresExtraction("JD01", "dossierTest")
 
     for titre in batch.plagesSections.keys():
@@ -1,14 +1,30 @@
-import time
-import requests
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from src.wikiDataLoader import BatchProcessing, BatchWriterJSON, BatchReaderJSON, logger
-from src.wikiDataLoader import EntreeHistorique, LigneProcess
+from src.wikiDataLoader import EntreeHistorique, LigneProcess, moduleOptionnel
+from src.tailleLot import LIMITE_API, obtenirControleurTailleLot
+from src.wikiCache import obtenirCacheResolution
 
 
 class BatchProcessingQidDepuisWikipedia(BatchProcessing):
+    PHASES_PROFIL = ("recupererQidDepuisWikipedia",)
+
     def __init__(self, runId: str, fichierInput: str, dossierSortie: str, pause: float = 0.5):
-        super().__init__(runId=runId, etape=2, nbLignesBatch = 20)
+        super().__init__(runId=runId, etape=2, nbLignesBatch = LIMITE_API["pageprops"])
+        self.controleur = obtenirControleurTailleLot(2, LIMITE_API["pageprops"])
+        # Mode hors ligne : lookups dans l'index construit depuis un dump Wikidata, sans limite d'API
+        indexWikidata = moduleOptionnel("src.indexWikidata")
+        self.index = indexWikidata.obtenirIndexWikidata() if indexWikidata else None
+        if self.index:
+            self.controleur = None
+            self.nbLignesBatch = indexWikidata.TAILLE_LOT_HORS_LIGNE
+        # Pré-filtre optionnel : titres déjà présents dans WikiCarto.db
+        filtreConnus = moduleOptionnel("src.filtreConnus")
+        self.filtre = filtreConnus.obtenirFiltreConnus() if filtreConnus else None
+        # Titre → (titre canonique, pageid, QID), partagé entre runs (None si cache désactivé)
+        self.resolution = obtenirCacheResolution()
+        self.nbResolusCache = 0
+        self.nbResolusReseau = 0
 
         self.reader = BatchReaderJSON(fichierInput)
         self.writer = BatchWriterJSON(
@@ -18,16 +34,22 @@ class BatchProcessingQidDepuisWikipedia(BatchProcessing):
         )
         self.pause = pause
 
-    def chargerEntrees(self) -> List[EntreeHistorique]:
-        lignes = self.reader.loadLignes()
-        print(f"✅ {len(lignes)} lignes chargées depuis {self.reader.fichierSource}")
-        return lignes
+    def chargerEntrees(self) -> Iterator[EntreeHistorique]:
+        return self.lireEntrees()
 
     def traiterBatch(self, lignes: List[EntreeHistorique]):
-        titres = [ligne.titre for ligne in lignes if ligne.titre]
+        if self.filtre:
+            nbConnues = self.filtre.marquerParTitre(lignes)
+            if nbConnues:
+                logger.info(f"[🧮 Déjà en base] {nbConnues} titre(s) sur {len(lignes)} : pas de requête pageprops")
+
+        titres = [ligne.titre for ligne in lignes if ligne.titre and not ligne.connue]
         qids_par_titre = self.recupererQidDepuisWikipedia(titres)
 
         for ligne in lignes:
+            if ligne.connue:
+                self.writer.ajouter(ligne)
+                continue
             qid = qids_par_titre.get(ligne.titre)
             if not qid:
                 logger.warning(f"[❌ QID manquant] {ligne.titre}")
@@ -35,38 +57,85 @@ class BatchProcessingQidDepuisWikipedia(BatchProcessing):
             ligne.qid = qid
             self.writer.ajouter(ligne)
 
+    def finTraitement(self):
+        if self.nbResolusCache or self.nbResolusReseau:
+            logger.info(f"[🗄️ Résolution titres] {self.nbResolusCache} titre(s) déjà résolus, "
+                        f"{self.nbResolusReseau} résolus via l'API")
+
     def recupererQidDepuisWikipedia(self, titres: List[str]) -> dict:
         """
-        Envoie une requête batch à l’API Wikipedia pour obtenir les QID des titres.
-        Retourne un dictionnaire {titre: qid}
+        Retourne un dictionnaire {titre: qid} pour les titres du lot.
+        Les titres déjà résolus (cache persistant, QID ou absence de QID) ne partent pas sur le réseau ;
+        les autres sont envoyés en une requête pageprops avec `redirects`.
         """
         resultats = {}
         if not titres:
             return resultats
 
-        titres_concat = "|".join(titres)
+        if self.index:
+            return self.index.qidsParTitre(titres)
+
+        aResoudre = list(dict.fromkeys(titres))
+        if self.resolution:
+            dejaResolus = self.resolution.lire(aResoudre)
+            for titre, (_, _, qid) in dejaResolus.items():
+                if qid:
+                    resultats[titre] = qid
+            self.nbResolusCache += len(dejaResolus)
+            aResoudre = [titre for titre in aResoudre if titre not in dejaResolus]
+        if not aResoudre:
+            return resultats
+
         url = "https://fr.wikipedia.org/w/api.php"
         params = {
             "action": "query",
             "prop": "pageprops",
+            "ppprop": "wikibase_item",
+            "redirects": 1,
             "format": "json",
-            "titles": titres_concat
+            "titles": "|".join(aResoudre)
         }
 
-        time.sleep(self.pause)
         data = self.requeteWikiMedia(url, params=params)
         if not data:
             logger.warning("[⚠️ QID Batch] Échec de la requête Wikipedia")
             return resultats
 
         try:
-            pages = data.get("query", {}).get("pages", {})
-            for page in pages.values():
-                titre = page.get("title")
-                qid = page.get("pageprops", {}).get("wikibase_item")
-                if titre and qid:
-                    resultats[titre] = qid
+            resolutions = self.resoudreTitres(aResoudre, data.get("query", {}))
         except Exception as e:
             logger.error(f"[⛔ Parsing QID Batch] Erreur lors du parsing : {e}")
+            return resultats
 
+        if self.resolution and resolutions:
+            self.resolution.ecrire(resolutions)
+        self.nbResolusReseau += len(resolutions)
+        for titre, (_, _, qid) in resolutions.items():
+            if qid:
+                resultats[titre] = qid
         return resultats
+
+    @staticmethod
+    def resoudreTitres(titres: List[str], query: dict) -> dict:
+        """
+        Rattache chaque titre demandé à sa page via les blocs normalized puis redirects
+        (soulignés, casse, redirections). Retourne {titre: (titre canonique, pageid, qid)} ;
+        un titre absent de la réponse (réponse tronquée) n'est pas résolu.
+        """
+        normalises = {n["from"]: n["to"] for n in query.get("normalized", [])}
+        redirections = {r["from"]: r["to"] for r in query.get("redirects", [])}
+        pages = {page.get("title"): page for page in query.get("pages", {}).values()}
+
+        resolutions = {}
+        for titre in titres:
+            cible = normalises.get(titre, titre)
+            vus = set()
+            while cible in redirections and cible not in vus:
+                vus.add(cible)
+                cible = redirections[cible]
+            page = pages.get(cible)
+            if page is None:
+                continue
+            qid = page.get("pageprops", {}).get("wikibase_item")
+            resolutions[titre] = (cible, page.get("pageid"), qid)
+        return resolutions
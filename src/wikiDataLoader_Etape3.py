@@ -1,14 +1,25 @@
-import time
-import requests
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from src.wikiDataLoader import BatchProcessing, BatchWriterJSON, BatchReaderJSON, logger
-from src.wikiDataLoader import EntreeHistorique, LigneProcess
+from src.wikiDataLoader import EntreeHistorique, LigneProcess, postTraiterGeoEnLot, moduleOptionnel
+from src.tailleLot import LIMITE_API, obtenirControleurTailleLot
 
 
 class BatchProcessingCoordonnees(BatchProcessing):
+    PHASES_PROFIL = ("recupererInfosWikidataBatchREST",)
+
     def __init__(self, runId: str, fichierInput: str, dossierSortie: str, pause: float = 0.5):
-        super().__init__(runId=runId, etape=3, nbLignesBatch = 20)
+        super().__init__(runId=runId, etape=3, nbLignesBatch = LIMITE_API["wbgetentities"])
+        self.controleur = obtenirControleurTailleLot(3, LIMITE_API["wbgetentities"])
+        # Mode hors ligne : lookups dans l'index construit depuis un dump Wikidata, sans limite d'API
+        indexWikidata = moduleOptionnel("src.indexWikidata")
+        self.index = indexWikidata.obtenirIndexWikidata() if indexWikidata else None
+        if self.index:
+            self.controleur = None
+            self.nbLignesBatch = indexWikidata.TAILLE_LOT_HORS_LIGNE
+        # Pré-filtre optionnel : QID déjà présents dans WikiCarto.db
+        filtreConnus = moduleOptionnel("src.filtreConnus")
+        self.filtre = filtreConnus.obtenirFiltreConnus() if filtreConnus else None
         self.reader = BatchReaderJSON(fichierInput)
         self.writer = BatchWriterJSON(
             dossier_sortie = dossierSortie,
@@ -18,10 +29,8 @@ class BatchProcessingCoordonnees(BatchProcessing):
         self.pause = pause
         self.batch = []
 
-    def chargerEntrees(self) -> List[EntreeHistorique]:
-        lignes = self.reader.loadLignes()
-        print(f"✅ {len(lignes)} lignes chargées depuis {self.reader.fichierSource}")
-        return lignes
+    def chargerEntrees(self) -> Iterator[EntreeHistorique]:
+        return self.lireEntrees()
 
 
     def recupererInfosWikidataBatchREST(self, liste_qids: List[str]) -> dict:
@@ -32,6 +41,9 @@ class BatchProcessingCoordonnees(BatchProcessing):
         if not liste_qids:
             return {}
 
+        if self.index:
+            return self.index.infosParQid(liste_qids)
+
         ids = "|".join(liste_qids)
         params = {
             "action": "wbgetentities",
@@ -80,10 +92,18 @@ class BatchProcessingCoordonnees(BatchProcessing):
 
 
     def traiterBatch(self, lignes: List[EntreeHistorique]):
-            qids = [ligne.qid for ligne in lignes if ligne.qid]
+            if self.filtre:
+                nbConnues = self.filtre.marquerParQid(lignes)
+                if nbConnues:
+                    logger.info(f"[🧮 Déjà en base] {nbConnues} QID sur {len(lignes)} : pas de requête wbgetentities")
+
+            qids = [ligne.qid for ligne in lignes if ligne.qid and not ligne.connue]
             infos_batch = self.recupererInfosWikidataBatchREST(qids)
 
+            candidates = []
             for ligne in lignes:
+                if ligne.connue:
+                    continue
                 infos = infos_batch.get(ligne.qid)
                 if not infos:
                     continue
@@ -92,13 +112,17 @@ class BatchProcessingCoordonnees(BatchProcessing):
                 ligne.lon = infos["lon"]
                 ligne.p31 = infos["p31"]
                 ligne.nbLangues = infos["nbLangues"]
+                candidates.append(ligne)
 
-                if not ligne.estGeolocaliseeEnFrance():
-                    logger.warning(f"[🌍 Coordonnées hors France] {ligne.titre} ignoré")
-                    return  # ou continue dans une boucle
+            # Projection Lambert-93, filtre France et notoriété sur tout le lot d'un coup
+            gardees = postTraiterGeoEnLot(candidates)
+            gardeesIds = {id(ligne) for ligne in gardees}
+            if len(gardees) < len(candidates):
+                for ligne in candidates:
+                    if id(ligne) not in gardeesIds:
+                        logger.warning(f"[🌍 Coordonnées hors France] {ligne.titre} ignoré")
 
-                ligne.convertirLambert93()
-                ligne.calculerNote()
-
-
-                self.writer.ajouter(ligne)
+            # Les lignes déjà en base passent telles quelles, dans l'ordre d'entrée
+            for ligne in lignes:
+                if ligne.connue or id(ligne) in gardeesIds:
+                    self.writer.ajouter(ligne)
@@ -1,15 +1,20 @@
-import time
-
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from src.wikiDataLoader import BatchProcessing, BatchWriterJSON, BatchReaderJSON, logger
 from src.wikiDataLoader import EntreeHistorique, LigneProcess
+from src.tailleLot import LIMITE_API, obtenirControleurTailleLot
+
 
+# exintro limite les extraits à 20 pages par requête action=query
+NB_TITRES_PAR_REQUETE = LIMITE_API["extracts"]
 
 
 class BatchProcessingResumeDescription(BatchProcessing):
-    def __init__(self, runId: str, fichierInput: str, dossierSortie: str, pause: float = 0.5):
-        super().__init__(runId=runId, etape=4, nbLignesBatch = 20)
+    PHASES_PROFIL = ("recupererResumesEtDescriptions", "recupererResumeEtDescription")
+
+    def __init__(self, runId: str, fichierInput: str, dossierSortie: str, pause: float = 0.5, modeBatch: bool = True):
+        super().__init__(runId=runId, etape=4, nbLignesBatch = NB_TITRES_PAR_REQUETE)
+        self.controleur = obtenirControleurTailleLot(4, NB_TITRES_PAR_REQUETE)
         self.reader = BatchReaderJSON(fichierInput)
         self.writer = BatchWriterJSON(
             dossier_sortie = dossierSortie,
@@ -17,22 +22,89 @@ class BatchProcessingResumeDescription(BatchProcessing):
             fichierSortie=fichierInput.replace("Step3", "Step4")
         )
         self.pause = pause
+        self.modeBatch = modeBatch
+        self.nbReplisREST = 0
 
-    def chargerEntrees(self) -> List[EntreeHistorique]:
-        lignes = self.reader.loadLignes()
-        print(f"✅ {len(lignes)} lignes chargées depuis {self.reader.fichierSource}")
-        return lignes
+    def chargerEntrees(self) -> Iterator[EntreeHistorique]:
+        return self.lireEntrees()
 
     def traiterBatch(self, lignes: List[EntreeHistorique]):
+        infos = {}
+        if self.modeBatch:
+            infos = self.recupererResumesEtDescriptions([ligne.titre for ligne in lignes if ligne.titre and not ligne.connue])
+
         for ligne in lignes:
-            time.sleep(self.pause)
-            resume, description = self.recupererResumeEtDescription(ligne.titre)
+            if ligne.connue:
+                # Déjà en base (cf. FiltreConnus) : aucun appel pour le résumé
+                self.writer.ajouter(ligne)
+                continue
+            resume, description = infos.get(ligne.titre, (None, None))
+            if not resume:
+                # Repli sur l'API REST pour les titres restés vides
+                if self.modeBatch:
+                    self.nbReplisREST += 1
+                resumeREST, descriptionREST = self.recupererResumeEtDescription(ligne.titre)
+                resume = resumeREST
+                description = description or descriptionREST
             if resume:
                 ligne.resume = resume
             if description:
                 ligne.description = description
             self.writer.ajouter(ligne)
 
+    def finTraitement(self):
+        if self.modeBatch and self.nbReplisREST:
+            logger.info(f"[ℹ️ Résumés] {self.nbReplisREST} titre(s) complété(s) via l'API REST")
+
+    def recupererResumesEtDescriptions(self, titres: List[str]) -> dict:
+        """
+        Récupère en une requête action=query l'introduction et la description courte de 20 titres au plus.
+        Les titres normalisés ou redirigés sont rattachés au titre d'origine.
+        Retourne un dictionnaire {titre: (resume, description)}
+        """
+        resultats = {}
+        if not titres:
+            return resultats
+
+        url = "https://fr.wikipedia.org/w/api.php"
+        params = {
+            "action": "query",
+            "format": "json",
+            "prop": "extracts|description|pageprops",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": NB_TITRES_PAR_REQUETE,
+            "ppprop": "wikibase-shortdesc",
+            "redirects": 1,
+            "titles": "|".join(titres)
+        }
+
+        data = self.requeteWikiMedia(url, params=params)
+        if not data or "query" not in data:
+            logger.warning("[⚠️ Résumés Batch] Échec de la requête Wikipedia")
+            return resultats
+
+        try:
+            query = data["query"]
+            normalises = {n["from"]: n["to"] for n in query.get("normalized", [])}
+            redirections = {r["from"]: r["to"] for r in query.get("redirects", [])}
+
+            pagesParTitre = {}
+            for page in query.get("pages", {}).values():
+                resume = (page.get("extract") or "").strip() or None
+                description = page.get("description") or page.get("pageprops", {}).get("wikibase-shortdesc")
+                pagesParTitre[page.get("title")] = (resume, description)
+
+            for titre in titres:
+                cible = normalises.get(titre, titre)
+                cible = redirections.get(cible, cible)
+                if cible in pagesParTitre:
+                    resultats[titre] = pagesParTitre[cible]
+        except Exception as e:
+            logger.error(f"[⛔ Parsing Résumés Batch] Erreur lors du parsing : {e}")
+
+        return resultats
+
     def recupererResumeEtDescription(self, titre: str) -> (Optional[str], Optional[str]):
         url = f"https://fr.wikipedia.org/api/rest_v1/page/summary/{titre.replace(' ', '_')}"
         try:
@@ -1,52 +1,103 @@
-from typing import List, Optional
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-from src.wikiDataLoader import BatchProcessing, BatchWriterSQLite, BatchReaderJSON, logger
+from src.wikiDataLoader import BatchProcessing, BatchWriterSQLite, BatchReaderJSON, CHAMPS_ENTREE, logger
 from src.wikiDataLoader import EntreeHistorique, LigneProcess
 
 
+# Classification de référence des P31 (statut garde / exclu), utilisée avant tout appel réseau
+CHEMIN_P31_CSV = "doc/P31categories_final_corrige.csv"
+NB_IDS_PAR_REQUETE = 50
+
+
+@lru_cache(maxsize=None)
+def lireClassificationP31(chemin_csv: str = CHEMIN_P31_CSV) -> Tuple[Tuple[str, str, str], ...]:
+    """
+    Retourne les lignes (p31, label, statut) du CSV de classification, ou rien s'il est absent.
+    """
+    if not os.path.exists(chemin_csv):
+        logger.warning(f"[⚠️] Classification P31 introuvable : {chemin_csv}")
+        return ()
+    with open(chemin_csv, newline='', encoding='utf-8') as f:
+        return tuple((row["p31"], row["label"], row["statut"]) for row in csv.DictReader(f) if row.get("p31"))
+
+
 class BatchProcessingInsertionBD(BatchProcessing):
-    def __init__(self, runId: str,fichierInput : str, db: str):
+    PHASES_PROFIL = ("recupererLabelsDepuisAPI",)
+
+    def __init__(self, runId: str,fichierInput : str, db: str, writer: Optional[BatchWriterSQLite] = None):
         super().__init__(runId=runId, etape=5, nbLignesBatch = 1)
         self.nom_process = "InsertionBD"
-        self.reader = BatchReaderJSON(fichierInput)
-        self.writer = BatchWriterSQLite(db)
-        self.p31Connus = set()
+        # process n'est pas inséré en base : inutile de le lire (fichiers Parquet)
+        self.reader = BatchReaderJSON(fichierInput, colonnes=CHAMPS_ENTREE)
+        # Un writer persistant peut être partagé entre fichiers batch (listener, pipeline)
+        self.writer = writer if writer is not None else BatchWriterSQLite(db)
 
     def chargerEntrees(self) -> List[EntreeHistorique]:
         lignes = self.reader.loadLignes()
         print(f"✅ {len(lignes)} lignes chargées depuis {self.reader.fichierSource}")
 
-        # On charge aussi la table P31Classification
-        cursor = self.writer.conn.cursor()
-        cursor.execute("SELECT p31 FROM P31Classification")
-        self.p31Connus = {row[0] for row in cursor.fetchall()}
+        # SourceBacklink et P31Classification sont gardées en mémoire par le writer
+        self.writer.chargerReferentiels()
+        self.semerClassificationP31()
 
         # Extraire tous les P31 présents dans les lignes à traiter
         p31DansBatch = set()
         for entree in lignes:
-            if entree.p31 is not None:
-                p31DansBatch.update(entree.p31)
-        nouveauxP31 = p31DansBatch - self.p31Connus
+            if entree.p31 and entree.p31.startswith("Q"):
+                p31DansBatch.add(entree.p31)
+        nouveauxP31 = sorted(p31DansBatch - self.writer.p31Connus)
         # Affichage du nombre de nouveaux P31 à insérer
         print(f"[📊] {len(nouveauxP31)} nouveaux P31 à insérer dans P31Classification.")
 
+        # Préchargement des labels : aucun appel réseau dans la boucle d'insertion
+        labels = self.recupererLabelsDepuisAPI(nouveauxP31)
+        for p31 in nouveauxP31:
+            self.writer.ajouterP31(p31, labels.get(p31))
+
         return lignes
 
 
-    def recupererLabelDepuisAPI(self, qid: str) -> Optional[str]:
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
-        data = self.requeteWikiMedia(url, raw_url=True)
+    def semerClassificationP31(self):
+        """
+        Alimente P31Classification depuis le CSV de référence (INSERT OR IGNORE) pour que les P31
+        déjà classés ne passent jamais par l'API.
+        """
+        nb = 0
+        for p31, label, statut in lireClassificationP31():
+            if self.writer.ajouterP31(p31, label, statut):
+                nb += 1
+        if nb:
+            print(f"[🌱] {nb} P31 ajoutés depuis {CHEMIN_P31_CSV}")
 
-        if not data:
-            logger.warning(f"[⚠️] Aucune donnée récupérée pour {qid}")
-            return None
 
-        try:
-            label = data["entities"][qid]["labels"]["fr"]["value"]
-            return label
-        except KeyError:
-            logger.warning(f"[⚠️] Label FR introuvable pour {qid}")
-            return None
+    def recupererLabelsDepuisAPI(self, qids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Labels français d'une liste de QID, par paquets de 50 via wbgetentities (labels uniquement).
+        """
+        labels = {}
+        for i in range(0, len(qids), NB_IDS_PAR_REQUETE):
+            paquet = qids[i:i + NB_IDS_PAR_REQUETE]
+            params = {
+                "action": "wbgetentities",
+                "format": "json",
+                "ids": "|".join(paquet),
+                "props": "labels",
+                "languages": "fr",
+            }
+            data = self.requeteWikiMedia("https://www.wikidata.org/w/api.php", params=params)
+            if not data or "entities" not in data:
+                logger.warning(f"[⚠️] Aucune donnée récupérée pour {len(paquet)} P31")
+                continue
+
+            for qid in paquet:
+                label = data["entities"].get(qid, {}).get("labels", {}).get("fr", {}).get("value")
+                if label is None:
+                    logger.warning(f"[⚠️] Label FR introuvable pour {qid}")
+                labels[qid] = label
+        return labels
 
 
     def traiterLigne(self, ligne):
@@ -56,36 +107,21 @@ class BatchProcessingInsertionBD(BatchProcessing):
         """
 
         # Ajout automatique dans SourceBacklink si absent
-        cursor = self.writer.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM SourceBacklink WHERE source_backlink = ?", (ligne.source_backlink,))
-        count = cursor.fetchone()[0]
-
-        if count == 0 and ligne.source_backlink:
-            cursor.execute("""
-                INSERT INTO SourceBacklink (source_backlink, url, couleur, visible)
-                VALUES (?, ?, ?, ?)
-            """, (
-                ligne.source_backlink,
-                ligne.url,         # Par défaut, on utilise l'URL de l’entrée
-                "(0,0,0)",         # Couleur par défaut
-                1                  # Visible = True
-            ))
+        if ligne.source_backlink and self.writer.ajouterSource(ligne.source_backlink, ligne.url):
             print(f"[➕] SourceBacklink ajoutée : {ligne.source_backlink}")
 
+        if ligne.connue:
+            # Déjà en base : le writer n'enregistre que l'association (qid, source_backlink)
+            return ligne
 
         if not ligne.p31 or not ligne.p31.startswith("Q"):
             logger.warning(f"[⚠️] P31 invalide ou manquant pour {ligne.qid} → {ligne.p31}")
             return ligne  # on ignore l'entrée sans planter
 
-        if ligne.p31 not in self.p31Connus:
-            label = self.recupererLabelDepuisAPI(ligne.p31)  # → appel Wikidata REST
-            cursor.execute(
-                "INSERT INTO P31Classification (p31, label, statut) VALUES (?, ?, ?)",
-                (ligne.p31, label, "non_defini")
-            )
-            self.p31Connus.add(ligne.p31)
+        # Les labels ont été préchargés dans chargerEntrees()
+        self.writer.ajouterP31(ligne.p31, None)
 
-        self.writer.ajouter(ligne)
+        # L'insertion est faite par executer() à partir de la ligne retournée
         return ligne
 
     def finTraitement(self):
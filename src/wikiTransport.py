@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+# requests (≈ 100 ms d'import) n'est chargé qu'à l'ouverture de la première session
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("wiki")
+
+
+USER_AGENT = "ChouetteBot/1.0 (https://jolylaurent78@gmail.com)"
+
+# Débit autorisé par hôte : (requêtes par seconde, rafale maximale)
+LIMITES_PAR_HOTE = {
+    "fr.wikipedia.org": (10.0, 10),
+    "www.wikidata.org": (5.0, 5),
+    "query.wikidata.org": (1.0, 2),
+}
+LIMITE_DEFAUT = (5.0, 5)
+
+# Paramètre maxlag ajouté aux appels api.php (en secondes de retard de réplication)
+MAXLAG = 5
+MAX_TENTATIVES = 5
+ATTENTE_DEFAUT = 5.0
+
+
+# ───────────────────────────────────────
+# Limiteur de débit : seau à jetons
+# ───────────────────────────────────────
+class SeauJetons:
+    """
+    Seau à jetons partagé entre threads : `debit` jetons par seconde, au plus `capacite` en réserve.
+    `suspendre()` bloque l'hôte pendant la durée demandée par un Retry-After.
+    """
+
+    def __init__(self, debit: float, capacite: int):
+        self.debit = debit
+        self.capacite = capacite
+        self.jetons = float(capacite)
+        self.dernier = time.monotonic()
+        self.repriseApres = 0.0
+        self._verrou = threading.Lock()
+
+    def acquerir(self) -> float:
+        """
+        Attend qu'un jeton soit disponible et le consomme. Retourne le temps d'attente total.
+        """
+        attenteTotale = 0.0
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                if maintenant < self.repriseApres:
+                    attente = self.repriseApres - maintenant
+                else:
+                    self.jetons = min(self.capacite, self.jetons + (maintenant - self.dernier) * self.debit)
+                    self.dernier = maintenant
+                    if self.jetons >= 1:
+                        self.jetons -= 1
+                        return attenteTotale
+                    attente = (1 - self.jetons) / self.debit
+            time.sleep(attente)
+            attenteTotale += attente
+
+    def suspendre(self, duree: float):
+        with self._verrou:
+            self.repriseApres = max(self.repriseApres, time.monotonic() + duree)
+            self.jetons = 0.0
+            self.dernier = self.repriseApres
+
+
+# ───────────────────────────────────────
+# Transport HTTP partagé
+# ───────────────────────────────────────
+class TransportHTTP:
+    """
+    Point de passage unique des appels HTTP vers Wikimedia :
+    une session keep-alive par hôte, un seau à jetons par hôte,
+    et respect des réponses 429 / 503 (Retry-After) et des erreurs maxlag.
+    `substitutions` redirige un hôte vers une autre URL de base (serveur local du benchmark) ;
+    le débit reste réglé par l'hôte d'origine.
+    """
+
+    def __init__(self, limites: Optional[dict] = None, pauseMin: Optional[float] = None, taillePool: int = 16,
+                 substitutions: Optional[dict] = None):
+        self.limites = dict(LIMITES_PAR_HOTE)
+        if limites:
+            self.limites.update(limites)
+        self.pauseMin = pauseMin
+        self.taillePool = taillePool
+        self.substitutions = {hote: urlsplit(base) for hote, base in (substitutions or {}).items()}
+
+        self.sessions = {}
+        self.seaux = {}
+        self._verrou = threading.Lock()
+
+    def _limitePourHote(self, hote: str):
+        debit, capacite = self.limites.get(hote, LIMITE_DEFAUT)
+        if self.pauseMin:
+            debit = min(debit, 1.0 / self.pauseMin)
+        return debit, capacite
+
+    def session(self, hote: str) -> "requests.Session":
+        with self._verrou:
+            session = self.sessions.get(hote)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adaptateur = HTTPAdapter(pool_connections=1, pool_maxsize=self.taillePool)
+                session.mount("https://", adaptateur)
+                session.mount("http://", adaptateur)
+                session.headers.update({"User-Agent": USER_AGENT})
+                self.sessions[hote] = session
+            return session
+
+    def seau(self, hote: str) -> SeauJetons:
+        with self._verrou:
+            seau = self.seaux.get(hote)
+            if seau is None:
+                seau = SeauJetons(*self._limitePourHote(hote))
+                self.seaux[hote] = seau
+            return seau
+
+    def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None, timeout: float = 10) -> "requests.Response":
+        return self._envoyer("GET", url, params=params, headers=headers, timeout=timeout)
+
+    def post(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, timeout: float = 10) -> "requests.Response":
+        """
+        Même traitement que get(), paramètres dans le corps : pour les listes de titres trop longues pour une URL.
+        """
+        return self._envoyer("POST", url, data=data, headers=headers, timeout=timeout)
+
+    def _envoyer(self, methode: str, url: str, params: Optional[dict] = None, data: Optional[dict] = None,
+                 headers: Optional[dict] = None, timeout: float = 10) -> "requests.Response":
+        morceaux = urlsplit(url)
+        hote = morceaux.netloc.lower()
+        session = self.session(hote)
+        seau = self.seau(hote)
+
+        substitution = self.substitutions.get(hote)
+        if substitution:
+            url = urlunsplit((substitution.scheme, substitution.netloc, substitution.path.rstrip("/") + morceaux.path,
+                              morceaux.query, morceaux.fragment))
+
+        if url.endswith("/api.php") and MAXLAG:
+            if params is not None:
+                params = dict(params, maxlag=MAXLAG)
+            if data is not None:
+                data = dict(data, maxlag=MAXLAG)
+
+        # Relances et attentes, attachées à la réponse pour les métriques de l'appelant
+        relances = []
+        attenteDebit = attenteRelance = 0.0
+        for tentative in range(1, MAX_TENTATIVES + 1):
+            attente = seau.acquerir()
+            if relances:
+                attenteRelance += attente
+            else:
+                attenteDebit += attente
+            response = session.request(methode, url, params=params, data=data, headers=headers, timeout=timeout)
+            response.relances, response.attenteDebit, response.attenteRelance = relances, attenteDebit, attenteRelance
+
+            maxlag = response.headers.get("MediaWiki-API-Error") == "maxlag"
+            if response.status_code not in (429, 503) and not maxlag:
+                return response
+
+            attente = self._lireRetryAfter(response)
+            motif = "maxlag" if maxlag else str(response.status_code)
+            logger.warning(f"[⚠️ {hote}] Requête refusée ({motif}) – Attente {attente:.0f}s (tentative {tentative}/{MAX_TENTATIVES})")
+            seau.suspendre(attente)
+            relances.append(motif)
+
+        return response
+
+    @staticmethod
+    def _lireRetryAfter(response) -> float:
+        try:
+            return max(float(response.headers.get("Retry-After", ATTENTE_DEFAUT)), 0.0)
+        except ValueError:
+            return ATTENTE_DEFAUT
+
+    def fermer(self):
+        with self._verrou:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+# ───────────────────────────────────────
+# Instance partagée par tous les BatchProcessing
+# ───────────────────────────────────────
+_config = {"limites": None, "pauseMin": None, "taillePool": 16, "substitutions": None}
+_instance = None
+
+
+def configurerTransport(limites: Optional[dict] = None, pauseMin: Optional[float] = None, taillePool: int = 16,
+                        substitutions: Optional[dict] = None):
+    global _instance
+    _config.update(limites=limites, pauseMin=pauseMin, taillePool=taillePool, substitutions=substitutions)
+    if _instance is not None:
+        _instance.fermer()
+        _instance = None
+
+
+def obtenirTransport() -> TransportHTTP:
+    global _instance
+    if _instance is None:
+        _instance = TransportHTTP(_config["limites"], _config["pauseMin"], _config["taillePool"], _config["substitutions"])
+    return _instance
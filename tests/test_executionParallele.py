@@ -0,0 +1,74 @@
+import contextvars
+import time
+
+from src.wikiCache import configurerCache
+from src.wikiDataLoader import BaseWriter, BatchProcessing, WriterOrdonne, _lotCourant
+
+
+class WriterListe(BaseWriter):
+    def __init__(self):
+        self.lignes = []
+
+    def ajouter(self, ligne):
+        self.lignes.append(ligne)
+
+    def besoinSauvegarder(self):
+        return False
+
+    def _sauvegarder_batch(self):
+        pass
+
+
+def _ecrireLot(writer, index, lignes):
+    def ecrire():
+        _lotCourant.set(index)
+        for ligne in lignes:
+            writer.ajouter(ligne)
+    contextvars.copy_context().run(ecrire)
+    writer.terminerLot(index)
+
+
+def test_writerOrdonne_lots_termines_dans_le_desordre():
+    reel = WriterListe()
+    writer = WriterOrdonne(reel)
+    _ecrireLot(writer, 2, ["e", "f"])
+    _ecrireLot(writer, 1, ["c", "d"])
+    assert reel.lignes == []
+    _ecrireLot(writer, 0, ["a", "b"])
+    assert reel.lignes == ["a", "b", "c", "d", "e", "f"]
+
+
+class TraitementLent(BatchProcessing):
+    """
+    Les premiers lots sont les plus lents : ils se terminent après les suivants.
+    """
+
+    def __init__(self, lignes):
+        super().__init__(runId="T", etape=4, nbLignesBatch=2)
+        self.lignes = lignes
+        self.writer = WriterListe()
+
+    def chargerEntrees(self):
+        return list(self.lignes)
+
+    def taggerLigne(self, entree):
+        pass
+
+    def traiterBatch(self, lot):
+        time.sleep(0.02 * (len(self.lignes) - lot[0]) / 2)
+        for ligne in lot:
+            self.writer.ajouter(ligne)
+
+    def traiterLigne(self, ligne):
+        return ligne
+
+    def gerer_echec(self, ligne):
+        pass
+
+
+def test_executerEnParallele_garde_l_ordre_d_entree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configurerCache(actif=False)
+    processor = TraitementLent(list(range(12)))
+    processor.executerEnParallele(concurrence=6)
+    assert processor.writer.lignes == list(range(12))
@@ -0,0 +1,114 @@
+import os
+import time
+
+from src.fileBaux import DOSSIER_BAUX, SONDE_HORLOGE, FileBaux
+
+STOP = "R1_STOP"
+
+
+def _publier(dossier, nom):
+    chemin = os.path.join(dossier, nom)
+    with open(chemin, "w") as f:
+        f.write("{}\n")
+    return chemin
+
+
+def _vieillir(file, chemin, secondes):
+    ancien = file.maintenant() - secondes
+    os.utime(chemin, (ancien, ancien))
+
+
+def test_reserver_un_seul_worker(tmp_path):
+    dossier = str(tmp_path)
+    w1, w2 = FileBaux(dossier, worker="w1"), FileBaux(dossier, worker="w2")
+    chemin = _publier(dossier, "R1_Step2_batch_001.json")
+
+    bail = w1.reserver(chemin)
+    assert bail.chemin == os.path.join(dossier, DOSSIER_BAUX, "w1", "R1_Step2_batch_001.json")
+    assert w2.reserver(chemin) is None
+    assert w1.fichiersEnAttente() == []
+    assert w2.baux() == [bail.chemin]
+
+
+def test_battement_de_coeur(tmp_path):
+    file = FileBaux(str(tmp_path), duree=0.3, worker="w1")
+    bail = file.reserver(_publier(str(tmp_path), "R1_Step2_batch_001.json"))
+    _vieillir(file, bail.chemin, 60)
+    with bail:
+        time.sleep(0.25)
+        assert file.maintenant() - os.stat(bail.chemin).st_mtime < 1
+    assert not bail._thread.is_alive()
+
+
+def test_recupererExpires(tmp_path):
+    dossier = str(tmp_path)
+    w1, w2 = FileBaux(dossier, duree=30, worker="w1"), FileBaux(dossier, duree=30, worker="w2")
+    expire = w1.reserver(_publier(dossier, "R1_Step2_batch_001.json"))
+    actif = w1.reserver(_publier(dossier, "R1_Step2_batch_002.json"))
+    _vieillir(w1, expire.chemin, 31)
+
+    assert w2.recupererExpires() == 1
+    assert w2.fichiersEnAttente() == ["R1_Step2_batch_001.json"]
+    assert w2.baux() == [actif.chemin]
+
+    # Le worker lent termine un bail déjà remis en file : rien n'est archivé
+    w1.terminer(expire, os.path.join(dossier, "Done"))
+    assert not os.path.exists(os.path.join(dossier, "Done", "R1_Step2_batch_001.json"))
+
+
+def test_stop_transmis_seulement_apres_tous_les_baux(tmp_path):
+    dossier, suivant = str(tmp_path / "step2"), str(tmp_path / "step3")
+    os.makedirs(dossier)
+    w1, w2 = FileBaux(dossier, worker="w1"), FileBaux(dossier, worker="w2")
+    debut = w2.maintenant()
+    bail = w1.reserver(_publier(dossier, "R1_Step2_batch_001.json"))
+    _publier(dossier, STOP)
+
+    # STOP reçu, plus rien en attente, mais un bail court encore chez w1
+    assert w2.fichiersEnAttente() == []
+    assert not w2.toutEstTermine()
+
+    w1.terminer(bail, os.path.join(dossier, "Done"))
+    assert w2.toutEstTermine()
+    assert w2.transmettreStop(STOP, suivant)
+    assert os.path.exists(os.path.join(suivant, STOP))
+    assert not os.path.exists(os.path.join(dossier, STOP))
+
+    # Les autres workers voient la trace et ne le transmettent pas une seconde fois
+    assert not w1.transmettreStop(STOP, suivant)
+    assert w1.stopTransmisDepuis(STOP, debut)
+    assert not w1.stopTransmisDepuis(STOP, w1.maintenant() + 60)
+
+
+def test_stop_archive_en_fin_de_chaine(tmp_path):
+    file = FileBaux(str(tmp_path), worker="w1")
+    _publier(str(tmp_path), STOP)
+    assert file.transmettreStop(STOP, None)
+    assert os.path.exists(os.path.join(str(tmp_path), "Done", STOP))
+
+
+def test_reserverExclusif(tmp_path):
+    dossier = str(tmp_path)
+    w1, w2 = FileBaux(dossier, duree=30, worker="w1"), FileBaux(dossier, duree=30, worker="w2")
+    verrou = w1.reserverExclusif("step5.lock")
+    assert verrou is not None
+    assert w2.reserverExclusif("step5.lock") is None
+
+    # Détenteur arrêté sans libérer : le verrou est repris une fois expiré
+    _vieillir(w1, verrou.chemin, 31)
+    repris = w2.reserverExclusif("step5.lock")
+    assert repris is not None
+    with open(repris.chemin) as f:
+        assert f.read() == "w2"
+    assert sorted(os.listdir(os.path.join(dossier, DOSSIER_BAUX))) == ["step5.lock", "w1", "w2"]
+
+    w2.liberer(repris)
+    assert w1.reserverExclusif("step5.lock") is not None
+
+
+def test_fermer_supprime_la_sonde(tmp_path):
+    file = FileBaux(str(tmp_path), worker="w1")
+    file.maintenant()
+    assert os.path.exists(os.path.join(file.dossierWorker, SONDE_HORLOGE))
+    file.fermer()
+    assert not os.path.exists(file.dossierWorker)
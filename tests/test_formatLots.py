@@ -0,0 +1,81 @@
+import pytest
+
+from src.wikiDataLoader import BatchReaderJSON, BatchWriterJSON, EntreeHistorique, LotEntrees
+from src.wikiDataLoader import decoderJSON, encoderJSONL, processPartage, schemaParquet
+
+
+def _entrees():
+    process = processPartage("R1", 3)
+    return [
+        EntreeHistorique("Orléans", "https://fr.wikipedia.org/wiki/Orl%C3%A9ans", "Q6548", "Jeanne d'Arc", 2,
+                         process, "Ville de la Loire.", "commune française", "Q484170", 47.9, 1.9,
+                         619300.5, 6753200.25, 120, 10, False),
+        EntreeHistorique("Domrémy-la-Pucelle", "https://fr.wikipedia.org/wiki/Domr%C3%A9my", "Q207590",
+                         "Jeanne d'Arc", 0, process, nbLangues=0, connue=True),
+        EntreeHistorique("Sans QID", "https://fr.wikipedia.org/wiki/Sans_QID", crossReference=1, process=process),
+    ]
+
+
+def test_entreeHistorique_aller_retour_octet_pour_octet():
+    entrees = _entrees()
+    jsonl = encoderJSONL(e.to_dict() for e in entrees)
+    relues = [EntreeHistorique.fromDict(decoderJSON(ligne)) for ligne in jsonl.splitlines()]
+    assert encoderJSONL(e.to_dict() for e in relues) == jsonl
+
+
+def test_entreeHistorique_to_dict_omet_les_none_et_garde_l_ordre():
+    d = _entrees()[1].to_dict()
+    assert list(d) == ["titre", "url", "qid", "source_backlink", "crossReference", "process", "nbLangues", "connue"]
+    assert d["process"] == {"run_id": "R1", "etape": 3}
+    assert d["crossReference"] == 0 and d["nbLangues"] == 0
+
+
+def test_fromDict_partage_process_et_chaines():
+    lignes = [EntreeHistorique.fromDict(decoderJSON(encoderJSONL([e.to_dict()]))) for e in _entrees()[:2]]
+    assert lignes[0].process is lignes[1].process is processPartage("R1", 3)
+    assert lignes[0].source_backlink is lignes[1].source_backlink
+
+
+def test_lotEntrees_equivaut_aux_entrees():
+    entrees = _entrees()
+    attendu = [e.to_dict() for e in entrees[:2]]
+
+    lot = LotEntrees.depuisEntrees(entrees[:2])
+    assert list(lot.versDicts()) == attendu
+    assert [e.to_dict() for e in lot] == attendu
+
+    relu = LotEntrees.depuisDicts(attendu)
+    assert relu.process is processPartage("R1", 3)
+    assert list(relu.versDicts()) == attendu
+    assert relu.tableau("lat")[1] != relu.tableau("lat")[1]   # None → NaN
+
+
+@pytest.mark.parametrize("format", ["jsonl", "parquet"])
+def test_batch_aller_retour(tmp_path, format):
+    entrees = _entrees()
+    writer = BatchWriterJSON(str(tmp_path), "R1_Step3", "R1", taille_batch=2, format=format)
+    for entree in entrees:
+        writer.ajouter(entree)
+    writer._sauvegarder_batch()
+
+    extension = ".json" if format == "jsonl" else ".parquet"
+    fichiers = sorted(tmp_path.iterdir())
+    assert [f.name for f in fichiers] == [f"R1_Step3_batch_00{i}{extension}" for i in (1, 2)]
+
+    relues = [e for f in fichiers for e in BatchReaderJSON(str(f), taille_bloc=64).iterLignes()]
+    assert [e.to_dict() for e in relues] == [e.to_dict() for e in entrees]
+    assert [type(e.crossReference) for e in relues] == [int, int, int]
+    assert relues[0].process is relues[2].process is processPartage("R1", 3)
+
+
+def test_parquet_colonnes_projetees(tmp_path):
+    writer = BatchWriterJSON(str(tmp_path), "R1_Step3", "R1", format="parquet")
+    for entree in _entrees():
+        writer.ajouter(entree)
+    writer._sauvegarder_batch()
+
+    chemin = str(tmp_path / "R1_Step3.parquet")
+    relues = BatchReaderJSON(chemin, colonnes=("titre", "crossReference")).loadLignes()
+    assert [(e.titre, e.crossReference, e.qid, e.process) for e in relues] == [
+        ("Orléans", 2, None, None), ("Domrémy-la-Pucelle", 0, None, None), ("Sans QID", 1, None, None)]
+    assert str(schemaParquet().field("crossReference").type) == "int8"
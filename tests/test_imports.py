@@ -0,0 +1,23 @@
+import pytest
+
+from src.benchmark import BUDGET_IMPORT, MODULES_DIFFERES, mesurerImport
+
+
+@pytest.fixture(scope="module", params=sorted(MODULES_DIFFERES))
+def mesure(request):
+    return request.param, mesurerImport(request.param)
+
+
+def test_budget_import(mesure):
+    module, m = mesure
+    assert m["duree"] <= BUDGET_IMPORT, f"import {module} : {m['duree'] * 1000:.0f} ms"
+
+
+def test_modules_differes(mesure):
+    module, m = mesure
+    assert m["charges"] == [], f"import {module} charge {m['charges']}"
+
+
+def test_aucun_fichier_cree(mesure):
+    module, m = mesure
+    assert m["fichiers"] == [], f"import {module} crée {m['fichiers']}"
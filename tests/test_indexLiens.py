@@ -0,0 +1,39 @@
+import gzip
+
+from src.indexLiens import IndexLiens, construireIndexLiens, lireTuples
+
+
+def test_lireTuples_chaines_nombres_null():
+    ligne = ("INSERT INTO `page` VALUES (1,0,'Jeanne_d\\'Arc',0,NULL,0.5),"
+             "(2,0,'A_(b),_c',1,'x\\\\y',-3),(3,0,'Ligne\\nsuivante',0,'',1e3);\n")
+    assert list(lireTuples(ligne)) == [
+        (1, 0, "Jeanne_d'Arc", 0, None, 0.5),
+        (2, 0, "A_(b),_c", 1, "x\\y", -3),
+        (3, 0, "Ligne\nsuivante", 0, "", 1000.0),
+    ]
+
+
+def _dumpSQL(chemin, table, tuples):
+    with gzip.open(chemin, "wt", encoding="utf-8") as f:
+        f.write(f"-- MySQL dump\nCREATE TABLE `{table}` (…);\n")
+        f.write(f"INSERT INTO `{table}` VALUES " + ",".join(tuples) + ";\n")
+
+
+def test_construireIndexLiens(tmp_path):
+    page, linktarget, pagelinks = (str(tmp_path / n) for n in ("page.sql.gz", "linktarget.sql.gz", "pagelinks.sql.gz"))
+    # page_id, page_namespace, page_title, page_is_redirect
+    _dumpSQL(page, "page", ["(10,0,'Orléans',0)", "(11,0,'Jeanne_d\\'Arc',0)", "(12,0,'La_Pucelle',1)",
+                            "(13,2,'Utilisateur',0)"])
+    # lt_id, lt_namespace, lt_title
+    _dumpSQL(linktarget, "linktarget", ["(1,0,'Orléans')", "(2,0,'Jeanne_d\\'Arc')", "(3,2,'Utilisateur')"])
+    # pl_from, pl_from_namespace, pl_target_id
+    _dumpSQL(pagelinks, "pagelinks", ["(11,0,1)", "(12,0,2)", "(10,0,2)", "(13,2,1)", "(10,0,3)"])
+
+    repertoire = str(tmp_path / "liens")
+    assert construireIndexLiens(page, pagelinks, linktarget, repertoire, nbProcessus=2) == 3
+
+    index = IndexLiens(repertoire)
+    assert index.sortants("Jeanne d'Arc") == ["Orléans"]
+    assert sorted(index.entrants("Jeanne d'Arc")) == ["La Pucelle", "Orléans"]
+    assert index.lie("Orléans", "Jeanne d'Arc") and not index.lie("Orléans", "La Pucelle")
+    assert index.estRedirection("La Pucelle")
@@ -0,0 +1,47 @@
+import gzip
+import json
+
+from src.indexWikidata import IndexWikidata, construireIndex, extraireEntites
+
+
+def _entite(qid, sitelinks, coord=None, p31=None):
+    claims = {}
+    if coord:
+        claims["P625"] = [{"mainsnak": {"datavalue": {"value": {"latitude": coord[0], "longitude": coord[1]}}}}]
+    if p31:
+        claims["P31"] = [{"mainsnak": {"datavalue": {"value": {"id": p31}}}}]
+    return {"id": qid, "claims": claims, "sitelinks": {site: {"title": titre} for site, titre in sitelinks.items()}}
+
+
+ENTITES = [
+    _entite("Q1", {"frwiki": "Orléans", "enwiki": "Orléans"}, coord=(47.9, 1.9), p31="Q484170"),
+    _entite("Q2", {"enwiki": "Only English"}, coord=(10.0, 20.0)),          # pas d'article frwiki
+    _entite("Q3", {"frwiki": "Jeanne d'Arc"}, p31="Q5"),                    # dernière ligne, sans virgule
+]
+
+
+def _dump(chemin):
+    # Même forme que latest-all.json : "[", une entité par ligne suivie d'une virgule sauf la dernière, "]"
+    lignes = [json.dumps(e, ensure_ascii=False) for e in ENTITES]
+    with gzip.open(chemin, "wt", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join(lignes) + "\n]\n")
+
+
+def test_extraireEntites_ignore_sans_frwiki():
+    bloc = [json.dumps(e) + ",\n" for e in ENTITES]
+    assert [e[0] for e in extraireEntites(bloc)] == ["Q1", "Q3"]
+
+
+def test_construireIndex(tmp_path):
+    dump = str(tmp_path / "dump.json.gz")
+    _dump(dump)
+    chemin = str(tmp_path / "wikidata.db")
+
+    assert construireIndex(dump, chemin, nbProcessus=2, tailleBloc=1) == 2
+
+    index = IndexWikidata(chemin)
+    assert index.qidsParTitre(["Orléans", "Jeanne d'Arc", "Only English", "Inconnu"]) == {
+        "Orléans": "Q1", "Jeanne d'Arc": "Q3"}
+    # Seuls les éléments ayant des coordonnées sont retournés
+    assert index.infosParQid(["Q1", "Q2", "Q3"]) == {
+        "Q1": {"lat": 47.9, "lon": 1.9, "p31": "Q484170", "nbLangues": 2}}
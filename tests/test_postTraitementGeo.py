@@ -0,0 +1,60 @@
+import copy
+
+import pytest
+
+from src.wikiDataLoader import EntreeHistorique, postTraiterGeoEnLot
+
+
+def _entree(i, lat, lon, nbLangues):
+    return EntreeHistorique(f"Titre {i}", f"https://fr.wikipedia.org/wiki/Titre_{i}", qid=f"Q{i}",
+                            lat=lat, lon=lon, nbLangues=nbLangues)
+
+
+# Lignes hors France (étranger, coordonnées absentes, bornes dépassées) intercalées entre lignes françaises
+LIGNES = [
+    (48.85, 2.35, 120),      # Paris
+    (40.71, -74.0, 80),      # New York
+    (47.9, 1.9, 35),         # Orléans
+    (None, None, 12),        # sans coordonnées
+    (43.3, 5.4, None),       # Marseille, nbLangues inconnu
+    (51.5, -0.12, 60),       # Londres (lat > 51)
+    (40.0, -6.0, 4),         # coin sud-ouest, bornes incluses
+    (45.0, None, 50),        # longitude absente
+    (51.0, 11.0, 15),        # coin nord-est, bornes incluses
+    (44.8, -0.58, 5),        # Bordeaux
+]
+
+
+def _parLigne(lignes):
+    gardees = []
+    for entree in lignes:
+        if entree.estGeolocaliseeEnFrance():
+            entree.convertirLambert93()
+            entree.calculerNote()
+            gardees.append(entree)
+    return gardees
+
+
+def test_postTraiterGeoEnLot_equivaut_au_traitement_par_ligne():
+    lignes = [_entree(i, *valeurs) for i, valeurs in enumerate(LIGNES)]
+    attendu = _parLigne(copy.deepcopy(lignes))
+    obtenu = postTraiterGeoEnLot(lignes)
+
+    assert [e.titre for e in obtenu] == ["Titre 0", "Titre 2", "Titre 4", "Titre 6", "Titre 8", "Titre 9"]
+    assert [e.titre for e in obtenu] == [e.titre for e in attendu]
+    for lot, ligne in zip(obtenu, attendu):
+        assert lot.notoriete == ligne.notoriete
+        assert lot.x_l93 == pytest.approx(ligne.x_l93, abs=1e-6)
+        assert lot.y_l93 == pytest.approx(ligne.y_l93, abs=1e-6)
+        assert type(lot.x_l93) is float and type(lot.notoriete) in (int, type(None))
+
+
+def test_postTraiterGeoEnLot_notoriete_par_seuil():
+    seuils = [None, 0, 4, 5, 14, 15, 29, 30, 49, 50, 300]
+    lignes = [_entree(i, 47.0, 2.0, n) for i, n in enumerate(seuils)]
+    assert [e.notoriete for e in postTraiterGeoEnLot(lignes)] == [None, 1, 1, 3, 3, 5, 5, 8, 8, 10, 10]
+
+
+def test_postTraiterGeoEnLot_cas_limites():
+    assert postTraiterGeoEnLot([]) == []
+    assert postTraiterGeoEnLot([_entree(0, 10.0, 10.0, 3), _entree(1, None, None, 3)]) == []
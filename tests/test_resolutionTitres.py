@@ -0,0 +1,63 @@
+from src.wikiCache import CacheResolutionTitres
+from src.wikiDataLoader_Etape2 import BatchProcessingQidDepuisWikipedia
+
+# Réponse pageprops avec redirects=1 : normalisation (souligné, casse), redirection, page absente, page sans QID
+QUERY = {
+    "normalized": [
+        {"from": "jeanne_d'Arc", "to": "Jeanne d'Arc"},
+        {"from": "la Pucelle", "to": "La Pucelle"},
+    ],
+    "redirects": [
+        {"from": "La Pucelle", "to": "Jeanne d'Arc"},
+        {"from": "Pucelle d'Orléans", "to": "La Pucelle"},
+    ],
+    "pages": {
+        "7": {"pageid": 7, "title": "Jeanne d'Arc", "pageprops": {"wikibase_item": "Q7226"}},
+        "9": {"pageid": 9, "title": "Orléans", "pageprops": {"wikibase_item": "Q6548"}},
+        "12": {"pageid": 12, "title": "Page sans élément"},
+        "-1": {"title": "Page inexistante", "missing": ""},
+    },
+}
+
+
+def test_resoudreTitres_normalisation_et_redirections():
+    titres = ["jeanne_d'Arc", "la Pucelle", "Pucelle d'Orléans", "Orléans", "Page sans élément", "Page inexistante"]
+    assert BatchProcessingQidDepuisWikipedia.resoudreTitres(titres, QUERY) == {
+        "jeanne_d'Arc": ("Jeanne d'Arc", 7, "Q7226"),
+        "la Pucelle": ("Jeanne d'Arc", 7, "Q7226"),
+        "Pucelle d'Orléans": ("Jeanne d'Arc", 7, "Q7226"),
+        "Orléans": ("Orléans", 9, "Q6548"),
+        "Page sans élément": ("Page sans élément", 12, None),
+        "Page inexistante": ("Page inexistante", None, None),
+    }
+
+
+def test_resoudreTitres_titre_absent_et_boucle_de_redirections():
+    query = {
+        "redirects": [{"from": "A", "to": "B"}, {"from": "B", "to": "A"}],
+        "pages": {"1": {"pageid": 1, "title": "C", "pageprops": {"wikibase_item": "Q1"}}},
+    }
+    # Réponse tronquée : D n'y figure pas ; A ↔ B ne mène à aucune page
+    assert BatchProcessingQidDepuisWikipedia.resoudreTitres(["A", "C", "D"], query) == {"C": ("C", 1, "Q1")}
+
+
+def test_recupererQid_reutilise_les_resolutions(tmp_path):
+    processor = BatchProcessingQidDepuisWikipedia.__new__(BatchProcessingQidDepuisWikipedia)
+    processor.index = None
+    processor.resolution = CacheResolutionTitres(str(tmp_path / "cache.db"))
+    processor.nbResolusCache = processor.nbResolusReseau = 0
+    requetes = []
+
+    def requeteWikiMedia(url, params=None):
+        requetes.append(params["titles"].split("|"))
+        return {"query": QUERY}
+    processor.requeteWikiMedia = requeteWikiMedia
+
+    titres = ["la Pucelle", "Orléans", "Page sans élément"]
+    attendu = {"la Pucelle": "Q7226", "Orléans": "Q6548"}
+    assert processor.recupererQidDepuisWikipedia(titres) == attendu
+    # Deuxième passage : tout vient du cache, y compris l'absence de QID
+    assert processor.recupererQidDepuisWikipedia(titres + ["jeanne_d'Arc"]) == dict(attendu, **{"jeanne_d'Arc": "Q7226"})
+    assert requetes == [titres, ["jeanne_d'Arc"]]
+    assert (processor.nbResolusCache, processor.nbResolusReseau) == (3, 4)
+    processor.resolution.fermer()
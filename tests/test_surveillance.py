@@ -0,0 +1,71 @@
+import os
+
+from src.surveillance import SurveillantRepertoire
+
+STOP = "R1_STOP"
+
+
+def _publier(dossier, nom):
+    with open(os.path.join(dossier, nom), "w") as f:
+        f.write("{}\n")
+
+
+def _surveillant(dossier):
+    return SurveillantRepertoire(dossier, STOP, intervalle=0.05, inotify=False)
+
+
+def _consommer(surveillant, timeout):
+    """
+    Comme un worker : le fichier rendu quitte le répertoire (réservation par renommage).
+    """
+    chemin = surveillant.prochainFichier(timeout)
+    if chemin is None:
+        return None
+    os.remove(chemin)
+    return os.path.basename(chemin)
+
+
+def test_scan_ordre_des_batchs(tmp_path):
+    dossier = str(tmp_path)
+    for nom in ("R1_Step2_batch_010.json", "R1_Step2_batch_002.parquet", "R1_Step2_batch_001.json"):
+        _publier(dossier, nom)
+    surveillant = _surveillant(dossier)
+    assert surveillant.mode == "scan"
+    assert [_consommer(surveillant, 0.1) for _ in range(3)] == [
+        "R1_Step2_batch_001.json", "R1_Step2_batch_002.parquet", "R1_Step2_batch_010.json"]
+    assert surveillant.prochainFichier(0.1) is None
+
+    # Publiés après le démarrage : vus au scan suivant, et rangés par numéro de batch
+    _publier(dossier, "R1_Step2_batch_012.json")
+    _publier(dossier, "R1_Step2_batch_011.json")
+    assert [_consommer(surveillant, 0.5) for _ in range(2)] == ["R1_Step2_batch_011.json", "R1_Step2_batch_012.json"]
+
+
+def test_scan_fichiers_hors_motif(tmp_path, caplog):
+    dossier = str(tmp_path)
+    for nom in ("notes.json", "R1_Step2_batch_004.json.tmp", "lisezmoi.txt", "R1_Step2_batch_001.json"):
+        _publier(dossier, nom)
+    os.makedirs(os.path.join(dossier, "Done"))
+    surveillant = _surveillant(dossier)
+    surveillant.attendre(0.1)
+    surveillant.attendre(0.1)
+
+    assert surveillant.ignores == {"notes.json"}
+    assert sum("notes.json" in r.getMessage() for r in caplog.records) == 1
+    assert _consommer(surveillant, 0.1) == "R1_Step2_batch_001.json"
+    assert surveillant.prochainFichier(0.1) is None
+
+
+def test_scan_fichier_deja_consomme_et_stop(tmp_path):
+    dossier = str(tmp_path)
+    _publier(dossier, "R1_Step2_batch_001.json")
+    _publier(dossier, "R1_Step2_batch_002.json")
+    surveillant = _surveillant(dossier)
+
+    # Pris par un autre worker entre le scan et la lecture de la file
+    os.remove(os.path.join(dossier, "R1_Step2_batch_001.json"))
+    assert _consommer(surveillant, 0.1) == "R1_Step2_batch_002.json"
+
+    _publier(dossier, STOP)
+    assert surveillant.prochainFichier(0.5) is None
+    assert surveillant.stopRecu
@@ -0,0 +1,62 @@
+from src.tailleLot import ControleurTailleLot, obtenirControleurTailleLot, reinitialiserControleursTailleLot
+
+
+def test_division_par_deux_sur_erreur_ou_troncature():
+    controleur = ControleurTailleLot(50, minimum=2)
+    controleur.observer(50, duree=0.5, nbRequetes=1, nbErreurs=1)
+    assert controleur.taille == 25
+    controleur.observer(25, duree=0.5, nbRequetes=1, nbTroncatures=1)
+    assert controleur.taille == 12
+    # Un lot plus petit que la taille courante (fin de fichier) qui échoue sert de référence
+    controleur.observer(8, duree=0.5, nbRequetes=1, nbErreurs=1)
+    assert controleur.taille == 4
+    for _ in range(5):
+        controleur.observer(4, duree=0.5, nbRequetes=1, nbErreurs=1)
+    assert controleur.taille == 2
+    assert controleur.nbIncidents == 8
+
+
+def test_reduction_d_un_quart_si_latence_trop_haute():
+    controleur = ControleurTailleLot(40, latenceCible=1.0)
+    controleur.observer(40, duree=6.0, nbRequetes=2)
+    assert controleur.latenceMoyenne == 3.0
+    assert controleur.taille == 30
+    # Moyenne lissée : une requête rapide ne suffit pas à repasser sous la cible
+    controleur.observer(30, duree=0.1, nbRequetes=1)
+    assert controleur.latenceMoyenne > 1.0
+    assert controleur.taille == 22
+
+
+def test_remontee_progressive_jusqu_a_la_limite():
+    controleur = ControleurTailleLot(50)
+    controleur.observer(50, duree=1.0, nbRequetes=1, nbErreurs=1)
+    assert controleur.taille == 25
+
+    tailles = []
+    while controleur.taille < controleur.limite:
+        controleur.observer(controleur.taille, duree=0.2, nbRequetes=1)
+        tailles.append(controleur.taille)
+    assert tailles == [30, 35, 40, 45, 50]
+
+    controleur.observer(50, duree=0.2, nbRequetes=1)
+    assert controleur.taille == 50
+
+
+def test_pas_de_remontee_sur_un_lot_incomplet():
+    controleur = ControleurTailleLot(50)
+    controleur.observer(50, duree=1.0, nbRequetes=1, nbErreurs=1)
+    controleur.observer(7, duree=0.2, nbRequetes=1)
+    assert controleur.taille == 25
+
+
+def test_un_controleur_partage_par_etape():
+    reinitialiserControleursTailleLot()
+    etape2 = obtenirControleurTailleLot(2, 50)
+    etape2.observer(50, duree=1.0, nbRequetes=1, nbErreurs=1)
+    assert obtenirControleurTailleLot(2, 50) is etape2
+    assert obtenirControleurTailleLot(2, 50).taille == 25
+    assert obtenirControleurTailleLot(4, 20) is not etape2
+
+    reinitialiserControleursTailleLot()
+    assert obtenirControleurTailleLot(2, 50).taille == 50
+    reinitialiserControleursTailleLot()
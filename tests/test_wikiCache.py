@@ -0,0 +1,105 @@
+import pytest
+
+from src import wikiCache
+from src.wikiCache import CacheRequetes, JOUR, typeEndpoint
+
+URL = "https://fr.wikipedia.org/w/api.php"
+
+
+class Horloge:
+    def __init__(self, debut=1_000_000.0):
+        self.instant = debut
+
+    def __call__(self):
+        return self.instant
+
+    def avancer(self, secondes):
+        self.instant += secondes
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    h = Horloge()
+    monkeypatch.setattr(wikiCache.time, "time", h)
+    return h
+
+
+def params(titre, prop="pageprops"):
+    return {"action": "query", "format": "json", "titles": titre, "prop": prop}
+
+
+def test_typeEndpoint():
+    assert typeEndpoint(URL, params("A")) == "pageprops"
+    assert typeEndpoint(URL, params("A", "links|info")) == "info"
+    assert typeEndpoint(URL, params("A", "revisions")) == "revisions"
+    assert typeEndpoint(URL, {"action": "query", "list": "backlinks"}) == "backlinks"
+    assert typeEndpoint(URL, {"action": "parse", "page": "A"}) == "parse"
+
+
+def test_cle_independante_de_l_ordre_des_parametres():
+    assert CacheRequetes.cle(URL + "?b=2&a=1") == CacheRequetes.cle(URL, {"a": 1, "b": 2, "c": None})
+
+
+def test_expiration_selon_le_ttl_de_l_endpoint(tmp_path, horloge):
+    cache = CacheRequetes(str(tmp_path / "cache.db"), ttl={"pageprops": 2 * JOUR, "parse": 1 * JOUR})
+    cache.ecrire(URL, params("A"), {"v": "pageprops"})
+    cache.ecrire(URL, {"action": "parse", "page": "A"}, {"v": "parse"})
+
+    horloge.avancer(1.5 * JOUR)
+    assert cache.lire(URL, params("A")) == {"v": "pageprops"}
+    assert cache.lire(URL, {"action": "parse", "page": "A"}) is None
+
+    horloge.avancer(1 * JOUR)
+    assert cache.lire(URL, params("A")) is None
+    assert cache.hits == {"pageprops": 1}
+    assert cache.misses == {"parse": 1, "pageprops": 1}
+    cache.fermer()
+
+
+def test_ttl_nul_ni_lu_ni_ecrit(tmp_path, horloge):
+    cache = CacheRequetes(str(tmp_path / "cache.db"))
+    cache.ecrire(URL, params("A", "links|info"), {"lastrevid": 1})
+    assert cache.conn.execute("SELECT COUNT(*) FROM Reponse").fetchone()[0] == 0
+    assert cache.lire(URL, params("A", "links|info")) is None
+    assert cache.misses == {}
+    cache.fermer()
+
+
+def test_eviction_lru(tmp_path, horloge):
+    cache = CacheRequetes(str(tmp_path / "cache.db"))
+    corps = {"texte": "x" * 200}
+    for titre in "ABC":
+        cache.ecrire(URL, params(titre), corps)
+        horloge.avancer(1)
+    tailleEntree = cache.tailleTotale // 3
+
+    # A relu : B devient l'entrée la moins récemment utilisée
+    assert cache.lire(URL, params("A")) == corps
+    horloge.avancer(1)
+
+    cache.taille_max = int(3.5 * tailleEntree)
+    cache.ecrire(URL, params("D"), corps)
+
+    assert cache.lire(URL, params("B")) is None
+    for titre in "ACD":
+        assert cache.lire(URL, params(titre)) == corps
+    assert cache.tailleTotale <= cache.taille_max * 0.9
+    assert cache.tailleTotale == cache.conn.execute("SELECT SUM(taille) FROM Reponse").fetchone()[0]
+    cache.fermer()
+
+
+def test_eviction_supprime_d_abord_les_expirees(tmp_path, horloge):
+    cache = CacheRequetes(str(tmp_path / "cache.db"), ttl={"parse": 10})
+    corps = {"texte": "x" * 200}
+    cache.ecrire(URL, {"action": "parse", "page": "A"}, corps)
+    horloge.avancer(1)
+    cache.ecrire(URL, params("B"), corps)
+    horloge.avancer(20)
+
+    # Trois entrées dépassent la limite ; la suppression de l'entrée expirée suffit à repasser sous 90 %
+    cache.taille_max = int(2.5 * cache.tailleTotale / 2)
+    cache.ecrire(URL, params("C"), corps)
+
+    assert cache.lire(URL, params("B")) == corps
+    assert cache.lire(URL, params("C")) == corps
+    cache.fermer()
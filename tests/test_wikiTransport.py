@@ -0,0 +1,135 @@
+import pytest
+
+from src import wikiTransport
+from src.wikiTransport import MAX_TENTATIVES, MAXLAG, SeauJetons, TransportHTTP
+
+API = "https://fr.wikipedia.org/w/api.php"
+# Débits en puissances de 2 : l'horloge simulée reste exacte en virgule flottante
+LIMITES = {"fr.wikipedia.org": (4.0, 4)}
+
+
+class Horloge:
+    """
+    Remplace time.monotonic / time.sleep : sleep avance l'horloge sans attendre.
+    """
+
+    def __init__(self):
+        self.instant = 100.0
+
+    def monotonic(self):
+        return self.instant
+
+    def sleep(self, duree):
+        self.instant += duree
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    h = Horloge()
+    monkeypatch.setattr(wikiTransport.time, "monotonic", h.monotonic)
+    monkeypatch.setattr(wikiTransport.time, "sleep", h.sleep)
+    return h
+
+
+class Reponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class SessionScriptee:
+    """
+    Rend les réponses prévues dans l'ordre et note l'instant et les paramètres de chaque appel.
+    """
+
+    def __init__(self, horloge, reponses):
+        self.horloge = horloge
+        self.reponses = list(reponses)
+        self.appels = []
+
+    def request(self, methode, url, params=None, data=None, headers=None, timeout=None):
+        self.appels.append((self.horloge.instant, methode, url, params, data))
+        return self.reponses.pop(0)
+
+
+def transportAvec(horloge, reponses, **options):
+    transport = TransportHTTP(limites=LIMITES, **options)
+    session = SessionScriptee(horloge, reponses)
+    transport.sessions["fr.wikipedia.org"] = session
+    return transport, session
+
+
+# ───────────────────────────────────────
+# SeauJetons
+# ───────────────────────────────────────
+def test_seau_rafale_puis_debit(horloge):
+    seau = SeauJetons(debit=2.0, capacite=3)
+    assert [seau.acquerir() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert seau.acquerir() == pytest.approx(0.5)
+    assert seau.acquerir() == pytest.approx(0.5)
+
+    # Après une longue pause, la réserve est plafonnée à la capacité
+    horloge.sleep(60)
+    assert [seau.acquerir() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert seau.acquerir() == pytest.approx(0.5)
+
+
+def test_seau_suspendre(horloge):
+    seau = SeauJetons(debit=4.0, capacite=4)
+    debut = horloge.instant
+    seau.suspendre(30)
+    assert seau.acquerir() == pytest.approx(30 + 0.25)
+    assert horloge.instant == pytest.approx(debut + 30.25)
+
+    # Une suspension plus courte ne raccourcit pas celle en cours
+    seau.suspendre(20)
+    seau.suspendre(5)
+    assert seau.acquerir() == pytest.approx(20 + 0.25)
+
+
+# ───────────────────────────────────────
+# TransportHTTP._envoyer
+# ───────────────────────────────────────
+def test_429_relance_apres_retry_after(horloge):
+    transport, session = transportAvec(horloge, [
+        Reponse(429, {"Retry-After": "7"}),
+        Reponse(503, {"Retry-After": "3"}),
+        Reponse(200),
+    ])
+    reponse = transport.get(API, params={"action": "query"})
+
+    assert reponse.status_code == 200
+    assert reponse.relances == ["429", "503"]
+    assert reponse.attenteRelance == pytest.approx(7 + 0.25 + 3 + 0.25)
+    instants = [appel[0] for appel in session.appels]
+    assert instants[1] - instants[0] >= 7
+    assert instants[2] - instants[1] >= 3
+    assert all(appel[3]["maxlag"] == MAXLAG for appel in session.appels)
+
+
+def test_maxlag_relance_avec_attente_par_defaut(horloge):
+    transport, session = transportAvec(horloge, [
+        Reponse(200, {"MediaWiki-API-Error": "maxlag", "Retry-After": "abc"}),
+        Reponse(200),
+    ])
+    reponse = transport.post(API, data={"action": "query", "titles": "A"})
+
+    assert reponse.relances == ["maxlag"]
+    assert session.appels[1][0] - session.appels[0][0] >= wikiTransport.ATTENTE_DEFAUT
+    assert session.appels[0][4]["maxlag"] == MAXLAG
+
+
+def test_abandon_apres_max_tentatives(horloge):
+    transport, session = transportAvec(horloge, [Reponse(429, {"Retry-After": "1"})] * MAX_TENTATIVES)
+    reponse = transport.get(API, params={})
+    assert reponse.status_code == 429
+    assert len(session.appels) == MAX_TENTATIVES
+    assert reponse.relances == ["429"] * MAX_TENTATIVES
+
+
+def test_substitution_garde_le_debit_de_l_hote_d_origine(horloge):
+    transport, session = transportAvec(horloge, [Reponse(200)],
+                                       substitutions={"fr.wikipedia.org": "http://127.0.0.1:8000/fr"})
+    transport.get("https://fr.wikipedia.org/w/index.php?title=A")
+    assert session.appels[0][2] == "http://127.0.0.1:8000/fr/w/index.php?title=A"
+    assert list(transport.seaux) == ["fr.wikipedia.org"]